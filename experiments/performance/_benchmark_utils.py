@@ -1,6 +1,7 @@
 """
 Functions to benchmark mlinspect
 """
+import inspect
 import timeit
 from dataclasses import dataclass
 from enum import Enum
@@ -60,6 +61,16 @@ def do_op_inspections_benchmarks(data_frame_rows, operator_type: OperatorBenchma
     return benchmark_results
 
 
+def do_op_inspection_count_benchmarks(data_frame_rows, operator_type: OperatorBenchmarkType,
+                                      inspection_counts=(1, 2, 5, 10, 20), repeats=1):
+    """
+    Measure how the cost of an operator grows with the number of inspections that visit it
+    """
+    code_to_benchmark = get_code_for_op_benchmark(data_frame_rows, operator_type)
+    benchmark_results = exec_benchmarks_inspection_counts(code_to_benchmark, inspection_counts, repeats)
+    return benchmark_results
+
+
 def do_full_pipeline_benchmarks(pipeline: PipelineBenchmarkType, repeats=1):
     """
     Do the projection benchmarks
@@ -69,6 +80,52 @@ def do_full_pipeline_benchmarks(pipeline: PipelineBenchmarkType, repeats=1):
     return benchmark_results
 
 
+def do_instrumentation_engine_benchmarks(pipeline: PipelineBenchmarkType, repeats=1):
+    """
+    Compare the AST rewriting and the monkey patching instrumentation engines on a full pipeline
+    """
+    code_to_benchmark = get_code_for_pipeline_benchmark(pipeline)
+    benchmark_results = exec_pipeline_benchmarks_instrumentation_engines(code_to_benchmark, repeats)
+    return benchmark_results
+
+
+def do_call_site_hook_benchmarks(call_count, repeats=1):
+    """
+    Measure the cost per instrumented call of the four hooks inserted into the pipeline code,
+    with and without the call site resolution cache
+    """
+    benchmark_results = {
+        "without call site cache": benchmark_hooks_per_call(call_count, False, repeats),
+        "with call site cache": benchmark_hooks_per_call(call_count, True, repeats)
+    }
+    return benchmark_results
+
+
+def benchmark_hooks_per_call(call_count, use_call_site_cache, repeats):
+    """
+    Call the hooks for 'df.head(1)' call_count times, like a loop in the pipeline code would do
+    """
+    # pylint: disable=import-outside-toplevel
+    import pandas
+    from mlinspect.instrumentation._pipeline_executor import PipelineExecutor, before_call_used_value, \
+        before_call_used_args, before_call_used_kwargs, after_call_used
+
+    def call_hooks():
+        for _ in range(call_count):
+            value = before_call_used_value(False, "df.head(1)", "df", data_frame, 1, 0, 1, 10)
+            args = before_call_used_args(False, "df.head(1)", ["1"], 1, 0, 1, 10, False, [1])
+            kwargs = before_call_used_kwargs(False, "df.head(1)", [], 1, 0, 1, 10)
+            after_call_used(False, "df.head(1)", value.head(*args, **kwargs), 1, 0, 1, 10)
+
+    executor = PipelineExecutor(use_call_site_cache)
+    executor.initialize_execution_state([])
+    data_frame = pandas.DataFrame({"A": [0, 1, 2]})
+    executor.script_scope = {"df": data_frame, "inspect": inspect}
+    with executor.execution_context():
+        timings = timeit.repeat(stmt=call_hooks, repeat=repeats, number=1)
+    return [timing / call_count for timing in timings]
+
+
 def get_code_for_op_benchmark(data_frame_rows, operator_type):
     """
     Get the code to benchmark for the operator benchmark type
@@ -184,6 +241,21 @@ def exec_benchmarks_nonempty_inspection(code_to_benchmark, repeats):
     return benchmark_results
 
 
+def exec_benchmarks_inspection_counts(code_to_benchmark, inspection_counts, repeats):
+    """
+    Benchmark some code with mlinspect with varying numbers of empty inspections
+    """
+    benchmark_results = {}
+    for inspection_count in inspection_counts:
+        inspections_str = "[{}]".format(", ".join("EmptyInspection({})".format(inspection_id)
+                                                  for inspection_id in range(inspection_count)))
+        benchmark_results["{} inspections".format(inspection_count)] = benchmark_code_str_with_inspections(
+            code_to_benchmark.benchmark_exec_func_str, code_to_benchmark.benchmark_setup_func_str, inspections_str,
+            repeats)
+
+    return benchmark_results
+
+
 def exec_pipeline_benchmarks_empty_inspection(code_to_benchmark, repeats):
     """
     Benchmark some code without mlinspect and with mlinspect with varying numbers of inspections
@@ -206,6 +278,23 @@ def exec_pipeline_benchmarks_empty_inspection(code_to_benchmark, repeats):
     return benchmark_results
 
 
+def exec_pipeline_benchmarks_instrumentation_engines(code_to_benchmark, repeats):
+    """
+    Benchmark some code without mlinspect and with mlinspect using the different instrumentation engines
+    """
+    benchmark_results = {
+        "no mlinspect": timeit.repeat(stmt=code_to_benchmark.benchmark_exec, setup=code_to_benchmark.benchmark_setup,
+                                      repeat=repeats, number=1),
+        "ast rewriting": benchmark_pipeline_code_str_with_inspections(code_to_benchmark.benchmark_setup_func_str,
+                                                                      "[EmptyInspection(0)]", repeats,
+                                                                      "AST_REWRITING"),
+        "monkey patching": benchmark_pipeline_code_str_with_inspections(code_to_benchmark.benchmark_setup_func_str,
+                                                                        "[EmptyInspection(0)]", repeats,
+                                                                        "MONKEY_PATCHING")}
+
+    return benchmark_results
+
+
 def benchmark_code_str_with_inspections(benchmark_str, setup_str, inspections_str, repeats):
     """
     Execute one single benchmark
@@ -216,12 +305,13 @@ def benchmark_code_str_with_inspections(benchmark_str, setup_str, inspections_st
     return benchmark_result_one_inspection
 
 
-def benchmark_pipeline_code_str_with_inspections(setup_str, inspections_str, repeats):
+def benchmark_pipeline_code_str_with_inspections(setup_str, inspections_str, repeats,
+                                                 instrumentation_engine="AST_REWRITING"):
     """
     Execute one single benchmark
     """
     setup = prepare_pipeline_benchmark_exec(setup_str)
-    benchmark = trigger_pipeline_benchmark_exec(inspections_str)
+    benchmark = trigger_pipeline_benchmark_exec(inspections_str, instrumentation_engine)
     benchmark_result_one_inspection = timeit.repeat(stmt=benchmark, setup=setup, repeat=repeats, number=1)
     return benchmark_result_one_inspection
 
@@ -232,7 +322,7 @@ def prepare_benchmark_exec(benchmark_str, setup_str, inspections):
     """
     setup = cleandoc("""
     from experiments.performance._empty_inspection import EmptyInspection
-    from mlinspect.instrumentation._pipeline_executor import singleton
+    from mlinspect.instrumentation._pipeline_executor import PipelineExecutor
     from mlinspect.inspections import HistogramForColumns, RowLineage, MaterializeFirstOutputRows
     from experiments.performance._benchmark_utils import get_single_df_creation_str, get_multiple_dfs_creation_str, \
         get_test_projection_str, get_test_selection_str, get_test_join_str, get_np_cat_array_str, \
@@ -240,7 +330,8 @@ def prepare_benchmark_exec(benchmark_str, setup_str, inspections):
         get_estimator_train_data_str, get_decision_tree_str
 
     test_code_setup = {}
-    inspector_result = singleton.run(None, None, test_code_setup, {}, [])
+    executor = PipelineExecutor()
+    inspector_result = executor.run(None, None, test_code_setup, {}, [])
     test_code_benchmark = {}
     """.format(setup_str, inspections, benchmark_str))
     return setup
@@ -251,8 +342,8 @@ def trigger_benchmark_exec(inspections_str):
     Get the benchmark str for timeit
     """
     benchmark = cleandoc("""
-    inspector_result_two = singleton.run(None, None, test_code_benchmark, {}, [], 
-                                         False)
+    inspector_result_two = executor.run(None, None, test_code_benchmark, {}, [], 
+                                        False)
     """.format(inspections_str))
     return benchmark
 
@@ -270,19 +361,20 @@ def prepare_pipeline_benchmark_exec(test_code):
     return benchmark
 
 
-def trigger_pipeline_benchmark_exec(inspections_str):
+def trigger_pipeline_benchmark_exec(inspections_str, instrumentation_engine="AST_REWRITING"):
     """
     Get the benchmark str for timeit
     """
     benchmark = cleandoc("""
     from experiments.performance._empty_inspection import EmptyInspection
-    from mlinspect import PipelineInspector
+    from mlinspect import PipelineInspector, InstrumentationEngine
     
     PipelineInspector\
             .on_pipeline_from_string(code)\
             .add_required_inspections({}) \
+            .with_instrumentation_engine(InstrumentationEngine.{}) \
             .execute()
-    """.format(inspections_str))
+    """.format(inspections_str, instrumentation_engine))
     return benchmark
 
 
@@ -25,5 +25,16 @@ class EmptyInspection(Inspection):
         for _ in inspection_input.row_iterator:
             yield None
 
+    def passes_annotations_through(self, operator_context) -> bool:
+        """
+        The annotations are always None
+        """
+        return True
+
+    def visit_operator_pass_through(self, inspection_input) -> None:
+        """
+        Visit an operator without iterating over the rows
+        """
+
     def get_operator_annotation_after_visit(self) -> any:
         return None
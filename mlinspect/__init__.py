@@ -1,15 +1,19 @@
 """
 Packages and classes we want to expose to users
 """
+from ._version import __version__
 from ._pipeline_inspector import PipelineInspector
-from ._inspector_result import InspectorResult
-from .instrumentation._dag_node import DagNode, OperatorType
+from ._inspector_result import InspectorResult, BatchInspectorResult
+from .instrumentation._dag_node import DagNode, OperatorType, CodeReference
+from .instrumentation._instrumentation_engine import InstrumentationEngine
 
 __all__ = [
+    '__version__',
     'utils',
     'inspections',
     'checks',
     'visualisation',
-    'PipelineInspector', 'InspectorResult',
-    'DagNode', 'OperatorType',
+    'PipelineInspector', 'InspectorResult', 'BatchInspectorResult',
+    'DagNode', 'OperatorType', 'CodeReference',
+    'InstrumentationEngine',
 ]
@@ -8,6 +8,8 @@ import networkx
 
 from mlinspect.checks._check import Check, CheckResult
 from mlinspect.inspections._inspection import Inspection
+from mlinspect.instrumentation._notebook_loader import NotebookSource
+from mlinspect.instrumentation._pipeline_code_cache import PipelineCodeCacheStats
 
 
 @dataclasses.dataclass
@@ -18,3 +20,15 @@ class InspectorResult:
     dag: networkx.DiGraph
     inspection_to_annotations: OrderedDict[Inspection, OrderedDict[Tuple[int, int], any]]
     check_to_check_results: OrderedDict[Check, CheckResult]
+    code_cache_stats: PipelineCodeCacheStats or None = None
+    notebook_source: NotebookSource or None = None
+
+
+@dataclasses.dataclass
+class BatchInspectorResult:
+    """
+    The result for one pipeline of a batch, the error is set instead of the inspector result if the pipeline failed
+    """
+    pipeline_path: str
+    inspector_result: InspectorResult or None
+    error: str or None = None
@@ -1,20 +1,31 @@
 """
 User-facing API for inspecting the pipeline
 """
-from typing import Iterable, Dict
+import threading
+from typing import Iterable, Dict, Iterator
 
 from pandas import DataFrame
 
 from mlinspect.inspections._inspection import Inspection
 from .checks._check import Check, CheckResult
-from ._inspector_result import InspectorResult
-from .instrumentation._pipeline_executor import singleton
+from ._inspector_result import InspectorResult, BatchInspectorResult
+from .backends._fit_result_cache import FitResultCache
+from .instrumentation._instrumentation_engine import InstrumentationEngine
+from .instrumentation._dag_node import CodeReference, OperatorType
+from .instrumentation._monkey_patching_executor import MonkeyPatchingExecutor
+from .instrumentation._operator_scope import OperatorScope
+from .instrumentation._pipeline_checkpoints import PipelineCheckpointStore, DEFAULT_CHECKPOINT_STORE
+from .instrumentation._pipeline_code_cache import PipelineCodeCache
+from .instrumentation._pipeline_executor import PipelineExecutor
+from .instrumentation._pipeline_worker_pool import PipelineWorkerPool
+from .instrumentation._row_sampling import RowSampling
 
 
 class PipelineInspectorBuilder:
     """
     The fluent API builder to build an inspection run
     """
+    # pylint: disable=too-many-instance-attributes
 
     def __init__(self, notebook_path: str or None = None,
                  python_path: str or None = None,
@@ -25,6 +36,14 @@ class PipelineInspectorBuilder:
         self.python_code = python_code
         self.inspections = []
         self.checks = []
+        self.code_cache = None
+        self.instrumentation_engine = InstrumentationEngine.AST_REWRITING
+        self.checkpoint_store = None
+        self.row_sampling = None
+        self.operator_scope = None
+        self.fit_result_cache = None
+        self.inference_aggregates_only = False
+        self.prune_irrelevant_calls = True
 
     def add_required_inspection(self, inspection: Inspection):
         """
@@ -54,11 +73,193 @@ class PipelineInspectorBuilder:
         self.checks.extend(checks)
         return self
 
+    def with_code_cache(self, cache_dir: str or None = None):
+        """
+        Cache the instrumented pipeline code and the static WIR on disk, keyed by the source hash.
+        Defaults to ~/.cache/mlinspect.
+        """
+        self.code_cache = PipelineCodeCache(cache_dir)
+        return self
+
+    def with_fit_result_cache(self, fit_result_cache: FitResultCache or None = None):
+        """
+        Reuse fitted transformers and estimators and their fit_transform outputs when they get trained with the
+        same parameters on the same data again, e.g., when re-inspecting a pipeline with other inspections. The
+        inspection visits still run on the cached outputs. Pass the same FitResultCache to the builders of
+        several runs to share it, FitResultCache(cache_dir) also keeps the entries on disk. Defaults to a new
+        cache in memory for the runs of this builder.
+        """
+        self.fit_result_cache = fit_result_cache or FitResultCache()
+        return self
+
+    def with_instrumentation_engine(self, instrumentation_engine: InstrumentationEngine):
+        """
+        Choose how to capture the pipeline operators. MONKEY_PATCHING only wraps the pandas and sklearn functions
+        the backends know and does not instrument all other calls in the pipeline code.
+        """
+        self.instrumentation_engine = instrumentation_engine
+        return self
+
+    def with_incremental_execution(self, checkpoint_store: PipelineCheckpointStore or None = None):
+        """
+        Snapshot the pipeline state after the top-level statements that call operators. When the same pipeline gets
+        inspected again after an edit, the execution resumes from the last snapshot before the first changed
+        statement. In batches, each worker process keeps its own checkpoints. Only supported by AST_REWRITING.
+        """
+        self.checkpoint_store = checkpoint_store or DEFAULT_CHECKPOINT_STORE
+        return self
+
+    def with_sampling(self, fraction: float or None = None, n_rows: int or None = None, seed: int = 0,
+                      confidence: float = 0.95, key_columns: Iterable[str] or None = None):
+        """
+        Only inspect a deterministic random sample of the rows of each pandas data source, either a fraction or at
+        most n_rows rows. Operators after a data source work on the sample. Inspections like HistogramForColumns
+        then report counts scaled to the full data with bounds for the given confidence level. Data sources with
+        all key_columns get sampled by their key values, so joins on these keys keep the sampling fraction. The
+        bounds after joins on other columns assume independently sampled join rows and are too narrow.
+        """
+        # pylint: disable=too-many-arguments
+        self.row_sampling = RowSampling(fraction, n_rows, seed, confidence, tuple(key_columns or ()))
+        return self
+
+    def only_for(self, operator_types: Iterable[OperatorType] or None = None,
+                 code_references: Iterable[CodeReference] or None = None):
+        """
+        Only visit the operators with one of the operator types or at one of the code references with the
+        inspections. The other operators get no inspection annotations in the DAG, unless they create or combine
+        row annotations like data sources, joins, and concatenations. They still get visited if an inspection does
+        not pass the row annotations through them, so the operators after them get correct annotations.
+        """
+        self.operator_scope = OperatorScope(frozenset(operator_types) if operator_types is not None else None,
+                                            frozenset(code_references) if code_references is not None else None)
+        return self
+
+    def with_inference_aggregates_only(self):
+        """
+        Calls like transform, predict, predict_proba and score on fitted pipelines get DAG nodes for the test data,
+        the test labels and the call itself. With this option, their inspections only compute the operator
+        annotations, e.g., histograms, and the outputs get no row annotations, to keep the scoring overhead low.
+        """
+        self.inference_aggregates_only = True
+        return self
+
+    def with_call_pruning(self, prune_irrelevant_calls: bool = True):
+        """
+        Leave the calls a static analysis finds to never reach pandas or sklearn objects uninstrumented, e.g., calls
+        to the standard library. This is the default. If such a call returns a pandas or sklearn object at runtime
+        anyway, the pipeline runs again with this call instrumented. Only supported by AST_REWRITING.
+        """
+        self.prune_irrelevant_calls = prune_irrelevant_calls
+        return self
+
     def execute(self) -> InspectorResult:
         """
-        Instrument and execute the pipeline
+        Instrument and execute the pipeline. Each call gets its own executor, so multiple pipelines can be
+        inspected concurrently, e.g., using a thread pool.
         """
-        return singleton.run(self.notebook_path, self.python_path, self.python_code, self.inspections, self.checks)
+        if self.instrumentation_engine == InstrumentationEngine.MONKEY_PATCHING:
+            return MonkeyPatchingExecutor().run(self.notebook_path, self.python_path, self.python_code,
+                                                self.inspections, self.checks, row_sampling=self.row_sampling,
+                                                operator_scope=self.operator_scope,
+                                                fit_result_cache=self.fit_result_cache,
+                                                inference_aggregates_only=self.inference_aggregates_only)
+        executor = PipelineExecutor(prune_irrelevant_calls=self.prune_irrelevant_calls)
+        return executor.run(self.notebook_path, self.python_path, self.python_code, self.inspections, self.checks,
+                            code_cache=self.code_cache, checkpoint_store=self.checkpoint_store,
+                            row_sampling=self.row_sampling, operator_scope=self.operator_scope,
+                            fit_result_cache=self.fit_result_cache,
+                            inference_aggregates_only=self.inference_aggregates_only)
+
+
+class PipelineBatchInspectorBuilder(PipelineInspectorBuilder):
+    """
+    The fluent API builder to inspect many pipelines with the same inspections and checks on a pool of worker
+    processes
+    """
+
+    def __init__(self, pipeline_paths: Iterable[str]) -> None:
+        super().__init__()
+        self.pipeline_paths = list(pipeline_paths)
+        self.worker_count = None
+        self.timeout = None
+        self.worker_pool = None
+
+    def with_workers(self, worker_count: int):
+        """
+        The number of worker processes, defaults to the number of CPUs. Without with_worker_pool, the batches with
+        the same number of workers share a pool that keeps running until the interpreter exits.
+        """
+        self.worker_count = worker_count
+        return self
+
+    def with_worker_pool(self, worker_pool: PipelineWorkerPool):
+        """
+        Run the pipelines on a pool from PipelineInspector.start_worker_pool, e.g., to start the worker processes
+        and import the backends before the first batch
+        """
+        self.worker_pool = worker_pool
+        return self
+
+    def with_timeout(self, timeout: float):
+        """
+        The maximum number of seconds a single pipeline may run. Its worker process gets killed and replaced
+        after that.
+        """
+        self.timeout = timeout
+        return self
+
+    def get_pipeline_builder(self, pipeline_path: str) -> PipelineInspectorBuilder:
+        """
+        The builder to inspect a single pipeline of the batch, .ipynb files are notebooks
+        """
+        if pipeline_path.endswith(".ipynb"):
+            builder = PipelineInspectorBuilder(notebook_path=pipeline_path)
+        else:
+            builder = PipelineInspectorBuilder(python_path=pipeline_path)
+        builder.inspections = self.inspections
+        builder.checks = self.checks
+        builder.code_cache = self.code_cache
+        builder.instrumentation_engine = self.instrumentation_engine
+        builder.checkpoint_store = self.checkpoint_store
+        builder.row_sampling = self.row_sampling
+        builder.operator_scope = self.operator_scope
+        builder.fit_result_cache = self.fit_result_cache
+        builder.inference_aggregates_only = self.inference_aggregates_only
+        builder.prune_irrelevant_calls = self.prune_irrelevant_calls
+        return builder
+
+    def execute(self) -> Iterator[BatchInspectorResult]:
+        """
+        Inspect all pipelines. The results stream back in the order the pipelines finish. Pipelines that fail,
+        time out, or crash their worker process get a result with an error instead of an InspectorResult.
+        """
+        pipeline_builders = [self.get_pipeline_builder(pipeline_path) for pipeline_path in self.pipeline_paths]
+        worker_pool = self.worker_pool or get_default_worker_pool(self.worker_count)
+        for pool_result in worker_pool.imap_unordered(pipeline_builders, self.timeout):
+            yield BatchInspectorResult(self.pipeline_paths[pool_result.task_index], pool_result.result,
+                                       pool_result.error)
+
+
+def execute_pipeline_builder(builder: PipelineInspectorBuilder) -> InspectorResult:
+    """
+    The task the worker processes execute for each pipeline of a batch
+    """
+    return builder.execute()
+
+
+def get_default_worker_pool(worker_count: int or None) -> PipelineWorkerPool:
+    """
+    The pool the batches with this number of workers share if they do not bring their own
+    """
+    with DEFAULT_WORKER_POOLS_LOCK:
+        if worker_count not in DEFAULT_WORKER_POOLS:
+            DEFAULT_WORKER_POOLS[worker_count] = PipelineWorkerPool(execute_pipeline_builder, worker_count)
+        return DEFAULT_WORKER_POOLS[worker_count]
+
+
+# The worker processes are daemon processes, so the pools get stopped when the interpreter exits
+DEFAULT_WORKER_POOLS = {}
+DEFAULT_WORKER_POOLS_LOCK = threading.Lock()
 
 
 class PipelineInspector:
@@ -80,6 +281,19 @@ class PipelineInspector:
         """Inspect a pipeline from a string."""
         return PipelineInspectorBuilder(python_code=code)
 
+    @staticmethod
+    def on_pipelines(paths: Iterable[str]) -> PipelineBatchInspectorBuilder:
+        """Inspect many pipelines from .py and .ipynb files on a pool of worker processes."""
+        return PipelineBatchInspectorBuilder(paths)
+
+    @staticmethod
+    def start_worker_pool(worker_count: int or None = None) -> PipelineWorkerPool:
+        """
+        Start worker processes for PipelineBatchInspectorBuilder.with_worker_pool, they import the backends right
+        away. Close the pool when it is not needed anymore.
+        """
+        return PipelineWorkerPool(execute_pipeline_builder, worker_count)
+
     @staticmethod
     def check_results_as_data_frame(check_to_check_results: Dict[Check, CheckResult]) -> DataFrame:
         """
@@ -0,0 +1,4 @@
+"""
+The mlinspect version
+"""
+__version__ = "0.0.1.dev0"
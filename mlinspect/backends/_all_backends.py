@@ -3,11 +3,16 @@ Get all available backends
 """
 from typing import List
 
+from ._annotation_registry import AnnotationRegistry
 from ._backend import Backend
 from ._pandas_backend import PandasBackend
 from ._sklearn_backend import SklearnBackend
 
 
 def get_all_backends() -> List[Backend]:
-    """Get the list of all currently available backends"""
-    return [PandasBackend(), SklearnBackend()]
+    """Get the list of all currently available backends. They share one registry for the row annotations."""
+    backends = [PandasBackend(), SklearnBackend()]
+    annotation_registry = AnnotationRegistry()
+    for backend in backends:
+        backend.annotation_registry = annotation_registry
+    return backends
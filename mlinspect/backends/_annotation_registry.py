@@ -0,0 +1,117 @@
+"""
+A side table for the row annotations of the values the instrumented operators return
+"""
+import weakref
+
+import numpy
+
+from ._annotation_store import AnnotationStore
+
+
+class AnnotationRegistry:
+    """
+    The row annotations of pandas, numpy, and scipy values, keyed by the identity of the values. The values stay
+    plain objects of their libraries and we only keep weak references to them, the entries get removed once the
+    values get garbage collected. Numpy views with the same rows as an array we know, e.g., column slices or the
+    result of ravel, share the annotations of that array.
+    """
+
+    def __init__(self):
+        self.id_to_entry = {}
+        self.memory_owner_id_to_ids = {}
+
+    def set_annotations(self, value, annotations):
+        """
+        Store the annotations for the value, the value does not get copied or changed
+        """
+        value_id = id(value)
+        owner_id = id(get_memory_owner(value)) if isinstance(value, numpy.ndarray) else None
+        id_to_entry = self.id_to_entry
+        memory_owner_id_to_ids = self.memory_owner_id_to_ids
+
+        def remove_entry(reference):
+            entry = id_to_entry.get(value_id)
+            if entry is not None and entry[0] is reference:
+                del id_to_entry[value_id]
+                if owner_id is not None:
+                    owner_value_ids = memory_owner_id_to_ids[owner_id]
+                    owner_value_ids.discard(value_id)
+                    if not owner_value_ids:
+                        del memory_owner_id_to_ids[owner_id]
+
+        id_to_entry[value_id] = (weakref.ref(value, remove_entry), annotations)
+        if owner_id is not None:
+            memory_owner_id_to_ids.setdefault(owner_id, set()).add(value_id)
+        return value
+
+    def get_annotations(self, value):
+        """
+        Get the annotations of the value or of an array with the same rows it is a view of, None for values we do
+        not know
+        """
+        entry = self.id_to_entry.get(id(value))
+        if entry is not None and entry[0]() is value:
+            return entry[1]
+        if isinstance(value, numpy.ndarray) and value.ndim != 0:
+            for array_id in self.memory_owner_id_to_ids.get(id(get_memory_owner(value)), ()):
+                reference, annotations = self.id_to_entry[array_id]
+                array = reference()
+                if array is not None and has_same_rows(value, array):
+                    return annotations
+        return None
+
+    def get_row_annotations(self, value, inspections):
+        """
+        Get the annotations of the value. Values from functions we do not instrument get None annotations.
+        """
+        annotations = self.get_annotations(value)
+        if annotations is None:
+            annotations = AnnotationStore.from_iters(inspections, [[None] * value.shape[0] for _ in inspections])
+        return annotations
+
+    def __len__(self):
+        return len(self.id_to_entry)
+
+    def __copy__(self):
+        # Estimator wrappers get cloned with copies of their parameters, the clones need to share the registry
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __getstate__(self):
+        # Weak references can not be pickled, e.g., for pipeline checkpoints. The values are pickled together with
+        # the pipeline scope, so the restored entries refer to the restored values.
+        return [(reference(), annotations) for reference, annotations in list(self.id_to_entry.values())
+                if reference() is not None]
+
+    def __setstate__(self, state):
+        self.id_to_entry = {}
+        self.memory_owner_id_to_ids = {}
+        for value, annotations in state:
+            self.set_annotations(value, annotations)
+
+
+def get_memory_owner(array: numpy.ndarray):
+    """
+    The object that owns the memory of the array. Numpy views of views have the owner as base, not the other view.
+    """
+    if array.base is None:
+        return array
+    return array.base
+
+
+def has_same_rows(view: numpy.ndarray, array: numpy.ndarray) -> bool:
+    """
+    Check if each row of the view is in the row of the array at the same position, e.g., not for transposed or
+    reversed views
+    """
+    if array.ndim == 0 or view.shape[0] != array.shape[0] or view.strides[0] != array.strides[0]:
+        return False
+    offset = view.__array_interface__['data'][0] - array.__array_interface__['data'][0]
+    if offset == 0:
+        return True
+    if array.ndim != 2 or array.strides[1] == 0:
+        return False
+    column_index, remainder = divmod(offset, array.strides[1])
+    return remainder == 0 and 0 <= column_index < array.shape[1]
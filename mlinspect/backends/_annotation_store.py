@@ -0,0 +1,230 @@
+"""
+Typed columnar storage for the row annotations of the inspections
+"""
+import itertools
+from typing import List, Iterable, Iterator
+
+import numpy
+
+from ._row_fan_out import ROWS_PER_CHUNK
+
+SCALAR_TYPES = (bool, int, float, numpy.bool_, numpy.integer, numpy.floating)
+CONTAINER_TYPES = (set, frozenset, list, tuple)
+
+
+class ScalarAnnotations:
+    """
+    Annotations that are numbers or booleans, stored in one numpy array with their numpy dtype
+    """
+
+    def __init__(self, values: numpy.ndarray):
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return self.iter_rows()
+
+    def iter_rows(self) -> Iterator:
+        """The annotations as Python values"""
+        return iter(self.values.tolist())
+
+    def to_array(self) -> numpy.ndarray:
+        """The annotations as one-dimensional array"""
+        return self.values
+
+    def take(self, positions: numpy.ndarray) -> 'ScalarAnnotations':
+        """The annotations of the rows at some positions"""
+        return ScalarAnnotations(self.values.take(positions))
+
+
+class OffsetAnnotations:
+    """
+    Annotations that are sets, lists or tuples of the same type. The elements of all rows are stored in one array,
+    the elements of row i are values[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, offsets: numpy.ndarray, values: numpy.ndarray, container_type: type):
+        self.offsets = offsets
+        self.values = values
+        self.container_type = container_type
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        return self.iter_rows()
+
+    def iter_rows(self) -> Iterator:
+        """The annotations as Python values"""
+        container_type = self.container_type
+        values = self.values.tolist()
+        offsets = self.offsets.tolist()
+        return (container_type(values[start:end]) for start, end in zip(offsets, offsets[1:]))
+
+    def to_array(self) -> numpy.ndarray:
+        """The annotations as one-dimensional array"""
+        return to_object_array(list(self.iter_rows()))
+
+    def take(self, positions: numpy.ndarray) -> 'OffsetAnnotations':
+        """The annotations of the rows at some positions"""
+        starts = self.offsets[:-1].take(positions)
+        lengths = self.offsets[1:].take(positions) - starts
+        offsets = numpy.zeros(len(positions) + 1, dtype=numpy.int64)
+        numpy.cumsum(lengths, out=offsets[1:])
+        value_positions = numpy.repeat(starts - offsets[:-1], lengths) + numpy.arange(offsets[-1])
+        return OffsetAnnotations(offsets, self.values.take(value_positions), self.container_type)
+
+
+class ObjectAnnotations:
+    """
+    The fallback for other annotations, stored as Python objects
+    """
+
+    def __init__(self, values: numpy.ndarray):
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return self.iter_rows()
+
+    def iter_rows(self) -> Iterator:
+        """The annotations as Python values"""
+        return iter(self.values)
+
+    def to_array(self) -> numpy.ndarray:
+        """The annotations as one-dimensional array"""
+        return self.values
+
+    def take(self, positions: numpy.ndarray) -> 'ObjectAnnotations':
+        """The annotations of the rows at some positions"""
+        return ObjectAnnotations(self.values.take(positions))
+
+
+ANNOTATION_BUFFER_TYPES = (ScalarAnnotations, OffsetAnnotations, ObjectAnnotations)
+
+
+def to_object_array(values: list) -> numpy.ndarray:
+    """
+    Create a one-dimensional object array, numpy would create more dimensions for nested values
+    """
+    array = numpy.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def encode_annotations(annotations: list or numpy.ndarray):
+    """
+    Choose the buffer for the annotations of one inspection depending on their types
+    """
+    if isinstance(annotations, ANNOTATION_BUFFER_TYPES):
+        return annotations
+    if isinstance(annotations, numpy.ndarray) and annotations.dtype != object:
+        return ScalarAnnotations(annotations)
+    annotation_types = {type(annotation) for annotation in annotations}
+    if len(annotation_types) != 1:
+        return ObjectAnnotations(to_object_array(list(annotations)))
+    annotation_type = annotation_types.pop()
+    if issubclass(annotation_type, SCALAR_TYPES):
+        return ScalarAnnotations(numpy.array(annotations))
+    if issubclass(annotation_type, CONTAINER_TYPES):
+        lengths = numpy.fromiter((len(annotation) for annotation in annotations), dtype=numpy.int64,
+                                 count=len(annotations))
+        offsets = numpy.zeros(len(annotations) + 1, dtype=numpy.int64)
+        numpy.cumsum(lengths, out=offsets[1:])
+        elements = list(itertools.chain.from_iterable(annotations))
+        element_types = {type(element) for element in elements}
+        if len(element_types) == 1 and element_types.pop() in (int, float, bool):
+            values = numpy.array(elements)
+        else:
+            values = to_object_array(elements)
+        return OffsetAnnotations(offsets, values, annotation_type)
+    return ObjectAnnotations(to_object_array(list(annotations)))
+
+
+def drain_in_lockstep(annotation_iterators: List[Iterable], rows_per_chunk=ROWS_PER_CHUNK) -> list:
+    """
+    Collect the annotations of all inspections. We take the same number of rows from each inspection in turn, so
+    the row iterators of the inspections stay in lockstep and their shared rows can be released. Arrays and
+    buffers, e.g., from batch visits or passed through from the input, are already complete.
+    """
+    complete_types = (numpy.ndarray, *ANNOTATION_BUFFER_TYPES)
+    annotation_lists = [annotations if isinstance(annotations, complete_types) else []
+                        for annotations in annotation_iterators]
+    active_iterators = [(annotation_lists[index], iter(annotations))
+                        for index, annotations in enumerate(annotation_iterators)
+                        if not isinstance(annotations, complete_types)]
+    while active_iterators:
+        still_active_iterators = []
+        for annotation_list, annotation_iterator in active_iterators:
+            length_before = len(annotation_list)
+            annotation_list.extend(itertools.islice(annotation_iterator, rows_per_chunk))
+            if len(annotation_list) - length_before == rows_per_chunk:
+                still_active_iterators.append((annotation_list, annotation_iterator))
+        active_iterators = still_active_iterators
+    return annotation_lists
+
+
+def discard_in_lockstep(annotation_iterators: List[Iterable], rows_per_chunk=ROWS_PER_CHUNK):
+    """
+    Consume the annotations of all inspections without keeping them, e.g., for sinks that have no output rows.
+    Like in drain_in_lockstep, the row iterators of the inspections stay in lockstep.
+    """
+    complete_types = (numpy.ndarray, *ANNOTATION_BUFFER_TYPES)
+    active_iterators = [iter(annotations) for annotations in annotation_iterators
+                        if not isinstance(annotations, complete_types)]
+    while active_iterators:
+        active_iterators = [annotation_iterator for annotation_iterator in active_iterators
+                            if sum(1 for _ in itertools.islice(annotation_iterator, rows_per_chunk)) == rows_per_chunk]
+
+
+class AnnotationStore:
+    """
+    The row annotations of all inspections for the rows of some operator output, with one typed buffer per
+    inspection. Operators that do not change the rows can share the store of their input.
+    """
+
+    def __init__(self, names: List[str], buffers: list):
+        assert len(names) == len(buffers)
+        self.names = names
+        self.buffers = buffers
+
+    @staticmethod
+    def from_iters(inspections, annotation_iterators: List[Iterable]) -> 'AnnotationStore':
+        """
+        Build the store from the annotations the inspections returned. Inspections with batch visits return
+        arrays, inspections that pass the annotations through return the buffer of the input, the others return
+        iterators.
+        """
+        annotation_lists = drain_in_lockstep(annotation_iterators)
+        row_count = max((len(annotations) for annotations in annotation_lists), default=0)
+        for index, annotations in enumerate(annotation_lists):
+            if len(annotations) < row_count:
+                annotation_lists[index] = list(annotations) + [None] * (row_count - len(annotations))
+        buffers = [encode_annotations(annotations) for annotations in annotation_lists]
+        return AnnotationStore([str(inspection) for inspection in inspections], buffers)
+
+    def __deepcopy__(self, memo):
+        # The stores never change. Copying them is expensive, e.g., when the ColumnTransformer clones the child
+        # transformers that get the annotations of the projections as parameter.
+        return self
+
+    def __len__(self):
+        if not self.buffers:
+            return 0
+        return len(self.buffers[0])
+
+    def get_rows(self, inspection_index: int) -> Iterator:
+        """The annotations of one inspection as Python values"""
+        return self.buffers[inspection_index].iter_rows()
+
+    def get_array(self, inspection_index: int) -> numpy.ndarray:
+        """The annotations of one inspection as one-dimensional array"""
+        return self.buffers[inspection_index].to_array()
+
+    def take(self, positions: numpy.ndarray) -> 'AnnotationStore':
+        """The annotations of the rows at some positions"""
+        return AnnotationStore(self.names, [buffer.take(positions) for buffer in self.buffers])
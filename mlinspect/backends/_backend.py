@@ -5,11 +5,14 @@ import abc
 
 import networkx
 
+from ._annotation_registry import AnnotationRegistry
+
 
 class Backend(metaclass=abc.ABCMeta):
     """
     The Interface for the different instrumentation backends
     """
+    # pylint: disable=too-many-instance-attributes
 
     def __init__(self):
         self.code_reference_to_module = {}
@@ -18,12 +21,24 @@ class Backend(metaclass=abc.ABCMeta):
         self.dag_node_identifier_to_columns = {}
         self.dag_node_identifier_to_inspection_output = {}
         self.inspections = []
+        self.row_sampling = None
+        self.operator_scope = None
+        self.fit_result_cache = None
+        self.inference_aggregates_only = False
+        self.code_reference_to_sampling_fraction = {}
+        self.key_sampled_joins = set()
+        self.annotation_registry = AnnotationRegistry()
 
     @abc.abstractmethod
     def is_responsible_for_call(self, function_info, function_prefix, value=None):
         """Checks whether the backend is responsible for the current method call"""
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def is_responsible_for_value(self, value):
+        """Checks whether the backend would be responsible for calls returning this value"""
+        raise NotImplementedError
+
     @property
     @abc.abstractmethod
     def operator_map(self):
@@ -65,3 +80,7 @@ class Backend(metaclass=abc.ABCMeta):
         """The return value of some function"""
         # pylint: disable=too-many-arguments, unused-argument
         raise NotImplementedError
+
+    def get_annotations(self, value):
+        """The row annotations of a value, values from functions we do not instrument get None annotations"""
+        return self.annotation_registry.get_row_annotations(value, self.inspections)
@@ -1,48 +1,15 @@
 """
 Some utility functions the different instrumentation backends
 """
-import itertools
-
 import numpy
-from pandas import DataFrame, Series
+from pandas import DataFrame, Series, MultiIndex, Index
+from pandas.core.internals import BlockManager, make_block
 from scipy.sparse import csr_matrix
 
-from ._pandas_backend_frame_wrapper import MlinspectDataFrame, MlinspectSeries
-from ._sklearn_backend_csr_matrx_wrapper import MlinspectCsrMatrix
-from ._sklearn_backend_ndarray_wrapper import MlinspectNdarray
+from ._pandas_backend_frame_wrapper import MlinspectDataFrame
 from ..inspections._inspection_input import ColumnInfo
 
-
-def get_annotation_rows(input_annotations, inspection_index):
-    """
-    In the pandas backend, we store annotations in a data frame, for the sklearn transformers lists are enough
-    """
-    if isinstance(input_annotations, DataFrame):
-        annotations_for_inspection = input_annotations.iloc[:, inspection_index]
-        assert isinstance(annotations_for_inspection, Series)
-    else:
-        annotations_for_inspection = input_annotations[inspection_index]
-        assert isinstance(annotations_for_inspection, list)
-    annotation_rows = annotations_for_inspection.__iter__()
-    return annotation_rows
-
-
-def build_annotation_df_from_iters(inspections, annotation_iterators):
-    """
-    Build the annotations dataframe
-    """
-    annotation_iterators = itertools.zip_longest(*annotation_iterators)
-    inspection_names = [str(inspection) for inspection in inspections]
-    annotations_df = DataFrame(annotation_iterators, columns=inspection_names)
-    return annotations_df
-
-
-def build_annotation_list_from_iters(annotation_iterators):
-    """
-    Build the annotations dataframe
-    """
-    annotation_lists = [list(iterator) for iterator in annotation_iterators]
-    return list(annotation_lists)
+CSR_ROWS_PER_CHUNK = 1024
 
 
 def get_iterator_for_type(data, np_nditer_with_refs=False, columns=None):
@@ -67,43 +34,52 @@ def get_iterator_for_type(data, np_nditer_with_refs=False, columns=None):
     return iterator
 
 
-def create_wrapper_with_annotations(annotations_df, return_value, pandas_backend=None):
-    """
-    Create a wrapper based on the data type of the return value and store the annotations in it.
-    """
-    if isinstance(return_value, numpy.ndarray):
-        return_value = MlinspectNdarray(return_value)
-        return_value.annotations = annotations_df
-        new_return_value = return_value
-    elif isinstance(return_value, (DataFrame, MlinspectDataFrame)):
-        if not pandas_backend:
-            pandas_backend = return_value.backend
-        return_value = MlinspectDataFrame(return_value)
-        return_value.annotations = annotations_df
-
-        assert pandas_backend  # This is needed to deal with ops like adding new columns
-        return_value.backend = pandas_backend
-
-        # Remove index columns that may have been created
-        if "mlinspect_index" in return_value.columns:
-            return_value = return_value.drop("mlinspect_index", axis=1)
-        elif "mlinspect_index_x" in return_value.columns:
-            return_value = return_value.drop(["mlinspect_index_x", "mlinspect_index_y"], axis=1)
-        assert "mlinspect_index" not in return_value.columns
-        assert "mlinspect_index_x" not in return_value.columns
-
-        new_return_value = return_value
-    elif isinstance(return_value, Series):
-        return_value = MlinspectSeries(return_value)
-        return_value.annotations = annotations_df
-        new_return_value = return_value
-    elif isinstance(return_value, csr_matrix):
-        return_value = MlinspectCsrMatrix(return_value)
-        return_value.annotations = annotations_df
-        new_return_value = return_value
+def store_annotations(annotation_registry, annotations, return_value, pandas_backend=None):
+    """
+    Store the annotations for the return value in the registry, the data does not get copied. The annotations
+    are an AnnotationStore or, for the ColumnTransformer output, a list of column names with AnnotationStores.
+    Data frames become MlinspectDataFrames sharing the data of the return value, so we see column assignments.
+    """
+    if isinstance(return_value, DataFrame):
+        return_value = get_frame_with_backend(return_value, pandas_backend)
     else:
-        assert False
-    return new_return_value
+        assert isinstance(return_value, (numpy.ndarray, Series, csr_matrix))
+    annotation_registry.set_annotations(return_value, annotations)
+    return return_value
+
+
+def get_frame_with_backend(data_frame, pandas_backend=None):
+    """
+    Get an MlinspectDataFrame that shares the data with the data frame, so the backend sees column assignments
+    """
+    if not isinstance(data_frame, MlinspectDataFrame):
+        data_frame = MlinspectDataFrame(data_frame)
+    if pandas_backend:
+        data_frame.backend = pandas_backend
+    assert getattr(data_frame, "backend", None)  # This is needed to deal with ops like adding new columns
+    return data_frame
+
+
+def get_row_positions(input_data, output_data):
+    """
+    Get the positions of the input rows for each output row of operators that keep the index labels of the rows,
+    like selections. If the labels are not unique, rows with the same label get matched in the order they occur.
+    """
+    input_index = input_data.index
+    if input_index.is_unique:
+        return input_index.get_indexer(output_data.index)
+    input_codes, unique_labels = input_index.factorize()
+    output_codes = unique_labels.get_indexer(output_data.index)
+    input_keys = MultiIndex.from_arrays([input_codes, get_occurrence_numbers(input_codes)])
+    output_keys = MultiIndex.from_arrays([output_codes, get_occurrence_numbers(output_codes)])
+    return input_keys.get_indexer(output_keys)
+
+
+def get_occurrence_numbers(codes):
+    """
+    Number the occurrences of each code, e.g., [7, 3, 7] becomes [0, 0, 1]
+    """
+    return Series(codes).groupby(codes).cumcount().to_numpy()
 
 
 def get_df_row_iterator(dataframe):
@@ -114,21 +90,76 @@ def get_df_row_iterator(dataframe):
     # Performance tips:
     # https://stackoverflow.com/questions/16476924/how-to-iterate-over-rows-in-a-dataframe-in-pandas
     arrays = []
-    column_info = ColumnInfo(list(dataframe.columns.values))
+    column_info = ColumnInfo(list(dataframe.columns.values), list(dataframe.dtypes))
     arrays.extend(dataframe.iloc[:, k] for k in range(0, len(dataframe.columns)))
 
     return column_info, map(tuple, zip(*arrays))
 
 
+def get_gathered_df_row_iterator(dataframe, column_indexes, positions=None):
+    """
+    Create an efficient iterator for the rows of some of the data frame columns. If there are row positions, only
+    the columns we need get gathered, the other columns do not get copied. The rows only get gathered once
+    somebody iterates over them, e.g., not if all inspections use batch visits.
+    """
+    columns = [dataframe.iloc[:, column_index] for column_index in column_indexes]
+    column_info = ColumnInfo([dataframe.columns[column_index] for column_index in column_indexes],
+                             [column.dtype for column in columns])
+    if positions is None:
+        return column_info, map(tuple, zip(*columns))
+
+    def gathered_rows():
+        yield from zip(*[column.take(positions) for column in columns])
+
+    return column_info, map(tuple, gathered_rows())
+
+
+def get_gathered_df_view(dataframe, column_indexes, positions=None):
+    """
+    Get some of the data frame columns with the rows at some positions as data frame
+    """
+    if positions is None:
+        return dataframe.iloc[:, list(column_indexes)]
+    return dataframe.iloc[positions, list(column_indexes)].reset_index(drop=True)
+
+
+def get_columns_df_view(columns, column_names, index):
+    """
+    Build a data frame from columns with the same index without copying the column data. Each column gets its own
+    block, a view of the column data. Building a data frame from the columns in the usual ways would consolidate
+    them into a copy.
+    """
+    blocks = []
+    for position, column in enumerate(columns):
+        if isinstance(column.dtype, numpy.dtype):
+            values = column.to_numpy().reshape(1, -1)
+        else:
+            values = column.array
+        blocks.append(make_block(values, placement=[position], ndim=2))
+    return DataFrame(BlockManager(blocks, [Index(column_names), index]))
+
+
+def get_column_slices(data, column_bounds):
+    """
+    Split the columns of a transformer output at the bounds, slice i are the columns from column_bounds[i] to
+    column_bounds[i + 1]. Each column slice of a csr_matrix would read all of its rows again, so sparse outputs get
+    converted to csc once and each slice only reads its own columns.
+    """
+    if isinstance(data, csr_matrix):
+        csc_data = data.tocsc()
+        return [csc_data[:, start:end].tocsr() for start, end in zip(column_bounds, column_bounds[1:])]
+    return [data[:, start:end] for start, end in zip(column_bounds, column_bounds[1:])]
+
+
 def get_series_row_iterator(series, columns=None):
     """
     Create an efficient iterator for the data frame rows.
     The implementation is inspired by the implementation of the pandas DataFrame.itertuple method
     """
     if columns:
-        column_info = ColumnInfo(columns)
+        column_info = ColumnInfo(columns, [series.dtype])
     else:
-        column_info = ColumnInfo(["array"])
+        column_info = ColumnInfo(["array"], [series.dtype])
     numpy_iterator = series.__iter__()
 
     return column_info, map(tuple, zip(numpy_iterator))
@@ -140,9 +171,9 @@ def get_numpy_array_row_iterator(nparray, nditer=False, columns=None):
     The implementation is inspired by the implementation of the pandas DataFrame.itertuple method
     """
     if columns:
-        column_info = ColumnInfo(columns)
+        column_info = ColumnInfo(columns, [nparray.dtype])
     else:
-        column_info = ColumnInfo(["array"])
+        column_info = ColumnInfo(["array"], [nparray.dtype])
     if nditer is True:
         numpy_iterator = numpy.nditer(nparray, ["refs_ok"])
     else:
@@ -165,18 +196,18 @@ def get_list_row_iterator(list_data, columns=None):
     return column_info, map(tuple, zip(numpy_iterator))
 
 
-def get_csr_row_iterator(csr, columns=None):
+def get_csr_row_iterator(csr, columns=None, rows_per_chunk=CSR_ROWS_PER_CHUNK):
     """
-    Create an efficient iterator for csr rows.
-    The implementation is inspired by the implementation of the pandas DataFrame.itertuple method
+    Create an efficient iterator for csr rows. The rows get densified in chunks, so the memory we need does not
+    depend on the number of rows. Batch visits get the csr_matrix itself, the ColumnInfo marks it as sparse.
     """
-    # TODO: Maybe there is a way to use sparse rows that is faster
-    #  However, this is the fastest way I discovered so far
-    np_array = csr.toarray()
     if columns:
-        column_info = ColumnInfo(columns)
+        column_info = ColumnInfo(columns, [csr.dtype], True)
     else:
-        column_info = ColumnInfo(["array"])
-    numpy_iterator = np_array.__iter__()
+        column_info = ColumnInfo(["array"], [csr.dtype], True)
 
-    return column_info, map(tuple, zip(numpy_iterator))
+    def dense_rows():
+        for chunk_start in range(0, csr.shape[0], rows_per_chunk):
+            yield from csr[chunk_start:chunk_start + rows_per_chunk].toarray()
+
+    return column_info, map(tuple, zip(dense_rows()))
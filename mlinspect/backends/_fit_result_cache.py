@@ -0,0 +1,214 @@
+"""
+A content-addressed cache for fitted transformers and estimators and their fit_transform outputs, similar to
+joblib.Memory, so re-inspecting a pipeline with different inspections does not need to train everything again
+"""
+import dataclasses
+import numbers
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+import joblib
+from pandas import DataFrame, Series
+
+from .._version import __version__
+
+
+@dataclasses.dataclass(frozen=True)
+class FitResultCacheStats:
+    """
+    Cache hit and miss statistics of a FitResultCache
+    """
+    hits: int
+    misses: int
+
+
+class FitResultCache:
+    """
+    Stores pickled fitted estimators together with their fit_transform outputs, keyed by the estimator class, its
+    get_params() and a fingerprint of X and y. Each hit unpickles fresh copies, so pipelines never share fitted
+    estimators or output arrays. Estimators without an integer random_state do not get cached, their fit results
+    depend on random number generator states that a cache hit would neither use nor advance. The last
+    max_memory_entries entries are kept in memory and, with a cache_dir, all entries on disk.
+    """
+
+    def __init__(self, cache_dir: str or None = None, max_memory_entries: int = 64):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.lock = threading.Lock()
+        self.key_to_entry = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_key(estimator, X, y) -> str or None:
+        """
+        The content hash of the estimator configuration and the training data. None if some part can not be
+        hashed, e.g., parameters that can not be pickled, or if the estimator is not seeded with an integer.
+        """
+        # pylint: disable=invalid-name
+        try:
+            if has_unseeded_random_state(estimator):
+                return None
+            return joblib.hash((__version__, get_params_fingerprint(estimator), get_data_fingerprint(X),
+                                get_data_fingerprint(y)))
+        except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+            return None
+
+    def load(self, key: str or None):
+        """
+        Load the fitted estimator and the fit_transform output. Returns None on cache misses.
+        """
+        cache_entry = self.load_entry(key) if key is not None else None
+        with self.lock:
+            if cache_entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return cache_entry
+
+    def load_entry(self, key):
+        """
+        Unpickle the entry from memory or from the cache_dir, None if there is no valid entry
+        """
+        with self.lock:
+            entry = self.key_to_entry.get(key)
+            if entry is not None:
+                self.key_to_entry.move_to_end(key)
+        try:
+            if entry is None and self.cache_dir is not None:
+                with open(self.get_cache_file_path(key), "rb") as file:
+                    entry = file.read()
+            if entry is None:
+                return None
+            fitted_estimator, result = pickle.loads(entry)
+        except (OSError, EOFError, ValueError, TypeError, AttributeError, ImportError, pickle.UnpicklingError):
+            return None
+        return fitted_estimator, result
+
+    def store(self, key: str or None, fitted_estimator, result=None):
+        """
+        Store the fitted estimator and the fit_transform output. Estimators that can not be pickled, e.g., some
+        Keras models, do not get cached, failing to write the cache is not an error.
+        """
+        if key is None:
+            return
+        try:
+            entry = pickle.dumps((fitted_estimator, result), protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+            return
+        with self.lock:
+            self.key_to_entry[key] = entry
+            self.key_to_entry.move_to_end(key)
+            while len(self.key_to_entry) > self.max_memory_entries:
+                self.key_to_entry.popitem(last=False)
+        if self.cache_dir is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temporary file first so concurrent runs never read partially written entries
+            file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(entry)
+            os.replace(temp_path, self.get_cache_file_path(key))
+        except OSError:
+            pass
+
+    def get_stats(self) -> FitResultCacheStats:
+        """
+        Get the hit and miss statistics so far
+        """
+        return FitResultCacheStats(self.hits, self.misses)
+
+    def get_cache_file_path(self, key):
+        """
+        The file of an entry in the cache_dir
+        """
+        return os.path.join(self.cache_dir, "{}.pickle".format(key))
+
+    def __deepcopy__(self, memo):
+        # Estimator wrappers get cloned with deep copies of their parameters, the clones need to share the cache
+        return self
+
+    def __copy__(self):
+        return self
+
+    def __getstate__(self):
+        # Pipeline checkpoints and worker processes should not get copies of all entries, the copies only share
+        # the entries on disk
+        return self.cache_dir, self.max_memory_entries
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+
+def get_params_fingerprint(estimator):
+    """
+    The class and the parameters of an estimator. Nested estimators like the steps of a Pipeline get their own
+    fingerprints, and our wrappers of them only contribute the estimator they wrap, not the inspections and the
+    annotations they carry.
+    """
+    # pylint: disable=import-outside-toplevel, cyclic-import
+    from ._sklearn_backend_transformer_wrapper import MlinspectEstimatorTransformer
+
+    if isinstance(estimator, MlinspectEstimatorTransformer):
+        estimator = estimator.transformer
+    if isinstance(estimator, (list, tuple)):
+        return [get_params_fingerprint(item) for item in estimator]
+    if isinstance(estimator, dict):
+        return {key: get_params_fingerprint(value) for key, value in estimator.items()}
+    if isinstance(estimator, type) or not hasattr(estimator, "get_params"):
+        return estimator
+    estimator_class = type(estimator)
+    params = estimator.get_params(deep=False)
+    return estimator_class.__module__, estimator_class.__qualname__, get_params_fingerprint(params)
+
+
+def has_unseeded_random_state(estimator) -> bool:
+    """
+    Whether an estimator or one of its nested estimators has a random_state parameter that is not an integer. With
+    None or a RandomState instance, fitting uses and advances shared random number generator states.
+    """
+    # pylint: disable=import-outside-toplevel, cyclic-import
+    from ._sklearn_backend_transformer_wrapper import MlinspectEstimatorTransformer
+
+    if isinstance(estimator, MlinspectEstimatorTransformer):
+        estimator = estimator.transformer
+    if isinstance(estimator, (list, tuple)):
+        return any(has_unseeded_random_state(item) for item in estimator)
+    if isinstance(estimator, dict):
+        return any(has_unseeded_random_state(value) for value in estimator.values())
+    if isinstance(estimator, type) or not hasattr(estimator, "get_params"):
+        return False
+    params = estimator.get_params(deep=False)
+    if "random_state" in params and not isinstance(params["random_state"], numbers.Integral):
+        return True
+    return has_unseeded_random_state(params)
+
+
+def get_data_fingerprint(data):
+    """
+    The plain data of the training data and labels, without the backend our data frames know
+    """
+    if isinstance(data, DataFrame):
+        return list(data.columns), [column.to_numpy() for _, column in data.items()]
+    if isinstance(data, Series):
+        return data.name, data.to_numpy()
+    return data
+
+
+def get_pipeline_memory_fit_result_cache(memory, fit_result_cache: FitResultCache or None) \
+        -> FitResultCache or None:
+    """
+    The cache for the steps of a sklearn Pipeline(memory=...). Pipelines with a memory location store the fit
+    results of their steps in an mlinspect directory next to the joblib cache.
+    """
+    location = getattr(memory, "location", memory)
+    if not isinstance(location, str):
+        return fit_result_cache
+    cache_dir = os.path.join(location, "mlinspect")
+    if fit_result_cache is not None and fit_result_cache.cache_dir == cache_dir:
+        return fit_result_cache
+    return FitResultCache(cache_dir)
@@ -1,175 +1,252 @@
 """
 Functions to create the iterators for the inspections
 """
-import itertools
-
 import pandas
 
-from mlinspect.backends._backend_utils import get_df_row_iterator, get_iterator_for_type, get_annotation_rows
+from mlinspect.backends._backend_utils import get_df_row_iterator, get_iterator_for_type, \
+    get_gathered_df_row_iterator, get_gathered_df_view, get_columns_df_view
 from mlinspect.inspections._inspection_input import InspectionInputDataSource, InspectionInputUnaryOperator, \
     InspectionInputNAryOperator, InspectionInputSinkOperator, InspectionRowDataSource, InspectionRowUnaryOperator, \
-    InspectionRowNAryOperator, ColumnInfo, InspectionRowSinkOperator
+    InspectionRowNAryOperator, InspectionRowSinkOperator, InspectionBatchDataSource, ColumnInfo, \
+    InspectionBatchUnaryOperator, InspectionBatchNAryOperator, InspectionBatchSinkOperator, \
+    InspectionPassThroughUnaryOperator
+from mlinspect.backends._row_fan_out import RowFanOut
+
+
+def get_row_and_batch_inspection_indexes(inspections):
+    """
+    Split the inspections into the ones we visit row by row and the ones that implement visit_operator_batch
+    """
+    row_indexes = []
+    batch_indexes = []
+    for inspection_index, inspection in enumerate(inspections):
+        if inspection.supports_batch_visits:
+            batch_indexes.append(inspection_index)
+        else:
+            row_indexes.append(inspection_index)
+    return row_indexes, batch_indexes
 
 
-def iter_input_data_source(inspection_count, output, operator_context):
+def get_pass_through_inspection_indexes(inspections, operator_context):
+    """
+    Get the inspections that pass the annotations of the input rows through for some operator without changing
+    the rows
+    """
+    return [inspection_index for inspection_index, inspection in enumerate(inspections)
+            if inspection.passes_annotations_through(operator_context)]
+
+
+def iter_input_data_source(inspections, output, operator_context):
     """
     Create an efficient iterator for the inspection input for operators with no parent: Data Source
     """
-    if inspection_count == 0:
+    if not inspections:
         return []
+    row_indexes, batch_indexes = get_row_and_batch_inspection_indexes(inspections)
     output_columns, output_rows = get_df_row_iterator(output)
-    duplicated_output_iterators = itertools.tee(output_rows, inspection_count)
-    inspection_iterators = []
-    for inspection_index in range(inspection_count):
-        output_iterator = duplicated_output_iterators[inspection_index]
-        row_iterator = map(InspectionRowDataSource, output_iterator)
+    output_fan_out = RowFanOut(output_rows, len(row_indexes))
+    inspection_iterators = [None] * len(inspections)
+    for inspection_index in row_indexes:
+        row_iterator = map(InspectionRowDataSource, output_fan_out.get_row_iterator())
         inspection_iterator = InspectionInputDataSource(operator_context, output_columns, row_iterator)
-        inspection_iterators.append(inspection_iterator)
+        inspection_iterators[inspection_index] = inspection_iterator
+    for inspection_index in batch_indexes:
+        inspection_iterators[inspection_index] = InspectionBatchDataSource(operator_context, output_columns, output)
 
     return inspection_iterators
 
 
-def iter_input_annotation_output_map(inspection_count, input_data, input_annotations, output, operator_context,
+def iter_input_annotation_output_map(inspections, input_data, input_annotations, output, operator_context,
                                      columns=None):
     """
     Create an efficient iterator for the inspection input for operators with one parent that do not
-    change the row order.
+    change the row order. Inspections that pass the annotations through get no row iterator.
     """
     # pylint: disable=too-many-locals, too-many-arguments
-    if inspection_count == 0:
+    if not inspections:
         return []
+    pass_through_indexes = get_pass_through_inspection_indexes(inspections, operator_context)
+    row_indexes, batch_indexes = get_row_and_batch_inspection_indexes(inspections)
+    row_indexes = [index for index in row_indexes if index not in pass_through_indexes]
+    batch_indexes = [index for index in batch_indexes if index not in pass_through_indexes]
 
     input_columns, input_rows = get_iterator_for_type(input_data, True)
     output_columns, output_rows = get_iterator_for_type(output, False, columns)
-    duplicated_input_iterators = itertools.tee(input_rows, inspection_count)
-    duplicated_output_iterators = itertools.tee(output_rows, inspection_count)
-
-    inspection_iterators = []
-    for inspection_index in range(inspection_count):
-        input_iterator = duplicated_input_iterators[inspection_index]
-        output_iterator = duplicated_output_iterators[inspection_index]
-        annotation_rows = get_annotation_rows(input_annotations, inspection_index)
-        row_iterator = map(lambda input_tuple: InspectionRowUnaryOperator(*input_tuple),
-                           zip(input_iterator, annotation_rows, output_iterator))
+    input_fan_out = RowFanOut(input_rows, len(row_indexes))
+    output_fan_out = RowFanOut(output_rows, len(row_indexes))
+
+    inspection_iterators = [None] * len(inspections)
+    for inspection_index in row_indexes:
+        annotation_rows = input_annotations.get_rows(inspection_index)
+        row_iterator = map(InspectionRowUnaryOperator, input_fan_out.get_row_iterator(), annotation_rows,
+                           output_fan_out.get_row_iterator())
         inspection_iterator = InspectionInputUnaryOperator(operator_context, input_columns, output_columns,
                                                            row_iterator)
-        inspection_iterators.append(inspection_iterator)
+        inspection_iterators[inspection_index] = inspection_iterator
+    for inspection_index in batch_indexes:
+        inspection_iterators[inspection_index] = InspectionBatchUnaryOperator(
+            operator_context, input_columns, output_columns, input_data,
+            input_annotations.get_array(inspection_index), output)
+    for inspection_index in pass_through_indexes:
+        inspection_iterators[inspection_index] = InspectionPassThroughUnaryOperator(
+            operator_context, input_columns, output_columns, len(input_annotations), output,
+            input_annotations.buffers[inspection_index])
 
     return inspection_iterators
 
 
-def iter_input_annotation_output_resampled(inspection_count, input_data, input_annotations, output, operator_context):
+def iter_input_annotation_output_projections(inspections, input_data, input_annotations, column_names,
+                                              operator_context):
+    """
+    Create efficient iterators for the projections of a ColumnTransformer to single columns of the same input
+    data frame, one list of inspection iterators for each projection. The columns of the input get read once for
+    all projections, the projections then get visited one after another with rows of these buffered columns. The
+    output rows are the values of the input rows in the projected column. Batch visits get views of the columns
+    instead of copies.
+    """
+    # pylint: disable=too-many-locals
+    if not inspections:
+        return [[] for _ in column_names]
+    pass_through_indexes = get_pass_through_inspection_indexes(inspections, operator_context)
+    row_indexes, batch_indexes = get_row_and_batch_inspection_indexes(inspections)
+    row_indexes = [index for index in row_indexes if index not in pass_through_indexes]
+    batch_indexes = [index for index in batch_indexes if index not in pass_through_indexes]
+
+    input_columns = ColumnInfo(list(input_data.columns.values), list(input_data.dtypes))
+    # Lists of the column values are much smaller than a tuple for each row
+    input_column_values = []
+    if row_indexes:
+        input_column_values = [list(input_data.iloc[:, index]) for index in range(len(input_data.columns))]
+
+    projections_inspection_iterators = []
+    for column_name in column_names:
+        column_index = input_data.columns.get_loc(column_name)
+        column = input_data.iloc[:, column_index]
+        output = get_columns_df_view([column], [column_name], input_data.index)
+        output_columns = ColumnInfo([column_name], [column.dtype])
+        inspection_iterators = [None] * len(inspections)
+        input_fan_out = RowFanOut(zip(*input_column_values), len(row_indexes))
+        for inspection_index in row_indexes:
+            row_iterator = iter_projection_rows(input_fan_out.get_row_iterator(),
+                                                input_annotations.get_rows(inspection_index), column_index)
+            inspection_iterators[inspection_index] = InspectionInputUnaryOperator(
+                operator_context, input_columns, output_columns, row_iterator)
+        for inspection_index in batch_indexes:
+            inspection_iterators[inspection_index] = InspectionBatchUnaryOperator(
+                operator_context, input_columns, output_columns, input_data,
+                input_annotations.get_array(inspection_index), output)
+        for inspection_index in pass_through_indexes:
+            inspection_iterators[inspection_index] = InspectionPassThroughUnaryOperator(
+                operator_context, input_columns, output_columns, len(input_annotations), output,
+                input_annotations.buffers[inspection_index])
+        projections_inspection_iterators.append(inspection_iterators)
+
+    return projections_inspection_iterators
+
+
+def iter_projection_rows(input_rows, annotation_rows, column_index):
+    """
+    The rows of a projection to a single column, the output row is the value of the input row in the column
+    """
+    for input_row, annotation in zip(input_rows, annotation_rows):
+        yield InspectionRowUnaryOperator(input_row, annotation, (input_row[column_index],))
+
+
+def iter_input_annotation_output_resampled(inspections, input_data, input_annotations, input_positions, output,
+                                           operator_context):
     """
     Create an efficient iterator for the inspection input for operators with one parent that do change the
-    row order or drop some rows, like selections.
+    row order or drop some rows, like selections. The input positions are the positions of the input rows for each
+    output row, so we can gather the input rows and annotations without joins.
     """
     # pylint: disable=too-many-locals, too-many-arguments
-    if inspection_count == 0:
+    if not inspections:
         return []
-
-    data_before_with_annotations = pandas.concat([input_data.reset_index(drop=True), input_annotations], axis=1)
-    joined_df = pandas.merge(data_before_with_annotations, output, left_on="mlinspect_index",
-                             right_on="mlinspect_index")
-
-    column_index_input_end = len(input_data.columns)
-    input_df_view = joined_df.iloc[:, 0:column_index_input_end - 1]
-    input_df_view.columns = input_data.columns[0:-1]
-    input_columns, input_rows = get_df_row_iterator(input_df_view)
-    duplicated_input_iterators = itertools.tee(input_rows, inspection_count)
-
-    column_index_annotation_end = column_index_input_end + inspection_count
-    output_df_view = joined_df.iloc[:, column_index_annotation_end:]
-    output_df_view.columns = output.columns[0:-1]
-    output_columns, output_rows = get_df_row_iterator(output_df_view)
-    duplicated_output_iterators = itertools.tee(output_rows, inspection_count)
-
-    inspection_iterators = []
-    for inspection_index in range(inspection_count):
-        input_iterator = duplicated_input_iterators[inspection_index]
-        output_iterator = duplicated_output_iterators[inspection_index]
-        column_annotation_current_inspection = column_index_input_end + inspection_index
-        annotation_rows = get_annotation_rows(joined_df, column_annotation_current_inspection)
-        row_iterator = map(lambda input_tuple: InspectionRowUnaryOperator(*input_tuple),
-                           zip(input_iterator, annotation_rows, output_iterator))
+    row_indexes, batch_indexes = get_row_and_batch_inspection_indexes(inspections)
+
+    input_column_indexes = range(len(input_data.columns))
+    input_columns, input_rows = get_gathered_df_row_iterator(input_data, input_column_indexes, input_positions)
+    input_fan_out = RowFanOut(input_rows, len(row_indexes))
+    annotations = input_annotations.take(input_positions)
+
+    output_column_indexes = range(len(output.columns))
+    output_columns, output_rows = get_gathered_df_row_iterator(output, output_column_indexes)
+    output_fan_out = RowFanOut(output_rows, len(row_indexes))
+
+    inspection_iterators = [None] * len(inspections)
+    for inspection_index in row_indexes:
+        annotation_rows = annotations.get_rows(inspection_index)
+        row_iterator = map(InspectionRowUnaryOperator, input_fan_out.get_row_iterator(), annotation_rows,
+                           output_fan_out.get_row_iterator())
         inspection_iterator = InspectionInputUnaryOperator(operator_context, input_columns, output_columns,
                                                            row_iterator)
-        inspection_iterators.append(inspection_iterator)
+        inspection_iterators[inspection_index] = inspection_iterator
+    if batch_indexes:
+        input_df_view = get_gathered_df_view(input_data, input_column_indexes, input_positions)
+    for inspection_index in batch_indexes:
+        inspection_iterators[inspection_index] = InspectionBatchUnaryOperator(
+            operator_context, input_columns, output_columns, input_df_view,
+            annotations.get_array(inspection_index), output)
 
     return inspection_iterators
 
 
-def iter_input_annotation_output_join(inspection_count, x_data, x_annotations, y_data,
-                                      y_annotations, output, operator_context):
+def iter_input_annotation_output_join(inspections, x_data, x_annotations, x_positions, y_data, y_annotations,
+                                      y_positions, output, operator_context):
     """
-    Create an efficient iterator for the inspection input for join operators.
+    Create an efficient iterator for the inspection input for join operators. The x and y positions are the
+    positions of the input rows for each output row, so we can gather the input rows and annotations without joins.
     """
     # pylint: disable=too-many-locals, too-many-arguments
-    if inspection_count == 0:
+    if not inspections:
         return []
+    row_indexes, batch_indexes = get_row_and_batch_inspection_indexes(inspections)
 
-    x_before_with_annotations = pandas.concat([x_data.reset_index(drop=True), x_annotations], axis=1)
-    y_before_with_annotations = pandas.concat([y_data.reset_index(drop=True), y_annotations], axis=1)
-    df_x_output = pandas.merge(x_before_with_annotations, output, left_on="mlinspect_index_x",
-                               right_on="mlinspect_index_x", suffixes=["_x", "_output"])
-    df_x_output_y = pandas.merge(df_x_output, y_before_with_annotations, left_on="mlinspect_index_y",
-                                 right_on="mlinspect_index_y", suffixes=["_x_output", "_y_output"])
-
-    column_index_x_end = len(x_data.columns)
-
-    column_index_output_start = column_index_x_end + inspection_count
-    column_index_y_start = column_index_output_start + len(output.columns) - 2
-    column_index_y_end = column_index_y_start + len(y_data.columns) - 1
-
-    df_x_output_y = df_x_output_y.drop('mlinspect_index_y', axis=1)
-
-    input_x_view = df_x_output_y.iloc[:, 0:column_index_x_end - 1]
-    input_x_view.columns = x_data.columns[0:-1]
-    input_y_view = df_x_output_y.iloc[:, column_index_y_start:column_index_y_end]
-    input_y_view.columns = y_data.columns[0:-1]
-    input_x_columns, input_x_iterator = get_df_row_iterator(input_x_view)
-    assert isinstance(input_x_columns, ColumnInfo)
-    input_y_columns, input_y_iterator = get_df_row_iterator(input_y_view)
-    assert isinstance(input_y_columns, ColumnInfo)
+    x_column_indexes = range(len(x_data.columns))
+    y_column_indexes = range(len(y_data.columns))
+    input_x_columns, input_x_iterator = get_gathered_df_row_iterator(x_data, x_column_indexes, x_positions)
+    input_y_columns, input_y_iterator = get_gathered_df_row_iterator(y_data, y_column_indexes, y_positions)
     input_rows = map(tuple, zip(input_x_iterator, input_y_iterator))
     inputs_columns = [input_x_columns, input_y_columns]
-    duplicated_input_iterators = itertools.tee(input_rows, inspection_count)
-
-    output_df_view = df_x_output_y.iloc[:, column_index_output_start:column_index_y_start]
-    output_df_view.columns = [column for column in output.columns if
-                              (column not in ("mlinspect_index_x", "mlinspect_index_y"))]
-    output_columns, output_rows = get_df_row_iterator(output_df_view)
-    duplicated_output_iterators = itertools.tee(output_rows, inspection_count)
-
-    inspection_iterators = []
-    for inspection_index in range(inspection_count):
-        input_iterator = duplicated_input_iterators[inspection_index]
-        output_iterator = duplicated_output_iterators[inspection_index]
-
-        column_annotation_y_current_inspection = column_index_y_end + inspection_index
-        column_annotation_x_current_inspection = column_index_x_end + inspection_index
-        annotation_iterators = [get_annotation_rows(df_x_output_y, column_annotation_x_current_inspection),
-                                get_annotation_rows(df_x_output_y, column_annotation_y_current_inspection)]
-
-        annotation_rows = map(tuple, zip(*annotation_iterators))
-
-        row_iterator = map(lambda input_tuple: InspectionRowNAryOperator(*input_tuple),
-                           zip(input_iterator, annotation_rows, output_iterator))
+    input_fan_out = RowFanOut(input_rows, len(row_indexes))
+    annotations_x = x_annotations.take(x_positions)
+    annotations_y = y_annotations.take(y_positions)
+
+    output_column_indexes = range(len(output.columns))
+    output_columns, output_rows = get_gathered_df_row_iterator(output, output_column_indexes)
+    output_fan_out = RowFanOut(output_rows, len(row_indexes))
+
+    inspection_iterators = [None] * len(inspections)
+    for inspection_index in row_indexes:
+        annotation_rows = zip(annotations_x.get_rows(inspection_index),
+                              annotations_y.get_rows(inspection_index))
+        row_iterator = map(InspectionRowNAryOperator, input_fan_out.get_row_iterator(), annotation_rows,
+                           output_fan_out.get_row_iterator())
         inspection_iterator = InspectionInputNAryOperator(operator_context, inputs_columns,
                                                           output_columns, row_iterator)
-        inspection_iterators.append(inspection_iterator)
+        inspection_iterators[inspection_index] = inspection_iterator
+    if batch_indexes:
+        inputs = [get_gathered_df_view(x_data, x_column_indexes, x_positions),
+                  get_gathered_df_view(y_data, y_column_indexes, y_positions)]
+    for inspection_index in batch_indexes:
+        annotation_arrays = [annotations_x.get_array(inspection_index),
+                             annotations_y.get_array(inspection_index)]
+        inspection_iterators[inspection_index] = InspectionBatchNAryOperator(
+            operator_context, inputs_columns, output_columns, inputs, annotation_arrays, output)
 
     return inspection_iterators
 
 
-def iter_input_annotation_output_nary_op(inspection_count, transformer_data_with_annotations, output_data,
+def iter_input_annotation_output_nary_op(inspections, transformer_data_with_annotations, output_data,
                                          operator_context):
     """
     Create an efficient iterator for the inspection input for operators with multiple parents that do
     not change the order of rows or remove rows: concatenations.
     """
     # pylint: disable=too-many-locals
-    if inspection_count == 0:
+    if not inspections:
         return []
+    row_indexes, batch_indexes = get_row_and_batch_inspection_indexes(inspections)
 
     input_iterators = []
     inputs_columns = []
@@ -178,51 +255,84 @@ def iter_input_annotation_output_nary_op(inspection_count, transformer_data_with
         inputs_columns.append(column_info)
         input_iterators.append(row_iterator)
     input_rows = map(list, zip(*input_iterators))
-    duplicated_input_iterators = itertools.tee(input_rows, inspection_count)
+    input_fan_out = RowFanOut(input_rows, len(row_indexes))
 
     output_columns, output_rows = get_iterator_for_type(output_data, False)
-    duplicated_output_iterators = itertools.tee(output_rows, inspection_count)
+    output_fan_out = RowFanOut(output_rows, len(row_indexes))
 
-    inspection_iterators = []
-    for inspection_index in range(inspection_count):
+    inspection_iterators = [None] * len(inspections)
+    for inspection_index in row_indexes:
         annotation_iterators = []
         for _, annotations in transformer_data_with_annotations:
-            annotation_iterators.append(get_annotation_rows(annotations, inspection_index))
+            annotation_iterators.append(annotations.get_rows(inspection_index))
         annotation_rows = map(list, zip(*annotation_iterators))
-        input_iterator = duplicated_input_iterators[inspection_index]
-        output_iterator = duplicated_output_iterators[inspection_index]
-        row_iterator = map(lambda input_tuple: InspectionRowNAryOperator(*input_tuple),
-                           zip(input_iterator, annotation_rows, output_iterator))
+        row_iterator = map(InspectionRowNAryOperator, input_fan_out.get_row_iterator(), annotation_rows,
+                           output_fan_out.get_row_iterator())
         inspection_iterator = InspectionInputNAryOperator(operator_context, inputs_columns,
                                                           output_columns, row_iterator)
-        inspection_iterators.append(inspection_iterator)
+        inspection_iterators[inspection_index] = inspection_iterator
+    for inspection_index in batch_indexes:
+        inputs = [input_data for input_data, _ in transformer_data_with_annotations]
+        annotation_arrays = [annotations.get_array(inspection_index)
+                             for _, annotations in transformer_data_with_annotations]
+        inspection_iterators[inspection_index] = InspectionBatchNAryOperator(
+            operator_context, inputs_columns, output_columns, inputs, annotation_arrays, output_data)
 
     return inspection_iterators
 
 
-def iter_input_annotation_output_sink_op(inspection_count, data, target, operator_context):
+def iter_input_annotation_output_sink_op(inspections, data, data_annotations, target, target_annotations,
+                                         operator_context):
     """
     Create an efficient iterator for the inspection input when there is no output, e.g., estimators.
     """
-    # pylint: disable=too-many-locals
-    if inspection_count == 0:
+    # pylint: disable=too-many-locals, too-many-arguments
+    if not inspections:
         return []
+    row_indexes, batch_indexes = get_row_and_batch_inspection_indexes(inspections)
+    # Only inspections that ask for the rows get them, the others get the whole arrays like batch visits
+    batch_indexes.extend(index for index in row_indexes if not inspections[index].visits_sink_rows(operator_context))
+    row_indexes = [index for index in row_indexes if inspections[index].visits_sink_rows(operator_context)]
 
     input_data_columns, input_data_iterators = get_iterator_for_type(data, False)
     input_target_columns, input_target_iterators = get_iterator_for_type(target, True)
     inputs_columns = [input_data_columns, input_target_columns]
-    input_rows = map(tuple, zip(input_data_iterators, input_target_iterators))
-    duplicated_input_iterators = itertools.tee(input_rows, inspection_count)
-
-    inspection_iterators = []
-    for inspection_index in range(inspection_count):
-        input_iterator = duplicated_input_iterators[inspection_index]
-        annotation_iterators = [get_annotation_rows(data.annotations, inspection_index),
-                                get_annotation_rows(target.annotations, inspection_index)]
-        annotation_rows = map(tuple, zip(*annotation_iterators))
-        row_iterator = map(lambda input_tuple: InspectionRowSinkOperator(*input_tuple),
-                           zip(input_iterator, annotation_rows))
+    input_fan_out = None
+    if row_indexes:
+        input_rows = map(tuple, zip(input_data_iterators, input_target_iterators))
+        input_fan_out = RowFanOut(input_rows, len(row_indexes))
+
+    inspection_iterators = [None] * len(inspections)
+    for inspection_index in row_indexes:
+        annotation_rows = zip(data_annotations.get_rows(inspection_index),
+                              target_annotations.get_rows(inspection_index))
+        row_iterator = map(InspectionRowSinkOperator, input_fan_out.get_row_iterator(), annotation_rows)
         inspection_iterator = InspectionInputSinkOperator(operator_context, inputs_columns, row_iterator)
-        inspection_iterators.append(inspection_iterator)
+        inspection_iterators[inspection_index] = inspection_iterator
+    for inspection_index in batch_indexes:
+        annotation_arrays = [data_annotations.get_array(inspection_index),
+                             target_annotations.get_array(inspection_index)]
+        inspection_iterators[inspection_index] = InspectionBatchSinkOperator(
+            operator_context, inputs_columns, [data, target], annotation_arrays)
 
     return inspection_iterators
+
+
+def visit_operator(inspection, inspection_input):
+    """
+    Visit an operator with the row iterator or the column-oriented blocks we created for the inspection. Returns
+    the annotations for the rows.
+    """
+    if isinstance(inspection_input, InspectionPassThroughUnaryOperator):
+        inspection.visit_operator_pass_through(inspection_input)
+        return inspection_input.annotation_rows
+    if isinstance(inspection_input, InspectionBatchSinkOperator) and not inspection.supports_batch_visits:
+        inspection.visit_operator_sink(inspection_input)
+        return ()
+    if isinstance(inspection_input, (InspectionBatchDataSource, InspectionBatchUnaryOperator,
+                                     InspectionBatchNAryOperator, InspectionBatchSinkOperator)):
+        annotations = inspection.visit_operator_batch(inspection_input)
+        if isinstance(annotations, pandas.Series):
+            annotations = annotations.to_numpy()
+        return annotations
+    return inspection.visit_operator(inspection_input)
@@ -1,29 +1,32 @@
 """
 The pandas backend
 """
+import inspect
 import os
 from collections import namedtuple
 
 import networkx
-from pandas import DataFrame, Series
+from pandas import DataFrame, Series, RangeIndex
+from pandas.api.types import is_hashable, is_bool_dtype
 from pandas.core.groupby import DataFrameGroupBy
 import numpy
 
 from ._backend import Backend
-from ._backend_utils import build_annotation_df_from_iters, \
-    create_wrapper_with_annotations
+from ._annotation_store import AnnotationStore
+from ._backend_utils import store_annotations, get_row_positions, get_columns_df_view, get_frame_with_backend
 from ._iter_creation import iter_input_data_source, iter_input_annotation_output_resampled, \
-    iter_input_annotation_output_map, iter_input_annotation_output_join
-from ._pandas_backend_frame_wrapper import MlinspectDataFrame, MlinspectSeries
+    iter_input_annotation_output_map, iter_input_annotation_output_join, visit_operator
 from ._pandas_wir_processor import PandasWirProcessor
 from ..inspections._inspection_input import OperatorContext
 from ..instrumentation._dag_node import OperatorType, DagNodeIdentifier
+from ..instrumentation._operator_scope import is_in_operator_scope, skips_inspection_visits
 
 
 class PandasBackend(Backend):
     """
     The pandas backend
     """
+    # pylint: disable=too-many-instance-attributes
 
     operator_map = {
         ('pandas.io.parsers', 'read_csv'): OperatorType.DATA_SOURCE,
@@ -52,8 +55,11 @@ class PandasBackend(Backend):
         super().__init__()
         self.input_data = []
         self.df_arg = None
+        self.call_args = None
+        self.call_kwargs = None
         self.set_key_info = None
         self.select = False
+        self.select_condition = None
         self.code_reference_to_set_item_op = {}
 
     def is_responsible_for_call(self, function_info, function_prefix, value=None):
@@ -61,6 +67,10 @@ class PandasBackend(Backend):
         function_info = self.replace_wrapper_modules(function_info)
         return function_info in self.operator_map or function_prefix == "pandas"
 
+    def is_responsible_for_value(self, value):
+        """Checks whether the backend would be responsible for calls returning this value"""
+        return isinstance(value, (DataFrame, Series)) or type(value).__module__.split(".", 1)[0] == "pandas"
+
     def process_wir(self, wir: networkx.DiGraph) -> networkx.DiGraph:
         """
         Special handling to differentiate projections and selections
@@ -73,18 +83,11 @@ class PandasBackend(Backend):
         """The value or module a function may be called on"""
         # pylint: disable=too-many-arguments
         function_info = self.replace_wrapper_modules(function_info)
-        if function_info == ('pandas.core.frame', 'dropna'):
-            assert isinstance(value_value, MlinspectDataFrame)
-            value_value['mlinspect_index'] = range(0, len(value_value))
-        elif function_info == ('pandas.core.frame', '__getitem__'):
-            # Can also be a select, but we do only need an index in some cases
-            pass
+        if function_info in {('pandas.core.frame', 'dropna'), ('pandas.core.frame', 'merge')}:
+            assert isinstance(value_value, DataFrame)
         elif function_info == ('pandas.core.groupby.generic', 'agg'):
             description = value_value.name
             self.code_reference_to_description[code_reference] = description
-        elif function_info == ('pandas.core.frame', 'merge'):
-            assert isinstance(value_value, MlinspectDataFrame)
-            value_value['mlinspect_index_x'] = range(0, len(value_value))
         self.input_data.append(value_value)
 
     def before_call_used_args(self, function_info, subscript, call_code, args_code, code_reference, store, args_values):
@@ -96,13 +99,15 @@ class PandasBackend(Backend):
             self.code_reference_to_code[code_reference] = call_code
 
         if function_info == ('pandas.core.frame', 'merge'):
-            assert isinstance(args_values[0], MlinspectDataFrame)
-            args_values[0]['mlinspect_index_y'] = range(0, len(args_values[0]))
+            assert isinstance(args_values[0], DataFrame)
             self.df_arg = args_values[0]
-        elif function_info == ('pandas.core.frame', '__getitem__') and isinstance(args_values, MlinspectSeries):
+            self.call_args = args_values[1:]
+        elif function_info == ('pandas.core.frame', 'dropna'):
+            self.call_args = args_values
+        elif function_info == ('pandas.core.frame', '__getitem__') and is_selection_condition(args_values):
             self.select = True
-            assert isinstance(self.input_data[-1], MlinspectDataFrame)
-            self.input_data[-1]['mlinspect_index'] = range(0, len(self.input_data[-1]))
+            self.select_condition = args_values
+            assert isinstance(self.input_data[-1], DataFrame)
         self.before_call_used_args_add_description(args_values, code_reference, function_info, args_code)
 
     def before_call_used_args_add_description(self, args_values, code_reference, function_info, args_code):
@@ -115,7 +120,7 @@ class PandasBackend(Backend):
         elif function_info == ('pandas.core.frame', 'dropna'):
             description = "dropna"
         elif function_info == ('pandas.core.frame', '__getitem__'):
-            if isinstance(args_values, MlinspectSeries):
+            if is_selection_condition(args_values):
                 self.code_reference_to_set_item_op[code_reference] = 'Selection'
                 description = "Select by series: \"{}\"".format(args_code[0])
             elif isinstance(args_values, str):
@@ -142,6 +147,8 @@ class PandasBackend(Backend):
         # pylint: disable=too-many-arguments, unused-argument, no-self-use, unnecessary-pass
         function_info = self.replace_wrapper_modules(function_info)
         description = None
+        if function_info in {('pandas.core.frame', 'merge'), ('pandas.core.frame', 'dropna')}:
+            self.call_kwargs = kwargs_values
         if function_info == ('pandas.core.frame', 'merge'):
             on_column = kwargs_values['on']
             description = "on {}".format(on_column)
@@ -159,7 +166,10 @@ class PandasBackend(Backend):
         self.code_reference_to_module[code_reference] = function_info
         self.code_reference_to_code[code_reference] = call_code
 
+        if not self.inspections:
+            return self.after_call_used_dag_only(function_info, code_reference, return_value)
         if function_info in {('pandas.io.parsers', 'read_csv'), ('pandas.core.frame', 'DataFrame')}:
+            return_value = self.sample_data_source(code_reference, return_value)
             operator_context = OperatorContext(OperatorType.DATA_SOURCE, function_info)
             return_value = execute_inspection_visits_data_source(self, operator_context, code_reference,
                                                                  return_value)
@@ -169,70 +179,124 @@ class PandasBackend(Backend):
                                                                  return_value.reset_index())
         elif function_info == ('pandas.core.frame', 'dropna'):
             operator_context = OperatorContext(OperatorType.SELECTION, function_info)
+            input_positions = get_dropna_positions(self.input_data[-1], return_value, self.call_args,
+                                                   self.call_kwargs)
             return_value = execute_inspection_visits_unary_operator(self, operator_context, code_reference,
                                                                     self.input_data[-1],
-                                                                    self.input_data[-1].annotations,
+                                                                    self.get_annotations(self.input_data[-1]),
                                                                     return_value,
-                                                                    True)
-            self.input_data[-1].drop("mlinspect_index", axis=1, inplace=True)
+                                                                    input_positions)
         elif function_info == ('pandas.core.frame', '__getitem__'):
             if self.select:
                 self.select = False
                 # Gets converted to Selection later?
                 operator_context = OperatorContext(OperatorType.SELECTION, function_info)
+                input_positions = get_selection_positions(self.input_data[-1], return_value, self.select_condition)
+                self.select_condition = None
                 return_value = execute_inspection_visits_unary_operator(self, operator_context, code_reference,
                                                                         self.input_data[-1],
-                                                                        self.input_data[-1].annotations,
-                                                                        return_value,
-                                                                        True)
-                self.input_data[-1].drop("mlinspect_index", axis=1, inplace=True)
-            elif isinstance(return_value, MlinspectDataFrame):
-                operator_context = OperatorContext(OperatorType.PROJECTION, function_info)
-                return_value = execute_inspection_visits_unary_operator(self, operator_context, code_reference,
-                                                                        self.input_data[-1],
-                                                                        self.input_data[-1].annotations,
+                                                                        self.get_annotations(self.input_data[-1]),
                                                                         return_value,
-                                                                        False)
-            elif isinstance(return_value, MlinspectSeries):
+                                                                        input_positions)
+            elif isinstance(return_value, (DataFrame, Series)):
                 operator_context = OperatorContext(OperatorType.PROJECTION, function_info)
                 return_value = execute_inspection_visits_unary_operator(self, operator_context, code_reference,
                                                                         self.input_data[-1],
-                                                                        self.input_data[-1].annotations,
-                                                                        return_value,
-                                                                        False)
+                                                                        self.get_annotations(self.input_data[-1]),
+                                                                        return_value)
         elif function_info == ('pandas.core.frame', 'groupby'):
             description = self.code_reference_to_description[code_reference]
             return_value.name = description  # TODO: Do not use name here but something else to transport the value
         elif function_info == ('pandas.core.frame', 'merge'):
             operator_context = OperatorContext(OperatorType.JOIN, function_info)
+            merge_arguments, left_keys, right_keys = get_join_keys(self.input_data[-1], self.df_arg,
+                                                                   self.call_args, self.call_kwargs)
+            if self.row_sampling is not None and self.row_sampling.is_key_join(left_keys, right_keys):
+                self.key_sampled_joins.add(code_reference)
+            x_positions, y_positions = get_join_positions(self.input_data[-1], self.df_arg, merge_arguments,
+                                                          left_keys, right_keys)
             return_value = execute_inspection_visits_join(self, operator_context, code_reference,
                                                           self.input_data[-1],
-                                                          self.input_data[-1].annotations,
+                                                          self.get_annotations(self.input_data[-1]),
+                                                          x_positions,
                                                           self.df_arg,
-                                                          self.df_arg.annotations,
+                                                          self.get_annotations(self.df_arg),
+                                                          y_positions,
                                                           return_value)
-            self.input_data[-1].drop("mlinspect_index_x", axis=1, inplace=True)
-            self.df_arg.drop("mlinspect_index_y", axis=1, inplace=True)
         elif function_info == ('pandas.core.frame', 'replace'):
             operator_context = OperatorContext(OperatorType.PROJECTION_MODIFY, function_info)
             return_value = execute_inspection_visits_unary_operator(self, operator_context, code_reference,
                                                                     self.input_data[-1],
-                                                                    self.input_data[-1].annotations,
-                                                                    return_value,
-                                                                    False)
+                                                                    self.get_annotations(self.input_data[-1]),
+                                                                    return_value)
+
+        self.input_data.pop()
+        self.call_args = None
+        self.call_kwargs = None
+
+        return return_value
+
+    def after_call_used_dag_only(self, function_info, code_reference, return_value):
+        """
+        Without inspections, we only need the columns of the DAG operators. There are no row positions, visits,
+        and annotations. Data frames share their data with an MlinspectDataFrame, so we see column assignments.
+        """
+        operator_type = None
+        if function_info in {('pandas.io.parsers', 'read_csv'), ('pandas.core.frame', 'DataFrame')}:
+            return_value = self.sample_data_source(code_reference, return_value)
+            operator_type = OperatorType.DATA_SOURCE
+        elif function_info == ('pandas.core.groupby.generic', 'agg'):
+            return_value = return_value.reset_index()
+            operator_type = OperatorType.GROUP_BY_AGG
+        elif function_info == ('pandas.core.frame', 'dropna'):
+            operator_type = OperatorType.SELECTION
+        elif function_info == ('pandas.core.frame', '__getitem__'):
+            if self.select:
+                operator_type = OperatorType.SELECTION
+            elif isinstance(return_value, (DataFrame, Series)):
+                operator_type = OperatorType.PROJECTION
+        elif function_info == ('pandas.core.frame', 'groupby'):
+            return_value.name = self.code_reference_to_description[code_reference]
+        elif function_info == ('pandas.core.frame', 'merge'):
+            operator_type = OperatorType.JOIN
+        elif function_info == ('pandas.core.frame', 'replace'):
+            operator_type = OperatorType.PROJECTION_MODIFY
+        if operator_type is not None:
+            return_value = store_dag_only_outputs(self, code_reference, return_value,
+                                                  OperatorContext(operator_type, function_info))
 
         self.input_data.pop()
+        self.call_args = None
+        self.call_kwargs = None
+        self.select = False
+        self.select_condition = None
+
+        return return_value
 
+    def sample_data_source(self, code_reference, return_value):
+        """Sample the rows of a data source if we use row sampling"""
+        if self.row_sampling is not None:
+            return_value, sampling_fraction = self.row_sampling.sample(return_value, code_reference)
+            self.code_reference_to_sampling_fraction[code_reference] = sampling_fraction
         return return_value
 
-    def after_call_used_setkey(self, args_code, value_before, value_after):
-        """The value before and after some __setkey__ call"""
-        # pylint: disable=unused-argument
-        code_reference, function_info, args_code = self.set_key_info
+    def after_call_used_setkey(self, key, columns_before, column_before, value_after):
+        """
+        The value after some __setkey__ call, the columns before the call, and a copy of the column before the call
+        if the column existed. The unchanged columns are views of the columns of the value after the call.
+        """
+        code_reference, function_info, _ = self.set_key_info
+        if not self.inspections:
+            operator_context = OperatorContext(OperatorType.PROJECTION_MODIFY, function_info)
+            store_dag_only_outputs(self, code_reference, value_after, operator_context)
+            return
+        columns = [column_before if column_name == key else value_after.iloc[:, column_index]
+                   for column_index, column_name in enumerate(columns_before)]
+        value_before = get_columns_df_view(columns, columns_before, value_after.index)
         operator_context = OperatorContext(OperatorType.PROJECTION_MODIFY, function_info)
         execute_inspection_visits_unary_operator(self, operator_context, code_reference,
-                                                 value_before, value_before.annotations,
-                                                 value_after, False)
+                                                 value_before, self.get_annotations(value_after),
+                                                 value_after)
 
     def replace_wrapper_modules(self, function_info):
         """Replace the module of mlinspect wrappers with the original modules"""
@@ -242,6 +306,80 @@ class PandasBackend(Backend):
         return function_info
 
 
+def is_selection_condition(key):
+    """
+    Check if a __getitem__ key selects rows, only boolean series do
+    """
+    return isinstance(key, Series) and is_bool_dtype(key)
+
+
+# -------------------------------------------------------
+# Row position functions
+# -------------------------------------------------------
+
+def get_dropna_positions(input_df, output_df, dropna_args, dropna_kwargs):
+    """
+    Get the positions of the input rows for each dropna output row. If the index labels are not unique, we
+    repeat the dropna on a shallow copy with a RangeIndex, the user frame does not change.
+    """
+    if input_df.index.is_unique:
+        return input_df.index.get_indexer(output_df.index)
+    positions_df = input_df.copy(deep=False)
+    positions_df.index = RangeIndex(len(positions_df))
+    return positions_df.dropna(*(dropna_args or []), **(dropna_kwargs or {})).index.to_numpy()
+
+
+def get_selection_positions(input_df, output_df, condition):
+    """
+    Get the positions of the input rows for each output row of a selection by a boolean series
+    """
+    if condition.index.equals(input_df.index):
+        return numpy.flatnonzero(condition.to_numpy(dtype=bool))
+    return get_row_positions(input_df, output_df)
+
+
+def get_join_keys(left_df, right_df, merge_args, merge_kwargs):
+    """
+    Get the bound merge arguments and the join keys of both inputs
+    """
+    merge_arguments = inspect.signature(DataFrame.merge) \
+        .bind(left_df, right_df, *(merge_args or []), **(merge_kwargs or {})).arguments
+    merge_arguments.pop("self")
+    merge_arguments.pop("right")
+    if not any(merge_arguments.get(key) is not None for key in ("on", "left_on", "right_on")) and \
+            not merge_arguments.get("left_index") and not merge_arguments.get("right_index") and \
+            merge_arguments.get("how") != "cross":
+        merge_arguments["on"] = list(left_df.columns.intersection(right_df.columns))
+    left_keys = merge_arguments.get("left_on", merge_arguments.get("on"))
+    right_keys = merge_arguments.get("right_on", merge_arguments.get("on"))
+    return merge_arguments, left_keys, right_keys
+
+
+def get_join_positions(left_df, right_df, merge_arguments, left_keys, right_keys):
+    """
+    Get the positions of the rows of both inputs for each merge output row. We repeat the merge with frames that
+    only contain the join keys and the row positions, so the wide user frames do not get copied or changed.
+    """
+    left_positions = get_join_key_df(left_df, left_keys, "mlinspect_index_x")
+    right_positions = get_join_key_df(right_df, right_keys, "mlinspect_index_y")
+    positions_df = left_positions.merge(right_positions, **merge_arguments)
+    return positions_df["mlinspect_index_x"].to_numpy(), positions_df["mlinspect_index_y"].to_numpy()
+
+
+def get_join_key_df(input_df, keys, position_column):
+    """
+    Get a data frame with the join key columns, the index, and the row positions of some merge input
+    """
+    if keys is None:
+        keys = []
+    elif not isinstance(keys, list):
+        keys = [keys]
+    key_columns = [key for key in keys if is_hashable(key) and key in input_df.columns]
+    key_df = DataFrame({column: input_df[column].to_numpy() for column in key_columns}, index=input_df.index)
+    key_df[position_column] = numpy.arange(len(input_df))
+    return key_df
+
+
 # -------------------------------------------------------
 # Execute inspections functions
 # -------------------------------------------------------
@@ -249,28 +387,35 @@ class PandasBackend(Backend):
 def execute_inspection_visits_data_source(backend, operator_context, code_reference, return_value):
     """Execute inspections when the current operator is a data source and does not have parents in the DAG"""
     # pylint: disable=unused-argument
-    inspection_count = len(backend.inspections)
-    iterators_for_inspections = iter_input_data_source(inspection_count, return_value, operator_context)
+    iterators_for_inspections = iter_input_data_source(backend.inspections, return_value, operator_context)
     return_value = execute_visits_and_store_results(backend, code_reference, iterators_for_inspections,
                                                     operator_context, return_value)
     return return_value
 
 
 def execute_inspection_visits_unary_operator(backend, operator_context, code_reference, input_data,
-                                             input_annotations, return_value_df, resampled):
-    """Execute inspections when the current operator has one parent in the DAG"""
+                                             input_annotations, return_value_df, input_positions=None):
+    """
+    Execute inspections when the current operator has one parent in the DAG. Operators that drop or reorder rows
+    pass the positions of the input rows for each output row.
+    """
     # pylint: disable=too-many-arguments, unused-argument
-    assert not resampled or "mlinspect_index" in return_value_df.columns
-    assert isinstance(input_data, (MlinspectDataFrame, MlinspectSeries))
-    inspection_count = len(backend.inspections)
-    if resampled:
-        iterators_for_inspections = iter_input_annotation_output_resampled(inspection_count,
+    assert isinstance(input_data, (DataFrame, Series))
+    if skips_inspection_visits(backend.operator_scope, operator_context, code_reference, backend.inspections):
+        annotations = input_annotations
+        if input_positions is not None:
+            annotations = annotations.take(input_positions)
+        return store_pass_through_outputs(backend, code_reference, annotations, return_value_df,
+                                          operator_context)
+    if input_positions is not None:
+        iterators_for_inspections = iter_input_annotation_output_resampled(backend.inspections,
                                                                            input_data,
                                                                            input_annotations,
+                                                                           input_positions,
                                                                            return_value_df,
                                                                            operator_context)
     else:
-        iterators_for_inspections = iter_input_annotation_output_map(inspection_count,
+        iterators_for_inspections = iter_input_annotation_output_map(backend.inspections,
                                                                      input_data,
                                                                      input_annotations,
                                                                      return_value_df,
@@ -281,20 +426,19 @@ def execute_inspection_visits_unary_operator(backend, operator_context, code_ref
 
 
 def execute_inspection_visits_join(backend, operator_context, code_reference, input_data_one,
-                                   input_annotations_one, input_data_two, input_annotations_two,
-                                   return_value_df):
+                                   input_annotations_one, input_positions_one, input_data_two,
+                                   input_annotations_two, input_positions_two, return_value_df):
     """Execute inspections when the current operator has one parent in the DAG"""
     # pylint: disable=too-many-arguments, too-many-locals
-    assert "mlinspect_index_x" in return_value_df
-    assert "mlinspect_index_y" in return_value_df
-    assert isinstance(input_data_one, MlinspectDataFrame)
-    assert isinstance(input_data_two, MlinspectDataFrame)
-    inspection_count = len(backend.inspections)
-    iterators_for_inspections = iter_input_annotation_output_join(inspection_count,
+    assert isinstance(input_data_one, DataFrame)
+    assert isinstance(input_data_two, DataFrame)
+    iterators_for_inspections = iter_input_annotation_output_join(backend.inspections,
                                                                   input_data_one,
                                                                   input_annotations_one,
+                                                                  input_positions_one,
                                                                   input_data_two,
                                                                   input_annotations_two,
+                                                                  input_positions_two,
                                                                   return_value_df,
                                                                   operator_context)
     return_value = execute_visits_and_store_results(backend, code_reference, iterators_for_inspections,
@@ -312,7 +456,7 @@ def execute_visits_and_store_results(backend, code_reference, iterators_for_insp
     annotation_iterators = []
     for inspection_index, inspection in enumerate(backend.inspections):
         iterator_for_inspection = iterators_for_inspections[inspection_index]
-        annotation_iterator = inspection.visit_operator(iterator_for_inspection)
+        annotation_iterator = visit_operator(inspection, iterator_for_inspection)
         annotation_iterators.append(annotation_iterator)
     return_value = store_inspection_outputs(backend, annotation_iterators, code_reference, return_value,
                                             operator_context)
@@ -330,12 +474,49 @@ def store_inspection_outputs(backend, annotation_iterators, code_reference, retu
     """
     dag_node_identifier = DagNodeIdentifier(operator_context.operator, code_reference,
                                             backend.code_reference_to_description.get(code_reference))
-    annotations_df = build_annotation_df_from_iters(backend.inspections, annotation_iterators)
+    annotations = AnnotationStore.from_iters(backend.inspections, annotation_iterators)
     inspection_outputs = {}
     for inspection in backend.inspections:
         inspection_outputs[inspection] = inspection.get_operator_annotation_after_visit()
+    if not is_in_operator_scope(backend.operator_scope, operator_context.operator, code_reference):
+        inspection_outputs = {}  # Only visited for the annotations of the rows
     backend.dag_node_identifier_to_inspection_output[dag_node_identifier] = inspection_outputs
-    new_return_value = create_wrapper_with_annotations(annotations_df, return_value, backend)
+    new_return_value = store_annotations(backend.annotation_registry, annotations, return_value, backend)
+    store_operator_columns(backend, dag_node_identifier, return_value, new_return_value)
+    return new_return_value
+
+
+def store_pass_through_outputs(backend, code_reference, annotations, return_value, operator_context):
+    """
+    Operators outside of the operator scope the inspections pass the annotations through for get no inspection
+    annotations for the DAG operators, the rows keep the annotations of their input rows
+    """
+    dag_node_identifier = DagNodeIdentifier(operator_context.operator, code_reference,
+                                            backend.code_reference_to_description.get(code_reference))
+    backend.dag_node_identifier_to_inspection_output[dag_node_identifier] = {}
+    new_return_value = store_annotations(backend.annotation_registry, annotations, return_value, backend)
+    store_operator_columns(backend, dag_node_identifier, return_value, new_return_value)
+    return new_return_value
+
+
+def store_dag_only_outputs(backend, code_reference, return_value, operator_context):
+    """
+    Without inspections, we only store the columns of the DAG operator. The return value stays the same object,
+    only plain data frames become MlinspectDataFrames sharing their data.
+    """
+    dag_node_identifier = DagNodeIdentifier(operator_context.operator, code_reference,
+                                            backend.code_reference_to_description.get(code_reference))
+    new_return_value = return_value
+    if isinstance(return_value, DataFrame):
+        new_return_value = get_frame_with_backend(return_value, backend)
+    store_operator_columns(backend, dag_node_identifier, return_value, new_return_value)
+    return new_return_value
+
+
+def store_operator_columns(backend, dag_node_identifier, return_value, new_return_value):
+    """
+    Store the output columns of a DAG operator
+    """
     if isinstance(return_value, DataFrame):
         backend.dag_node_identifier_to_columns[dag_node_identifier] = list(new_return_value.columns.values)
     elif isinstance(return_value, Series):
@@ -346,4 +527,3 @@ def store_inspection_outputs(backend, annotation_iterators, code_reference, retu
         backend.dag_node_identifier_to_columns[dag_node_identifier] = ["array"]
     else:
         assert False
-    return new_return_value
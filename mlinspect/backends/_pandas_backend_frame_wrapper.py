@@ -1,55 +1,36 @@
 """
-A wrapper for pandas dataframes and series to store our additional annotations
+A wrapper for pandas dataframes to see column assignments
 """
 
-from pandas import DataFrame, Series
-
-
-class MlinspectSeries(Series):
-    """
-    A Series wrapper also storing annotations.
-    See the pandas documentation: https://pandas.pydata.org/pandas-docs/stable/development/extending.html
-    """
-    # pylint: disable=too-many-ancestors
-
-    _metadata = ['annotations', 'backend']
-
-    @property
-    def _constructor(self):
-        return MlinspectSeries
-
-    @property
-    def _constructor_expanddim(self):
-        return MlinspectDataFrame
+from pandas import DataFrame
 
 
 class MlinspectDataFrame(DataFrame):
     """
-    A DataFrame wrapper also storing annotations.
+    A DataFrame wrapper that knows the pandas backend, which executes the inspections for column assignments.
+    The annotations of the rows are in the AnnotationRegistry of the backend.
     See the pandas documentation: https://pandas.pydata.org/pandas-docs/stable/development/extending.html
     """
     # pylint: disable=too-many-ancestors
 
-    _metadata = ['annotations', 'backend']
+    _metadata = ['backend']
 
     @property
     def _constructor(self):
         return MlinspectDataFrame
 
-    @property
-    def _constructor_sliced(self):
-        return MlinspectSeries
-
     @property
     def _constructor_expanddim(self):
         return MlinspectDataFrame
 
     def __setitem__(self, key, value):
-        if key not in {'mlinspect_index', 'mlinspect_index_x', 'mlinspect_index_y'}:
-            assert self.backend
-
-            previous_df = self.copy()
-            super()._set_item(key, value)
-            self.backend.after_call_used_setkey(key, previous_df, self)
-        else:
-            super()._set_item(key, value)
+        assert self.backend
+
+        # Only the column we set can change, so we only need a copy of this column. Without inspections, we only
+        # need the columns.
+        columns_before = self.columns
+        column_before = None
+        if key in columns_before and self.backend.inspections:
+            column_before = self[key].copy()
+        super()._set_item(key, value)
+        self.backend.after_call_used_setkey(key, columns_before, column_before, self)
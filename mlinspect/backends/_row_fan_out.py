@@ -0,0 +1,50 @@
+"""
+Share the rows of an operator between the row iterators of the inspections
+"""
+import itertools
+from typing import Iterator
+
+ROWS_PER_CHUNK = 1024
+
+
+class RowFanOut:
+    """
+    Reads the rows of an operator once, in chunks, and pushes each chunk to the row iterators of all inspections. A
+    chunk is released as soon as all row iterators took it. The backends pull the annotations of all inspections in
+    lockstep, so for inspections that yield one annotation per row only one or two chunks are in memory at a time,
+    independent of the number of rows and inspections.
+    """
+
+    def __init__(self, rows: Iterator, consumer_count: int, rows_per_chunk: int = ROWS_PER_CHUNK):
+        self._rows = rows
+        self._consumer_count = consumer_count
+        self._rows_per_chunk = rows_per_chunk
+        self._chunks = {}
+        self._next_chunk_index = 0
+
+    def take_chunk(self, chunk_index: int) -> list:
+        """
+        Get a chunk for one of the row iterators. Returns an empty list if there are no rows left.
+        """
+        if chunk_index == self._next_chunk_index:
+            chunk = list(itertools.islice(self._rows, self._rows_per_chunk))
+            self._next_chunk_index += 1
+            self._chunks[chunk_index] = [chunk, self._consumer_count]
+        chunk_with_count = self._chunks[chunk_index]
+        chunk_with_count[1] -= 1
+        if chunk_with_count[1] == 0:
+            del self._chunks[chunk_index]
+        return chunk_with_count[0]
+
+    def get_row_iterator(self) -> Iterator:
+        """
+        The row iterator of one inspection
+        """
+        return itertools.chain.from_iterable(self._iter_chunks())
+
+    def _iter_chunks(self):
+        for chunk_index in itertools.count():
+            chunk = self.take_chunk(chunk_index)
+            if not chunk:
+                return
+            yield chunk
@@ -3,12 +3,14 @@ The scikit-learn backend
 """
 
 import networkx
+import numpy
+from pandas import DataFrame, Series
 from sklearn.base import BaseEstimator
 from tensorflow.python.keras.wrappers.scikit_learn import BaseWrapper  # pylint: disable=no-name-in-module
 
 from ._backend import Backend
-from ._pandas_backend import execute_inspection_visits_unary_operator
-from ._pandas_backend_frame_wrapper import MlinspectSeries, MlinspectDataFrame
+from ._backend_utils import store_annotations
+from ._pandas_backend import execute_inspection_visits_unary_operator, store_dag_only_outputs
 from ._sklearn_backend_transformer_wrapper import MlinspectEstimatorTransformer, transformer_names
 from ._sklearn_dag_processor import SklearnDagPostprocessor
 from ._sklearn_wir_processor import SklearnWirPreprocessor
@@ -16,10 +18,14 @@ from ..inspections._inspection_input import OperatorContext
 from ..instrumentation._dag_node import OperatorType
 
 
+WRAPPER_MODULE = MlinspectEstimatorTransformer.__module__
+
+
 class SklearnBackend(Backend):
     """
     The scikit-learn backend
     """
+    # pylint: disable=too-many-instance-attributes
 
     operator_map = {
         ('sklearn.preprocessing._label', 'label_binarize'): OperatorType.PROJECTION_MODIFY,
@@ -35,6 +41,15 @@ class SklearnBackend(Backend):
         ('sklearn.pipeline', 'fit', 'Train Data'): OperatorType.TRAIN_DATA,
         ('sklearn.pipeline', 'fit', 'Train Labels'): OperatorType.TRAIN_LABELS,
         ('sklearn.model_selection._split', 'train_test_split'): OperatorType.TRAIN_TEST_SPLIT,
+        ('sklearn.pipeline', 'transform', 'Pipeline'): OperatorType.TRANSFORMER,
+        ('sklearn.pipeline', 'transform', 'Test Data'): OperatorType.TEST_DATA,
+        ('sklearn.pipeline', 'predict', 'Pipeline'): OperatorType.PREDICT,
+        ('sklearn.pipeline', 'predict', 'Test Data'): OperatorType.TEST_DATA,
+        ('sklearn.pipeline', 'predict_proba', 'Pipeline'): OperatorType.PREDICT,
+        ('sklearn.pipeline', 'predict_proba', 'Test Data'): OperatorType.TEST_DATA,
+        ('sklearn.pipeline', 'score', 'Pipeline'): OperatorType.SCORE,
+        ('sklearn.pipeline', 'score', 'Test Data'): OperatorType.TEST_DATA,
+        ('sklearn.pipeline', 'score', 'Test Labels'): OperatorType.TEST_LABELS,
         # TODO: We  can remove this later by checking if subclass of transformer/estimator
         ('example_pipelines.healthcare.healthcare_utils', 'MyW2VTransformer', 'Pipeline'): OperatorType.TRANSFORMER,
         ('tensorflow.python.keras.wrappers.scikit_learn', 'KerasClassifier', 'Pipeline'): OperatorType.ESTIMATOR,
@@ -43,7 +58,14 @@ class SklearnBackend(Backend):
 
     def is_responsible_for_call(self, function_info, function_prefix, value=None):
         """Checks whether the backend is responsible for the current method call"""
-        return function_prefix == "sklearn" or isinstance(value, (BaseEstimator, BaseWrapper))
+        # Calls on our estimator wrappers, e.g., predict or score, return arrays or scores, so we need to check the
+        # module the called function belongs to and not only the return value
+        return function_prefix == "sklearn" or isinstance(value, (BaseEstimator, BaseWrapper)) or \
+            function_info[0] == WRAPPER_MODULE
+
+    def is_responsible_for_value(self, value):
+        """Checks whether the backend would be responsible for calls returning this value"""
+        return isinstance(value, (BaseEstimator, BaseWrapper)) or type(value).__module__.split(".", 1)[0] == "sklearn"
 
     def process_wir(self, wir: networkx.DiGraph) -> networkx.DiGraph:
         """
@@ -79,17 +101,25 @@ class SklearnBackend(Backend):
         # pylint: disable=too-many-arguments, unused-argument, no-self-use, unnecessary-pass
         if isinstance(value_value, (BaseEstimator, BaseWrapper)):
             self.input_data = value_value
+        if isinstance(value_value, MlinspectEstimatorTransformer) and \
+                value_value.call_function_info == ('sklearn.pipeline', 'Pipeline') and \
+                function_info[1] in SklearnWirPreprocessor.KNOWN_INFERENCE_FUNCTIONS:
+            # Calls from the pipeline code get inspected, the calls sklearn makes internally do not
+            value_value.inference_code_reference = code_reference
+            value_value.inference_aggregates_only = self.inference_aggregates_only
 
     def before_call_used_args(self, function_info, subscript, call_code, args_code, code_reference, store, args_values):
         """The arguments a function may be called with"""
         # pylint: disable=too-many-arguments, unused-argument, no-self-use
         if function_info == ('sklearn.preprocessing._label', 'label_binarize'):
-            assert isinstance(args_values[0], MlinspectSeries)
+            assert isinstance(args_values[0], Series)
             self.input_data = args_values[0]
         elif function_info == ('sklearn.model_selection._split', 'train_test_split'):
-            assert isinstance(args_values[0], MlinspectDataFrame)
-            args_values[0]['mlinspect_index'] = range(0, len(args_values[0]))
+            assert isinstance(args_values[0], DataFrame)
             self.input_data = args_values[0]
+            if self.inspections:
+                # The index labels of the input rows may not be unique, so we split their positions alongside
+                args_values.append(numpy.arange(len(self.input_data)))
 
     def before_call_used_kwargs(self, function_info, subscript, call_code, kwargs_code, code_reference, kwargs_values):
         """The keyword arguments a function may be called with"""
@@ -111,19 +141,32 @@ class SklearnBackend(Backend):
 
         if function_info == ('sklearn.preprocessing._label', 'label_binarize'):
             operator_context = OperatorContext(OperatorType.PROJECTION_MODIFY, function_info)
-            return_value = execute_inspection_visits_unary_operator(self, operator_context, code_reference,
-                                                                    self.input_data,
-                                                                    self.input_data.annotations,
-                                                                    return_value,
-                                                                    False)
-        elif function_info == ('sklearn.model_selection._split', 'train_test_split'):
+            # For two classes, we get a column of a bigger array. With a contiguous copy of the column, the labels
+            # after ravel or reshape are views that share the annotations and the DAG node.
+            return_value = numpy.ascontiguousarray(return_value)
+            if not self.inspections:
+                return_value = store_dag_only_outputs(self, code_reference, return_value, operator_context)
+            else:
+                return_value = execute_inspection_visits_unary_operator(self, operator_context, code_reference,
+                                                                        self.input_data,
+                                                                        self.get_annotations(self.input_data),
+                                                                        return_value)
+        elif function_info == ('sklearn.model_selection._split', 'train_test_split') and not self.inspections:
             operator_context = OperatorContext(OperatorType.TRAIN_TEST_SPLIT, function_info)
             train_data, test_data = return_value
+            return_value = store_dag_only_outputs(self, code_reference, train_data, operator_context), test_data
+        elif function_info == ('sklearn.model_selection._split', 'train_test_split'):
+            operator_context = OperatorContext(OperatorType.TRAIN_TEST_SPLIT, function_info)
+            train_data, test_data, train_positions, test_positions = return_value
+            input_annotations = self.get_annotations(self.input_data)
             train_data = execute_inspection_visits_unary_operator(self, operator_context, code_reference,
                                                                   self.input_data,
-                                                                  self.input_data.annotations,
+                                                                  input_annotations,
                                                                   train_data,
-                                                                  True)
+                                                                  train_positions)
+            # The test data has no DAG node of its own, its rows keep the annotations of their input rows
+            test_data = store_annotations(self.annotation_registry, input_annotations.take(test_positions),
+                                          test_data, self)
             return_value = train_data, test_data
         elif function_info in {('sklearn.preprocessing._encoders', 'OneHotEncoder'),
                                ('sklearn.preprocessing._data', 'StandardScaler'),
@@ -138,7 +181,10 @@ class SklearnBackend(Backend):
                                ('sklearn.linear_model._logistic', 'LogisticRegression')
                                }:
             return_value = MlinspectEstimatorTransformer(return_value, code_reference, self.inspections,
-                                                         self.wir_post_processing_map)
+                                                         self.wir_post_processing_map,
+                                                         operator_scope=self.operator_scope,
+                                                         annotation_registry=self.annotation_registry,
+                                                         fit_result_cache=self.fit_result_cache)
 
         self.input_data = None
 
@@ -147,8 +193,7 @@ class SklearnBackend(Backend):
     def save_call_module_and_description(self, code_reference, call_code, function_info, maybe_wrapper_transformer):
         """Replace the module of mlinspect transformer wrappers with the original modules"""
         if maybe_wrapper_transformer is not None and \
-                function_info[0] == 'mlinspect.backends._sklearn_backend_transformer_wrapper' and \
-                function_info[1] != "score":
+                function_info[0] == 'mlinspect.backends._sklearn_backend_transformer_wrapper':
             function_info = (maybe_wrapper_transformer.module_name, function_info[1])
 
         description = transformer_names.get(function_info, None)
@@ -2,22 +2,25 @@
 A wrapper for sklearn transformers to capture method calls we do not see otherwise because of the pipeline
 definition style
 """
+import contextlib
 import inspect
 
 import numpy
-from pandas import DataFrame
+from pandas import DataFrame, Series
 from scipy.sparse import csr_matrix
 from sklearn.base import BaseEstimator
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
 
-from ._backend_utils import create_wrapper_with_annotations, \
-    build_annotation_list_from_iters
+from ._annotation_registry import AnnotationRegistry
+from ._annotation_store import AnnotationStore, discard_in_lockstep
+from ._backend_utils import store_annotations, get_column_slices, get_columns_df_view
+from ._fit_result_cache import FitResultCache, get_pipeline_memory_fit_result_cache
 from ._iter_creation import iter_input_annotation_output_sink_op, iter_input_annotation_output_nary_op, \
-    iter_input_annotation_output_map
-from ._pandas_backend_frame_wrapper import MlinspectDataFrame, MlinspectSeries
-from ._sklearn_backend_csr_matrx_wrapper import MlinspectCsrMatrix
-from ._sklearn_backend_ndarray_wrapper import MlinspectNdarray
+    iter_input_annotation_output_map, iter_input_annotation_output_projections, visit_operator
 from ..inspections._inspection_input import OperatorContext
 from ..instrumentation._dag_node import CodeReference, OperatorType
+from ..instrumentation._operator_scope import OperatorScope, is_in_operator_scope, skips_inspection_visits
 
 transformer_names = {
         ('sklearn.preprocessing._encoders', 'OneHotEncoder'): "Categorical Encoder (OneHotEncoder)",
@@ -42,7 +45,10 @@ class MlinspectEstimatorTransformer(BaseEstimator):
     # pylint: disable=too-many-instance-attributes
 
     def __init__(self, transformer, code_reference: CodeReference, inspections, code_ref_inspection_output_map,
-                 output_dimensions=None, annotation_result_project_workaround=None):
+                 output_dimensions=None, annotation_result_project_workaround=None,
+                 operator_scope: OperatorScope or None = None,
+                 annotation_registry: AnnotationRegistry or None = None,
+                 fit_result_cache: FitResultCache or None = None):
         # pylint: disable=too-many-arguments
         # None arguments are not passed directly when we create them. Still needed though because the
         # Column transformer clones child transformers and does not pass parameters otherwise
@@ -57,6 +63,11 @@ class MlinspectEstimatorTransformer(BaseEstimator):
         self.output_dimensions = output_dimensions
         self.annotation_result_concat_workaround = None
         self.annotation_result_project_workaround = annotation_result_project_workaround
+        self.operator_scope = operator_scope
+        self.annotation_registry = annotation_registry
+        self.fit_result_cache = fit_result_cache
+        self.inference_code_reference = None
+        self.inference_aggregates_only = False
 
     def fit(self, X, y=None) -> 'MlinspectEstimatorTransformer':
         """
@@ -65,13 +76,14 @@ class MlinspectEstimatorTransformer(BaseEstimator):
         # pylint: disable=invalid-name
         if self.call_function_info == ('sklearn.pipeline', 'Pipeline'):
             X_annotated, y_annotated = self.train_data_and_labels_visits(X, y)
-            self.transformer = self.transformer.fit(X_annotated, y_annotated)
+            with self.pipeline_memory_disabled():
+                self.transformer = self.transformer.fit(X_annotated, y_annotated)
         elif self.call_function_info in {('sklearn.tree._classes', 'DecisionTreeClassifier'),
                                          ('tensorflow.python.keras.wrappers.scikit_learn', 'KerasClassifier'),
                                          ('sklearn.linear_model._logistic', 'LogisticRegression'),
                                          ('example_pipelines.healthcare.healthcare_utils', 'MyKerasClassifier')}:
             self.estimator_visits(X, y)
-            self.transformer.fit(X, y)
+            self.fit_cached(X, y)
         else:
             assert False
 
@@ -82,7 +94,32 @@ class MlinspectEstimatorTransformer(BaseEstimator):
         Override transform
         """
         # pylint: disable=invalid-name
+        code_reference = self.pop_inference_code_reference()
         result = self.transformer.transform(X)
+        if code_reference is not None:
+            result = self.inference_visits(code_reference, "transform", OperatorType.TRANSFORMER, X, None, result)
+        return result
+
+    def predict(self, X):
+        """
+        Override predict
+        """
+        # pylint: disable=invalid-name
+        code_reference = self.pop_inference_code_reference()
+        result = self.transformer.predict(X)
+        if code_reference is not None:
+            result = self.inference_visits(code_reference, "predict", OperatorType.PREDICT, X, None, result)
+        return result
+
+    def predict_proba(self, X):
+        """
+        Override predict_proba
+        """
+        # pylint: disable=invalid-name
+        code_reference = self.pop_inference_code_reference()
+        result = self.transformer.predict_proba(X)
+        if code_reference is not None:
+            result = self.inference_visits(code_reference, "predict_proba", OperatorType.PREDICT, X, None, result)
         return result
 
     def fit_transform(self, X, y=None) -> list:  # TODO: There can be some additional kwargs sometimes
@@ -97,15 +134,15 @@ class MlinspectEstimatorTransformer(BaseEstimator):
         elif self.call_function_info in {('sklearn.preprocessing._data', 'StandardScaler'),
                                          ('sklearn.impute._base', 'SimpleImputer'),
                                          ('sklearn.preprocessing._discretization', 'KBinsDiscretizer')}:
-            result = self.transformer.fit_transform(X, y)
+            result = self.fit_transform_cached(X, y)
             self.output_dimensions = [1 for _ in range(result.shape[1])]
             result = self.normal_transformer_visit(X, y, result)
         elif self.call_function_info == ('example_pipelines.healthcare.healthcare_utils', 'MyW2VTransformer'):
-            result = self.transformer.fit_transform(X, y)
+            result = self.fit_transform_cached(X, y)
             self.output_dimensions = [result.shape[1]]
             result = self.normal_transformer_visit(X, y, result)
         elif self.call_function_info == ('sklearn.preprocessing._encoders', 'OneHotEncoder'):
-            result = self.transformer.fit_transform(X, y)
+            result = self.fit_transform_cached(X, y)
             self.output_dimensions = [len(one_hot_categories) for one_hot_categories in
                                       self.transformer.categories_]
             result = self.normal_transformer_visit(X, y, result)
@@ -114,6 +151,57 @@ class MlinspectEstimatorTransformer(BaseEstimator):
 
         return result
 
+    def fit_cached(self, X, y):
+        """
+        Fit the estimator or load the fitted estimator from the fit result cache
+        """
+        # pylint: disable=invalid-name
+        if self.fit_result_cache is None:
+            self.transformer.fit(X, y)
+            return
+        key = self.fit_result_cache.get_key(self.transformer, X, y)
+        cache_entry = self.fit_result_cache.load(key)
+        if cache_entry is not None:
+            self.transformer, _ = cache_entry
+            return
+        self.transformer.fit(X, y)
+        self.fit_result_cache.store(key, self.transformer)
+
+    def fit_transform_cached(self, X, y):
+        """
+        Call fit_transform or load the fitted transformer and its output from the fit result cache. The inspection
+        visits run on the output either way.
+        """
+        # pylint: disable=invalid-name
+        if self.fit_result_cache is None:
+            return self.transformer.fit_transform(X, y)
+        key = self.fit_result_cache.get_key(self.transformer, X, y)
+        cache_entry = self.fit_result_cache.load(key)
+        if cache_entry is not None:
+            self.transformer, result = cache_entry
+            return result
+        result = self.transformer.fit_transform(X, y)
+        self.fit_result_cache.store(key, self.transformer, result)
+        return result
+
+    @contextlib.contextmanager
+    def pipeline_memory_disabled(self):
+        """
+        A sklearn Pipeline(memory=...) would clone our wrappers and skip their fit_transform on joblib cache hits,
+        so there would be no inspection visits. Instead, the steps use the memory location for their fit result
+        cache while the Pipeline runs without memory.
+        """
+        memory = self.transformer.memory
+        if memory is None:
+            yield
+            return
+        set_fit_result_cache(self.transformer, get_pipeline_memory_fit_result_cache(memory, self.fit_result_cache))
+        self.transformer.memory = None
+        try:
+            yield
+        finally:
+            self.transformer.memory = memory
+
     def normal_transformer_visit(self, X, y, result):
         """
         Inspection visits for the OneHotEncoder Transformer
@@ -129,50 +217,52 @@ class MlinspectEstimatorTransformer(BaseEstimator):
         function_info = (self.module_name, "fit_transform")
         operator_context = OperatorContext(OperatorType.TRANSFORMER, function_info)
 
+        x_annotations = self.annotation_registry.get_annotations(X)
+        # The output gets split into the columns of the different DAG nodes at once. Without inspections, we only
+        # need the column names.
+        if self.inspections:
+            column_outputs = get_column_slices(result, output_dimension_index)
+        else:
+            column_outputs = [None] * len(self.output_dimensions)
         for column_index in range(X.shape[1]):
             if self.annotation_result_project_workaround is not None:
-                assert isinstance(X, MlinspectDataFrame)
+                assert isinstance(X, DataFrame)
                 column_name = X.columns[column_index]
                 annotations = self.annotation_result_project_workaround[column_index]
-                input_data = X[[column_name]]
-            elif isinstance(X.annotations, list):  # List because transformer impls process multiple columns at once
-                assert isinstance(X, MlinspectNdarray)
-                column_name, annotations = X.annotations[column_index]
+                input_data = None
+                if self.inspections:
+                    input_data = get_columns_df_view([X.iloc[:, column_index]], [column_name], X.index)
+            elif isinstance(x_annotations, list):  # List because transformer impls process multiple columns at once
+                assert isinstance(X, numpy.ndarray)
+                column_name, annotations = x_annotations[column_index]
                 input_data = X[:, column_index]
-            elif isinstance(X.annotations, DataFrame) and len(X.columns) == 1:
+            elif isinstance(X, DataFrame) and len(X.columns) == 1:
                 # Currently, this is only used when benchmarking single transformers
                 # TODO: Full support for calling fit_transform etc. on encoders directly instead of using
                 #  column transformers
                 column_name = X.columns[0]
-                annotations = X.annotations
+                annotations = self.annotation_registry.get_row_annotations(X, self.inspections)
                 input_data = X
             else:
                 assert False
 
             description = "{}, Column: '{}'".format(transformer_name, column_name)
-            index_start = output_dimension_index[column_index]
-            index_end = output_dimension_index[column_index + 1]
             column_result = execute_inspection_visits_unary_op(operator_context,
                                                                self.code_reference,
                                                                input_data,
                                                                annotations,
-                                                               result[:, index_start:index_end],
+                                                               column_outputs[column_index],
                                                                self.inspections,
+                                                               self.annotation_registry,
                                                                self.code_ref_inspection_output_map,
                                                                description,
-                                                               [column_name])
+                                                               [column_name],
+                                                               self.operator_scope)
             annotations_for_columns = self.annotation_result_concat_workaround or []
-            annotations_for_columns.append((column_name, column_result.annotations))
+            annotations_for_columns.append((column_name, self.annotation_registry.get_annotations(column_result)))
             self.annotation_result_concat_workaround = annotations_for_columns
-        if isinstance(result, numpy.ndarray):
-            result = MlinspectNdarray(result)
-            result.annotations = self.annotation_result_concat_workaround
-        elif isinstance(result, csr_matrix):
-            result = MlinspectCsrMatrix(result)
-            result.annotations = self.annotation_result_concat_workaround
-        else:
-            assert False
-        return result
+        assert isinstance(result, (numpy.ndarray, csr_matrix))
+        return self.annotation_registry.set_annotations(result, self.annotation_result_concat_workaround)
 
     def pipeline_visit(self, X, y):
         """
@@ -182,7 +272,8 @@ class MlinspectEstimatorTransformer(BaseEstimator):
         if self.annotation_result_project_workaround is not None:
             first_step_transformer = self.transformer.steps[0][1]
             first_step_transformer.annotation_result_project_workaround = self.annotation_result_project_workaround
-        result = self.transformer.fit_transform(X, y)
+        with self.pipeline_memory_disabled():
+            result = self.transformer.fit_transform(X, y)
         last_step_transformer = self.transformer.steps[-1][1]
         self.annotation_result_concat_workaround = last_step_transformer.annotation_result_concat_workaround
         self.output_dimensions = last_step_transformer.output_dimensions
@@ -205,26 +296,26 @@ class MlinspectEstimatorTransformer(BaseEstimator):
 
     def column_transformer_visits_projections(self, X):
         """
-        Inspection visits for the different projections
+        Inspection visits for the different projections, all projections get visited with one scan of X
         """
-        # pylint: disable=invalid-name, too-many-locals
+        # pylint: disable=invalid-name
         transformers_tuples = self.transformer.transformers
         columns_with_transformer = [(column, transformer_tuple[1]) for transformer_tuple in transformers_tuples
                                     for column in transformer_tuple[2]]
-        for column, transformer in columns_with_transformer:
-            projected_df = X[[column]]
-            function_info = (self.module_name, "fit_transform")
-            operator_context = OperatorContext(OperatorType.PROJECTION, function_info)
-            description = "to ['{}'] (ColumnTransformer)".format(column)
-            local_result = execute_inspection_visits_unary_op(operator_context, self.code_reference, X,
-                                                              X.annotations, projected_df, self.inspections,
-                                                              self.code_ref_inspection_output_map, description,
-                                                              [column])
-
+        x_annotations = self.annotation_registry.get_row_annotations(X, self.inspections)
+        function_info = (self.module_name, "fit_transform")
+        operator_context = OperatorContext(OperatorType.PROJECTION, function_info)
+        columns = [column for column, _ in columns_with_transformer]
+        descriptions = ["to ['{}'] (ColumnTransformer)".format(column) for column in columns]
+        projections_annotations = execute_inspection_visits_projections(operator_context, self.code_reference, X,
+                                                                        x_annotations, columns, self.inspections,
+                                                                        self.code_ref_inspection_output_map,
+                                                                        descriptions, self.operator_scope)
+
+        for (_, transformer), current_annotations in zip(columns_with_transformer, projections_annotations):
             # If the transformer is a column transformer, we have multiple annotations we need to pass to different
             # transformers.  If we do not want to override internal column transformer functions, we have to work around
             # these black box functions and pass the annotations using a different mechanism
-            current_annotations = local_result.annotations
             current_annotations_for_transformer = transformer.annotation_result_project_workaround or []
             current_annotations_for_transformer.append(current_annotations)
             transformer.annotation_result_project_workaround = current_annotations_for_transformer
@@ -233,8 +324,9 @@ class MlinspectEstimatorTransformer(BaseEstimator):
         """
         Because Column transformer creates deep copies, we need to extract results here
         """
-        transformers_tuples = self.transformer.transformers_[:-1]
-        transformers = [transformer_tuple[1] for transformer_tuple in transformers_tuples]
+        # There is only a remainder if some columns have no transformer, it is not one of our wrappers
+        transformers = [transformer_tuple[1] for transformer_tuple in self.transformer.transformers_
+                        if isinstance(transformer_tuple[1], MlinspectEstimatorTransformer)]
         for transformer in transformers:
             self.code_ref_inspection_output_map.update(transformer.code_ref_inspection_output_map)
 
@@ -256,16 +348,20 @@ class MlinspectEstimatorTransformer(BaseEstimator):
         transformers_tuples = self.transformer.transformers_[:-1]
         columns_with_transformer = [(column, transformer_tuple[1]) for transformer_tuple in transformers_tuples
                                     for column in transformer_tuple[2]]
+        if self.inspections:
+            column_outputs = get_column_slices(result, result_indices)
+        else:
+            column_outputs = [None] * len(columns_with_transformer)
         for index, _ in enumerate(columns_with_transformer):
-            data = result[:, result_indices[index]:result_indices[index + 1]]
             _, annotation = annotations[index]
-            transformer_data_with_annotations.append((data, annotation))
+            transformer_data_with_annotations.append((column_outputs[index], annotation))
         function_info = (self.module_name, "fit_transform")
         operator_context = OperatorContext(OperatorType.CONCATENATION, function_info)
         description = "concat"
         result = execute_inspection_visits_nary_op(operator_context, self.code_reference,
                                                    transformer_data_with_annotations, result, self.inspections,
-                                                   self.code_ref_inspection_output_map, description)
+                                                   self.annotation_registry, self.code_ref_inspection_output_map,
+                                                   description)
         return result
 
     def estimator_visits(self, X, y):
@@ -278,8 +374,8 @@ class MlinspectEstimatorTransformer(BaseEstimator):
         operator_context = OperatorContext(OperatorType.ESTIMATOR, function_info)
         description = "fit"
         execute_inspection_visits_sink_op(operator_context, self.code_reference,
-                                          X, y, self.inspections,
-                                          self.code_ref_inspection_output_map, description)
+                                          X, y, self.inspections, self.annotation_registry,
+                                          self.code_ref_inspection_output_map, description, self.operator_scope)
 
     def train_data_and_labels_visits(self, X, y):
         """
@@ -289,18 +385,24 @@ class MlinspectEstimatorTransformer(BaseEstimator):
         # pylint: disable=invalid-name
         function_info = (self.module_name, "fit")
         operator_context = OperatorContext(OperatorType.TRAIN_DATA, function_info)
-        X_annotated = execute_inspection_visits_unary_op(operator_context, self.code_reference, X, X.annotations, X,
-                                                         self.inspections, self.code_ref_inspection_output_map, "fit X",
-                                                         list(X.columns.values))
+        X_annotated = execute_inspection_visits_unary_op(operator_context, self.code_reference, X,
+                                                         self.annotation_registry.get_row_annotations(X,
+                                                                                                      self.inspections),
+                                                         X, self.inspections, self.annotation_registry,
+                                                         self.code_ref_inspection_output_map, "fit X",
+                                                         list(X.columns.values), self.operator_scope)
         assert y is not None
         operator_context = OperatorContext(OperatorType.TRAIN_LABELS, function_info)
-        if isinstance(y, MlinspectSeries):
+        if isinstance(y, Series):
             columns = [y.name]
         else:
             columns = ["array"]
         y_annotated = execute_inspection_visits_unary_op(operator_context, self.code_reference, y,
-                                                         y.annotations, y, self.inspections,
-                                                         self.code_ref_inspection_output_map, "fit y", columns)
+                                                         self.annotation_registry.get_row_annotations(y,
+                                                                                                      self.inspections),
+                                                         y, self.inspections, self.annotation_registry,
+                                                         self.code_ref_inspection_output_map, "fit y", columns,
+                                                         self.operator_scope)
         return X_annotated, y_annotated
 
     def score(self, X, y):
@@ -308,7 +410,86 @@ class MlinspectEstimatorTransformer(BaseEstimator):
         Forward some score call of an estimator
         """
         # pylint: disable=invalid-name
-        return self.transformer.score(X, y)
+        code_reference = self.pop_inference_code_reference()
+        result = self.transformer.score(X, y)
+        if code_reference is not None:
+            self.inference_visits(code_reference, "score", OperatorType.SCORE, X, y, None)
+        return result
+
+    def pop_inference_code_reference(self):
+        """
+        The SklearnBackend sets the code reference of inference calls from the pipeline code before the call.
+        Calls from within sklearn, e.g., Pipeline.predict calling transform of its steps, have none and only get
+        forwarded.
+        """
+        code_reference = self.inference_code_reference
+        self.inference_code_reference = None
+        return code_reference
+
+    def inference_visits(self, code_reference, function_name, operator_type, X, y, result):
+        """
+        Inspection visits for the inference calls of fitted pipelines. Like for fit, the test data and the test
+        labels get their own DAG nodes. The transform and predict outputs get the annotations of the test data
+        rows, the score is a sink.
+        """
+        # pylint: disable=invalid-name, too-many-arguments
+        function_info = (self.module_name, function_name)
+        if self.inference_aggregates_only:
+            execute_unary_visits = execute_inspection_visits_aggregates_only
+        else:
+            execute_unary_visits = execute_inspection_visits_unary_op
+        operator_context = OperatorContext(OperatorType.TEST_DATA, function_info)
+        x_annotations = self.annotation_registry.get_row_annotations(X, self.inspections)
+        X_annotated = execute_unary_visits(operator_context, code_reference, X, x_annotations, X, self.inspections,
+                                           self.annotation_registry, self.code_ref_inspection_output_map,
+                                           "{} X".format(function_name), get_inference_columns(X),
+                                           self.operator_scope)
+        y_annotated = None
+        if y is not None:
+            operator_context = OperatorContext(OperatorType.TEST_LABELS, function_info)
+            y_annotations = self.annotation_registry.get_row_annotations(y, self.inspections)
+            y_annotated = execute_unary_visits(operator_context, code_reference, y, y_annotations, y,
+                                               self.inspections, self.annotation_registry,
+                                               self.code_ref_inspection_output_map, "{} y".format(function_name),
+                                               get_inference_columns(y), self.operator_scope)
+        operator_context = OperatorContext(operator_type, function_info)
+        if operator_type == OperatorType.SCORE:
+            execute_inspection_visits_sink_op(operator_context, code_reference, X_annotated, y_annotated,
+                                              self.inspections, self.annotation_registry,
+                                              self.code_ref_inspection_output_map, function_name,
+                                              self.operator_scope)
+            return result
+        x_annotations = self.annotation_registry.get_row_annotations(X_annotated, self.inspections)
+        return execute_unary_visits(operator_context, code_reference, X_annotated, x_annotations, result,
+                                    self.inspections, self.annotation_registry, self.code_ref_inspection_output_map,
+                                    function_name, ["array"], self.operator_scope)
+
+
+def get_inference_columns(data):
+    """
+    The columns of the test data and the test labels DAG nodes
+    """
+    if isinstance(data, DataFrame):
+        return list(data.columns.values)
+    if isinstance(data, Series):
+        return [data.name]
+    return ["array"]
+
+
+def set_fit_result_cache(estimator, fit_result_cache):
+    """
+    Use the fit result cache for the wrappers of all steps of a Pipeline and all children of a ColumnTransformer
+    """
+    if not isinstance(estimator, MlinspectEstimatorTransformer):
+        if isinstance(estimator, Pipeline):
+            for _, step in estimator.steps:
+                set_fit_result_cache(step, fit_result_cache)
+        elif isinstance(estimator, ColumnTransformer):
+            for _, transformer, _ in estimator.transformers:
+                set_fit_result_cache(transformer, fit_result_cache)
+        return
+    estimator.fit_result_cache = fit_result_cache
+    set_fit_result_cache(estimator.transformer, fit_result_cache)
 
 
 # -------------------------------------------------------
@@ -316,39 +497,56 @@ class MlinspectEstimatorTransformer(BaseEstimator):
 # -------------------------------------------------------
 
 def execute_inspection_visits_nary_op(operator_context, code_reference, transformer_data_with_annotations,
-                                      output_data, inspections, code_ref_inspection_output_map, func_name):
+                                      output_data, inspections, annotation_registry, code_ref_inspection_output_map,
+                                      func_name):
     """Execute inspections"""
     # pylint: disable=too-many-arguments
-    inspection_count = len(inspections)
-    iterators_for_inspections = iter_input_annotation_output_nary_op(inspection_count,
+    if not inspections:
+        store_operator_outputs(code_reference, {}, code_ref_inspection_output_map, func_name, ["array"])
+        return output_data
+    iterators_for_inspections = iter_input_annotation_output_nary_op(inspections,
                                                                      transformer_data_with_annotations,
                                                                      output_data,
                                                                      operator_context)
     annotation_iterators = execute_visits(inspections, iterators_for_inspections)
     return_value = store_inspection_outputs(annotation_iterators, code_reference, output_data, inspections,
-                                            code_ref_inspection_output_map, func_name, False, ["array"])
+                                            annotation_registry, code_ref_inspection_output_map, func_name, False,
+                                            ["array"])
     return return_value
 
 
 def execute_inspection_visits_sink_op(operator_context, code_reference, data, target,
-                                      inspections, code_reference_inspection_output_map, func_name):
+                                      inspections, annotation_registry, code_reference_inspection_output_map,
+                                      func_name, operator_scope=None):
     """Execute inspections"""
     # pylint: disable=too-many-arguments
-    assert isinstance(data, (MlinspectCsrMatrix, MlinspectNdarray, MlinspectDataFrame))
-    assert isinstance(target, (MlinspectNdarray, MlinspectSeries, MlinspectDataFrame))
-    inspection_count = len(inspections)
-    iterators_for_inspections = iter_input_annotation_output_sink_op(inspection_count, data, target, operator_context)
+    assert isinstance(data, (csr_matrix, numpy.ndarray, DataFrame))
+    assert isinstance(target, (numpy.ndarray, Series, DataFrame))
+    if not inspections or skips_inspection_visits(operator_scope, operator_context, code_reference, inspections):
+        store_operator_outputs(code_reference, {}, code_reference_inspection_output_map, func_name, None)
+        return
+    iterators_for_inspections = iter_input_annotation_output_sink_op(
+        inspections, data, annotation_registry.get_row_annotations(data, inspections), target,
+        annotation_registry.get_row_annotations(target, inspections), operator_context)
     annotation_iterators = execute_visits(inspections, iterators_for_inspections)
-    store_inspection_outputs(annotation_iterators, code_reference, None, inspections,
-                             code_reference_inspection_output_map, func_name, True, None)
+    store_inspection_outputs(annotation_iterators, code_reference, None, inspections, annotation_registry,
+                             code_reference_inspection_output_map, func_name, True, None,
+                             is_in_operator_scope(operator_scope, operator_context.operator, code_reference))
 
 
 def execute_inspection_visits_unary_op(operator_context, code_reference, input_data, input_annotations, output_data,
-                                       inspections, code_reference_inspection_output_map, func_name, columns):
+                                       inspections, annotation_registry, code_reference_inspection_output_map,
+                                       func_name, columns, operator_scope=None):
     """Execute inspections"""
     # pylint: disable=too-many-arguments
-    inspection_count = len(inspections)
-    iterators_for_inspections = iter_input_annotation_output_map(inspection_count,
+    if not inspections:
+        # Without inspections, we only need the columns of the DAG operator
+        store_operator_outputs(code_reference, {}, code_reference_inspection_output_map, func_name, columns)
+        return output_data
+    if skips_inspection_visits(operator_scope, operator_context, code_reference, inspections):
+        store_operator_outputs(code_reference, {}, code_reference_inspection_output_map, func_name, columns)
+        return store_annotations(annotation_registry, input_annotations, output_data)
+    iterators_for_inspections = iter_input_annotation_output_map(inspections,
                                                                  input_data,
                                                                  input_annotations,
                                                                  output_data,
@@ -356,10 +554,66 @@ def execute_inspection_visits_unary_op(operator_context, code_reference, input_d
                                                                  columns)
     annotation_iterators = execute_visits(inspections, iterators_for_inspections)
     return_value = store_inspection_outputs(annotation_iterators, code_reference, output_data, inspections,
-                                            code_reference_inspection_output_map, func_name, False, columns)
+                                            annotation_registry, code_reference_inspection_output_map, func_name,
+                                            False, columns,
+                                            is_in_operator_scope(operator_scope, operator_context.operator,
+                                                                 code_reference))
     return return_value
 
 
+def execute_inspection_visits_aggregates_only(operator_context, code_reference, input_data, input_annotations,
+                                              output_data, inspections, annotation_registry,
+                                              code_reference_inspection_output_map, func_name, columns,
+                                              operator_scope=None):
+    """
+    Execute inspections only for the inspection annotations of the DAG operator, e.g., histograms. The row
+    annotations get discarded, so the output has none.
+    """
+    # pylint: disable=too-many-arguments, unused-argument
+    if not inspections or skips_inspection_visits(operator_scope, operator_context, code_reference, inspections):
+        store_operator_outputs(code_reference, {}, code_reference_inspection_output_map, func_name, columns)
+        return output_data
+    iterators_for_inspections = iter_input_annotation_output_map(inspections,
+                                                                 input_data,
+                                                                 input_annotations,
+                                                                 output_data,
+                                                                 operator_context,
+                                                                 columns)
+    annotation_iterators = execute_visits(inspections, iterators_for_inspections)
+    _, inspection_outputs = collect_inspection_outputs(inspections, annotation_iterators)
+    if not is_in_operator_scope(operator_scope, operator_context.operator, code_reference):
+        inspection_outputs = {}
+    store_operator_outputs(code_reference, inspection_outputs, code_reference_inspection_output_map, func_name,
+                           columns)
+    return output_data
+
+
+def execute_inspection_visits_projections(operator_context, code_reference, input_data, input_annotations, columns,
+                                          inspections, code_reference_inspection_output_map, func_names,
+                                          operator_scope=None):
+    """Execute inspections for the projections to single columns, returns the annotations of each projection"""
+    # pylint: disable=too-many-arguments, too-many-locals
+    if not inspections or skips_inspection_visits(operator_scope, operator_context, code_reference, inspections):
+        for column, func_name in zip(columns, func_names):
+            store_operator_outputs(code_reference, {}, code_reference_inspection_output_map, func_name, [column])
+        # The inspections pass the annotations through, so the projections get the annotations of the input
+        projection_annotations = input_annotations if inspections else None
+        return [projection_annotations for _ in columns]
+    in_operator_scope = is_in_operator_scope(operator_scope, operator_context.operator, code_reference)
+    projections_iterators = iter_input_annotation_output_projections(inspections, input_data, input_annotations,
+                                                                     columns, operator_context)
+    projections_annotations = []
+    for column, func_name, iterators_for_inspections in zip(columns, func_names, projections_iterators):
+        annotation_iterators = execute_visits(inspections, iterators_for_inspections)
+        annotations, inspection_outputs = collect_inspection_outputs(inspections, annotation_iterators)
+        if not in_operator_scope:
+            inspection_outputs = {}
+        store_operator_outputs(code_reference, inspection_outputs, code_reference_inspection_output_map, func_name,
+                               [column])
+        projections_annotations.append(annotations)
+    return projections_annotations
+
+
 def execute_visits(inspections, iterators_for_inspections):
     """
     After creating the iterators we need depending on the operator type, we need to execute the
@@ -368,7 +622,7 @@ def execute_visits(inspections, iterators_for_inspections):
     annotation_iterators = []
     for inspection_index, inspection in enumerate(inspections):
         iterator_for_inspection = iterators_for_inspections[inspection_index]
-        annotations_iterator = inspection.visit_operator(iterator_for_inspection)
+        annotations_iterator = visit_operator(inspection, iterator_for_inspection)
         annotation_iterators.append(annotations_iterator)
     return annotation_iterators
 
@@ -377,25 +631,56 @@ def execute_visits(inspections, iterators_for_inspections):
 # Store inspection results functions
 # -------------------------------------------------------
 
-def store_inspection_outputs(annotation_iterators, code_reference, return_value, inspections,
-                             code_reference_inspection_output_map, func_name, is_sink, columns):
+def store_inspection_outputs(annotation_iterators, code_reference, return_value, inspections, annotation_registry,
+                             code_reference_inspection_output_map, func_name, is_sink, columns,
+                             in_operator_scope=True):
     """
     Stores the inspection annotations for the rows in the dataframe and the
-    inspection annotations for the DAG operators in a map
+    inspection annotations for the DAG operators in a map. Operators outside of the operator scope only get
+    visited for the annotations of their rows.
+    """
+    # pylint: disable=too-many-arguments
+    if is_sink:
+        # Sinks have no output rows, the annotations only get consumed so the row visits finish
+        discard_in_lockstep(annotation_iterators)
+        inspection_outputs = get_operator_annotations_after_visits(inspections)
+        if not in_operator_scope:
+            inspection_outputs = {}
+        store_operator_outputs(code_reference, inspection_outputs, code_reference_inspection_output_map, func_name,
+                               columns)
+        return None
+
+    annotations, inspection_outputs = collect_inspection_outputs(inspections, annotation_iterators)
+    if not in_operator_scope:
+        inspection_outputs = {}
+    store_operator_outputs(code_reference, inspection_outputs, code_reference_inspection_output_map, func_name,
+                           columns)
+    return store_annotations(annotation_registry, annotations, return_value)
+
+
+def collect_inspection_outputs(inspections, annotation_iterators):
+    """
+    Collect the annotations for the rows and the inspection annotations for the DAG operator after the visits
+    """
+    annotations = AnnotationStore.from_iters(inspections, annotation_iterators)
+    return annotations, get_operator_annotations_after_visits(inspections)
+
+
+def get_operator_annotations_after_visits(inspections):
+    """
+    Get the inspection annotations for the DAG operator after the visits
     """
-    # pylint: disable=too-many-arguments, too-many-locals, too-many-branches
-    annotations_ndarray = build_annotation_list_from_iters(annotation_iterators)
     inspection_outputs = {}
     for inspection in inspections:
         inspection_outputs[inspection] = inspection.get_operator_annotation_after_visit()
+    return inspection_outputs
 
+
+def store_operator_outputs(code_reference, inspection_outputs, code_reference_inspection_output_map, func_name,
+                           columns):
+    """
+    Store the inspection annotations and the columns for one of the DAG operators of an estimator or transformer
+    """
     stored_inspection_results = code_reference_inspection_output_map.get(code_reference, {})
     stored_inspection_results[func_name] = (inspection_outputs, columns)
     code_reference_inspection_output_map[code_reference] = stored_inspection_results
-
-    if is_sink:
-        new_return_value = None
-    else:
-        new_return_value = create_wrapper_with_annotations(annotations_ndarray, return_value)
-
-    return new_return_value
@@ -2,6 +2,7 @@
 Preprocess Sklearn WIR nodes to enable DAG extraction
 """
 
+from ._sklearn_wir_processor import SklearnWirPreprocessor
 from ..instrumentation._dag_node import DagNodeIdentifier
 from ..utils._utils import traverse_graph_and_process_nodes
 
@@ -57,6 +58,13 @@ class SklearnDagPostprocessor:
                 annotations, columns = annotations_for_all_associated_dag_nodes['fit']
                 new_code_references_to_inspection_result[dag_node_identifier] = annotations
                 new_code_references_to_columns[dag_node_identifier] = columns
+            elif node.module[0] == 'sklearn.pipeline' and len(node.module) == 3 and \
+                    node.module[1] in SklearnWirPreprocessor.KNOWN_INFERENCE_FUNCTIONS:
+                annotations_for_all_associated_dag_nodes = annotation_post_processing_map[node.code_reference]
+                func_name = {"Test Data": "{} X", "Test Labels": "{} y", "Pipeline": "{}"}[node.module[2]]
+                annotations, columns = annotations_for_all_associated_dag_nodes[func_name.format(node.module[1])]
+                new_code_references_to_inspection_result[dag_node_identifier] = annotations
+                new_code_references_to_columns[dag_node_identifier] = columns
             elif node.module == ('sklearn.pipeline', 'Pipeline'):
                 pass  # Nothing to do here
 
@@ -31,6 +31,8 @@ class SklearnWirPreprocessor:
         ('sklearn.pipeline', 'fit')
     }
 
+    KNOWN_INFERENCE_FUNCTIONS = {'transform', 'predict', 'predict_proba', 'score'}
+
     def __init__(self):
         self.wir_node_to_sub_pipeline_start = {}
         self.wir_node_to_sub_pipeline_end = {}
@@ -41,7 +43,7 @@ class SklearnWirPreprocessor:
         declaration style from other parts of the library
         """
 
-        def process_node(node, _):
+        def process_node(node, processed_nodes):
             if node.module in self.KNOWN_SINGLE_STEPS:
                 self.preprocess_single_step(node)
             elif node.module == ('sklearn.compose._column_transformer', 'ColumnTransformer'):
@@ -50,6 +52,9 @@ class SklearnWirPreprocessor:
                 self.preprocess_pipeline(graph, node)
             elif node.module == ('sklearn.pipeline', 'fit'):
                 self.preprocess_pipeline_fit(graph, node)
+            elif node.module is not None and node.module[0] == 'sklearn.pipeline' and len(node.module) == 2 and \
+                    node.module[1] in self.KNOWN_INFERENCE_FUNCTIONS:
+                self.preprocess_pipeline_inference(graph, node, processed_nodes)
 
         graph = traverse_graph_and_process_nodes(graph, process_node)
         return graph
@@ -134,6 +139,41 @@ class SklearnWirPreprocessor:
             graph.add_edge(target_node_or_none, new_pipeline_train_labels_node)
             graph.add_edge(new_pipeline_train_labels_node, new_pipeline_fit_node)
 
+    def preprocess_pipeline_inference(self, graph, node, processed_nodes):
+        """
+        Preprocessing for Pipeline.transform, predict, predict_proba and score: Creates Test Data and Test Labels
+        DAG nodes and connects the end of the fitted pipeline-chain to the inference node
+        """
+        pipeline_node = self.get_sklearn_call_wir_node(graph, get_sorted_node_parents(graph, node)[0])
+        if pipeline_node.module == ('sklearn.pipeline', 'fit'):
+            pipeline_node = self.get_pipeline_fit_pipeline_node(graph, pipeline_node)
+        data_node = self.get_pipeline_fit_arg_node(graph, node, 0)
+        target_node_or_none = self.get_pipeline_fit_arg_node(graph, node, 1)
+        pipeline_end = self.wir_node_to_sub_pipeline_end[pipeline_node]
+
+        new_inference_module = (node.module[0], node.module[1], "Pipeline")
+        new_inference_node = WirNode(node.node_id, node.name, node.operation, node.code_reference,
+                                     new_inference_module, source_code=node.source_code)
+        for child in list(graph.successors(node)):
+            graph.add_edge(new_inference_node, child, **graph.get_edge_data(node, child))
+        graph.remove_node(node)
+        graph.add_edge(pipeline_end, new_inference_node)
+        # The children of the call may still wait for all their parents to be processed
+        processed_nodes.add(new_inference_node)
+
+        new_test_data_module = (node.module[0], node.module[1], "Test Data")
+        new_test_data_node = WirNode(node.node_id, "Test Data", node.operation, node.code_reference,
+                                     new_test_data_module, source_code=node.source_code)
+        graph.add_edge(data_node, new_test_data_node)
+        graph.add_edge(new_test_data_node, new_inference_node)
+
+        if target_node_or_none and node.module[1] == 'score':
+            new_test_labels_module = (node.module[0], node.module[1], "Test Labels")
+            new_test_labels_node = WirNode(node.node_id, "Test Labels", node.operation, node.code_reference,
+                                           new_test_labels_module, source_code=node.source_code)
+            graph.add_edge(target_node_or_none, new_test_labels_node)
+            graph.add_edge(new_test_labels_node, new_inference_node)
+
     @staticmethod
     def get_column_transformer_transformers_arg(graph, node):
         """
@@ -12,6 +12,7 @@ from pandas import DataFrame
 from mlinspect.checks._check import Check, CheckStatus, CheckResult
 from mlinspect.inspections._histogram_for_columns import HistogramForColumns
 from mlinspect.inspections._inspection import Inspection
+from mlinspect.inspections._sampled_count import SampledCount
 from mlinspect.instrumentation._dag_node import OperatorType, DagNode
 from mlinspect.inspections._inspection_result import InspectionResult
 
@@ -64,6 +65,9 @@ class NoBiasIntroducedFor(Check):
                                                                                OperatorType.SELECTION} or
                           (node.module == ('sklearn.impute._base', 'SimpleImputer', 'Pipeline') and
                            node.columns[0] in self.sensitive_columns)]
+        # With PipelineInspectorBuilder.only_for, operators outside of the scope have no histograms
+        relevant_nodes = [node for node in relevant_nodes if node in histograms and
+                          all(parent in histograms for parent in dag.predecessors(node))]
         check_status = CheckStatus.SUCCESS
         bias_distribution_change = collections.OrderedDict()
         issue_list = []
@@ -94,18 +98,18 @@ class NoBiasIntroducedFor(Check):
         """
         # pylint: disable=too-many-locals, too-many-arguments
         after_map = histograms[node][column]
-        after_df = DataFrame(after_map.items(), columns=["sensitive_column_value", "count_after"])
+        after_df = self.get_histogram_df(after_map, "count_after")
 
         before_map = {}
         for parent in parents:
             parent_histogram = histograms[parent][column]
             before_map = {**before_map, **parent_histogram}
-        before_df = DataFrame(before_map.items(), columns=["sensitive_column_value", "count_before"])
+        before_df = self.get_histogram_df(before_map, "count_before")
 
         joined_df = before_df.merge(after_df, on="sensitive_column_value", how="outer")
         joined_df = joined_df.sort_values(by=['sensitive_column_value']).reset_index(drop=True)
-        joined_df["count_before"] = joined_df["count_before"].fillna(0)
-        joined_df["count_after"] = joined_df["count_after"].fillna(0)
+        for count_column in joined_df.columns[1:]:
+            joined_df[count_column] = joined_df[count_column].fillna(0)
 
         # TODO: What information is useful/what is confusing?
         # joined_df["absolute_change"] = joined_df["count_after"] - joined_df["count_before"]
@@ -123,6 +127,19 @@ class NoBiasIntroducedFor(Check):
         all_changes_acceptable = min_relative_ratio_change >= self.min_allowed_relative_ratio_change
         return BiasDistributionChange(node, all_changes_acceptable, min_relative_ratio_change, joined_df)
 
+    @staticmethod
+    def get_histogram_df(histogram, count_column):
+        """
+        Get the histogram of a column as DataFrame. With sampling, the counts are the estimates for the full data
+        and there are additional columns with the confidence bounds.
+        """
+        if not any(isinstance(count, SampledCount) for count in histogram.values()):
+            return DataFrame(histogram.items(), columns=["sensitive_column_value", count_column])
+        rows = [(column_value, count.estimate, count.lower_bound, count.upper_bound)
+                for column_value, count in histogram.items()]
+        return DataFrame(rows, columns=["sensitive_column_value", count_column, count_column + "_lower_bound",
+                                        count_column + "_upper_bound"])
+
     @staticmethod
     def plot_distribution_change_histograms(distribution_change: BiasDistributionChange, filename=None,
                                             save_to_file=False):
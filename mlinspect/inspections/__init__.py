@@ -4,18 +4,24 @@ Packages and classes we want to expose to users
 from ._inspection import Inspection
 from ._inspection_result import InspectionResult
 from ._inspection_input import InspectionInputUnaryOperator, InspectionInputDataSource, InspectionInputSinkOperator, \
-    InspectionInputNAryOperator
+    InspectionInputNAryOperator, InspectionBatchUnaryOperator, InspectionBatchDataSource, InspectionBatchSinkOperator, \
+    InspectionBatchNAryOperator, InspectionPassThroughUnaryOperator
 from ._histogram_for_columns import HistogramForColumns
 from ._lineage import RowLineage
 from ._materialize_first_output_rows import MaterializeFirstOutputRows
+from ._sampled_count import SampledCount
 
 __all__ = [
     # For defining custom inspections
     'Inspection', 'InspectionResult',
     'InspectionInputUnaryOperator', 'InspectionInputDataSource', 'InspectionInputSinkOperator',
     'InspectionInputNAryOperator',
+    'InspectionBatchUnaryOperator', 'InspectionBatchDataSource', 'InspectionBatchSinkOperator',
+    'InspectionBatchNAryOperator', 'InspectionPassThroughUnaryOperator',
     # Native inspections
     'HistogramForColumns',
     'RowLineage',
-    'MaterializeFirstOutputRows'
+    'MaterializeFirstOutputRows',
+    # Results of inspections with sampling
+    'SampledCount'
 ]
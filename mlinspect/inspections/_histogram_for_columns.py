@@ -6,6 +6,7 @@ from typing import Iterable
 from mlinspect.inspections._inspection import Inspection
 from mlinspect.inspections._inspection_input import InspectionInputDataSource, \
     InspectionInputUnaryOperator, InspectionInputNAryOperator
+from mlinspect.inspections._sampled_count import SampledCount
 from mlinspect.instrumentation._dag_node import OperatorType
 
 
@@ -118,12 +119,28 @@ class HistogramForColumns(Inspection):
         for check_index, column in enumerate(self.sensitive_columns):
             self._histogram_op_output[column] = histogram_maps[check_index]
 
+    def visit_operator_sink(self, inspection_input) -> None:
+        """
+        Visit an operator like an estimator, there is no histogram for operators without output rows
+        """
+        self._operator_type = inspection_input.operator_context.operator
+
     def get_operator_annotation_after_visit(self) -> any:
         assert self._operator_type
-        if self._operator_type is not OperatorType.ESTIMATOR:
+        if self._operator_type not in {OperatorType.ESTIMATOR, OperatorType.SCORE}:
             result = self._histogram_op_output
             self._histogram_op_output = None
             self._operator_type = None
             return result
         self._operator_type = None
         return None
+
+    def scale_operator_annotation(self, annotation: any, sampling_fraction: float, confidence: float) -> any:
+        """
+        With sampling, the histograms contain SampledCounts instead of the counts in the sample
+        """
+        if annotation is None:
+            return None
+        return {column: {column_value: SampledCount.from_sample(count, sampling_fraction, confidence)
+                         for column_value, count in histogram.items()}
+                for column, histogram in annotation.items()}
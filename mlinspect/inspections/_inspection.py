@@ -4,8 +4,12 @@ The Interface for the Inspection
 import abc
 from typing import Union, Iterable
 
+import numpy
+
 from mlinspect.inspections._inspection_input import InspectionInputDataSource, \
-    InspectionInputUnaryOperator, InspectionInputNAryOperator, InspectionInputSinkOperator
+    InspectionInputUnaryOperator, InspectionInputNAryOperator, InspectionInputSinkOperator, \
+    InspectionBatchDataSource, InspectionBatchUnaryOperator, InspectionBatchNAryOperator, InspectionBatchSinkOperator, \
+    InspectionPassThroughUnaryOperator, OperatorContext
 
 
 class Inspection(metaclass=abc.ABCMeta):
@@ -25,11 +29,63 @@ class Inspection(metaclass=abc.ABCMeta):
         """Visit an operator in the DAG"""
         raise NotImplementedError
 
+    def visit_operator_batch(self, inspection_input: Union[InspectionBatchDataSource, InspectionBatchUnaryOperator,
+                                                           InspectionBatchNAryOperator, InspectionBatchSinkOperator])\
+            -> numpy.ndarray:
+        """
+        Optionally, visit an operator in the DAG with column-oriented blocks of all rows instead of row by row.
+        Returns a one-dimensional array with the annotation for each output row, or each input row for sinks.
+        The backends use it instead of visit_operator if an inspection implements it.
+        """
+
+    @property
+    def supports_batch_visits(self) -> bool:
+        """Whether the inspection implements visit_operator_batch"""
+        return type(self).visit_operator_batch is not Inspection.visit_operator_batch
+
+    def visits_sink_rows(self, operator_context: OperatorContext) -> bool:
+        """
+        Whether the inspection iterates over the rows of operators like estimators that only get fitted in
+        visit_operator. The backends then need to create a tuple of the features and the label for each training
+        row, which is expensive for big or sparse feature matrices. Inspections without visit_operator_batch that
+        implement visit_operator_sink get called with the whole arrays instead.
+        """
+        # pylint: disable=unused-argument
+        return type(self).visit_operator_sink is Inspection.visit_operator_sink
+
+    def visit_operator_sink(self, inspection_input: InspectionBatchSinkOperator) -> None:
+        """
+        Optionally, visit an operator like an estimator with the whole feature matrix and label vector and the
+        annotation arrays of their rows instead of row by row, see visits_sink_rows
+        """
+
+    def passes_annotations_through(self, operator_context: OperatorContext) -> bool:
+        """
+        Whether the inspection yields the annotations of the input rows unchanged for operators with one parent
+        that do not change the rows, like projections and transformers. For these operators, the backends then
+        reuse the annotations of the input without iterating over the rows and call visit_operator_pass_through.
+        """
+        # pylint: disable=no-self-use, unused-argument
+        return False
+
+    def visit_operator_pass_through(self, inspection_input: InspectionPassThroughUnaryOperator) -> None:
+        """
+        Visit an operator the inspection passes the annotations through, see passes_annotations_through
+        """
+
     @abc.abstractmethod
     def get_operator_annotation_after_visit(self) -> any:
         """Get the output to be included in the DAG"""
         raise NotImplementedError
 
+    def scale_operator_annotation(self, annotation: any, sampling_fraction: float, confidence: float) -> any:
+        """
+        Adjust the output of an operator that only saw a sample of its rows, see
+        PipelineInspectorBuilder.with_sampling. By default, the output does not change.
+        """
+        # pylint: disable=no-self-use, unused-argument
+        return annotation
+
     def __eq__(self, other):
         """Inspections must implement equals"""
         return (isinstance(other, self.__class__) and
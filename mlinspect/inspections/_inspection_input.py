@@ -4,15 +4,20 @@ Data classes used as input for the inspections
 import dataclasses
 from typing import Tuple, List, Iterable
 
+import numpy
+
 from ..instrumentation._dag_node import OperatorType
 
 
 @dataclasses.dataclass(frozen=True)
 class ColumnInfo:
     """
-    A class we use to efficiently pass pandas/sklearn rows
+    A class we use to efficiently pass pandas/sklearn rows. For sparse data, the rows are dense but batch visits
+    get the scipy csr_matrix with its indptr, indices and data arrays.
     """
     fields: List[str]
+    dtypes: List[numpy.dtype] or None = None
+    is_sparse: bool = False
 
     def get_index_of_column(self, column_name):
         """
@@ -113,3 +118,66 @@ class InspectionInputSinkOperator:
     operator_context: OperatorContext
     inputs_columns: List[ColumnInfo]
     row_iterator: Iterable[InspectionRowSinkOperator]
+
+
+@dataclasses.dataclass(frozen=True)
+class InspectionBatchDataSource:
+    """
+    The column-oriented input for Inspection.visit_operator_batch: a Data Source
+    """
+    operator_context: OperatorContext
+    output_columns: ColumnInfo
+    output: any
+
+
+@dataclasses.dataclass(frozen=True)
+class InspectionBatchUnaryOperator:
+    """
+    The column-oriented input for Inspection.visit_operator_batch: operators with one parent. The input, annotation,
+    and output rows at the same position belong together.
+    """
+    operator_context: OperatorContext
+    input_columns: ColumnInfo
+    output_columns: ColumnInfo
+    input: any
+    annotation: numpy.ndarray
+    output: any
+
+
+@dataclasses.dataclass(frozen=True)
+class InspectionBatchNAryOperator:
+    """
+    The column-oriented input for Inspection.visit_operator_batch: operators with multiple parents
+    """
+    operator_context: OperatorContext
+    inputs_columns: List[ColumnInfo]
+    output_columns: ColumnInfo
+    inputs: List[any]
+    annotation: List[numpy.ndarray]
+    output: any
+
+
+@dataclasses.dataclass(frozen=True)
+class InspectionBatchSinkOperator:
+    """
+    The column-oriented input for Inspection.visit_operator_batch: operators like Estimators that only get fitted
+    """
+    operator_context: OperatorContext
+    inputs_columns: List[ColumnInfo]
+    inputs: List[any]
+    annotation: List[numpy.ndarray]
+
+
+@dataclasses.dataclass(frozen=True)
+class InspectionPassThroughUnaryOperator:
+    """
+    The input for Inspection.visit_operator_pass_through: operators with one parent that do not change the rows,
+    like projections and transformers. There is no row iterator, the annotations of the output rows are the
+    annotations of the input rows.
+    """
+    operator_context: OperatorContext
+    input_columns: ColumnInfo
+    output_columns: ColumnInfo
+    row_count: int
+    output: any
+    annotation_rows: Iterable[any]
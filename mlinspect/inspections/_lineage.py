@@ -2,6 +2,7 @@
 A simple inspection for testing annotation propagation
 """
 import dataclasses
+import itertools
 from typing import Iterable
 
 from pandas import DataFrame, Series
@@ -9,6 +10,7 @@ from pandas import DataFrame, Series
 from mlinspect.inspections._inspection import Inspection
 from mlinspect.inspections._inspection_input import InspectionInputUnaryOperator, \
     InspectionInputSinkOperator, InspectionInputDataSource, InspectionInputNAryOperator
+from mlinspect.inspections._materialize_first_output_rows import get_first_rows
 from mlinspect.instrumentation._dag_node import OperatorType
 
 
@@ -103,6 +105,23 @@ class RowLineage(Inspection):
         self._op_output = operator_output
         self._op_lineage = operator_lineage
 
+    def visit_operator_sink(self, inspection_input) -> None:
+        """Visit an operator like an estimator, the lineage of the training rows is the union of the inputs lineage"""
+        self._is_sink = True
+        self._op_lineage = [set.union(*row_annotation) for row_annotation in zip(*inspection_input.annotation)]
+        self._operator_count += 1
+
+    def passes_annotations_through(self, operator_context) -> bool:
+        """Operators with one parent do not change the lineage of the rows"""
+        return True
+
+    def visit_operator_pass_through(self, inspection_input) -> None:
+        """Visit an operator with one parent that does not change the rows, only the first rows get materialized"""
+        self._output_columns = inspection_input.output_columns.fields
+        self._op_output = get_first_rows(inspection_input.output, self.row_count)
+        self._op_lineage = list(itertools.islice(inspection_input.annotation_rows, self.row_count))
+        self._operator_count += 1
+
     def get_operator_annotation_after_visit(self) -> any:
         assert self._op_lineage  # May only be called after the operator visit is finished
         if not self._is_sink:
@@ -1,12 +1,15 @@
 """
 A simple example analyzer
 """
+import itertools
 from typing import Iterable
 
+import numpy
 from pandas import DataFrame
+from scipy.sparse import csr_matrix
 
 from ._inspection import Inspection
-from ._inspection_input import InspectionInputSinkOperator
+from ._inspection_input import InspectionInputSinkOperator, InspectionBatchSinkOperator
 from ..instrumentation._dag_node import OperatorType
 
 
@@ -47,9 +50,36 @@ class MaterializeFirstOutputRows(Inspection):
 
         self._first_rows_op_output = operator_output
 
+    def visit_operator_batch(self, inspection_input) -> numpy.ndarray:
+        """
+        Visit an operator with column-oriented blocks, only the first rows get materialized
+        """
+        self._operator_type = inspection_input.operator_context.operator
+
+        if not isinstance(inspection_input, InspectionBatchSinkOperator):
+            self._output_columns = inspection_input.output_columns.fields
+            self._first_rows_op_output = get_first_rows(inspection_input.output, self.row_count)
+            row_count = get_row_count(inspection_input.output)
+        else:
+            self._first_rows_op_output = []
+            row_count = get_row_count(inspection_input.inputs[0])
+        return numpy.full(row_count, None, dtype=object)
+
+    def passes_annotations_through(self, operator_context) -> bool:
+        """The annotations are always None"""
+        return True
+
+    def visit_operator_pass_through(self, inspection_input) -> None:
+        """
+        Visit an operator with one parent that does not change the rows, only the first rows get materialized
+        """
+        self._operator_type = inspection_input.operator_context.operator
+        self._output_columns = inspection_input.output_columns.fields
+        self._first_rows_op_output = get_first_rows(inspection_input.output, self.row_count)
+
     def get_operator_annotation_after_visit(self) -> any:
         assert self._operator_type
-        if self._operator_type is not OperatorType.ESTIMATOR:
+        if self._operator_type not in {OperatorType.ESTIMATOR, OperatorType.SCORE}:
             assert self._first_rows_op_output and self._output_columns is not None  # Visit must be finished
             result = DataFrame(self._first_rows_op_output, columns=self._output_columns)
             self._first_rows_op_output = None
@@ -59,3 +89,24 @@ class MaterializeFirstOutputRows(Inspection):
         self._operator_type = None
         self._output_columns = None
         return None
+
+
+def get_first_rows(data, row_count):
+    """
+    Get the first rows of some operator output as tuples, like the row iterators of the backends create them
+    """
+    if isinstance(data, DataFrame):
+        first_rows = data.iloc[:row_count]
+        return list(zip(*[first_rows.iloc[:, k] for k in range(len(first_rows.columns))]))
+    if isinstance(data, csr_matrix):
+        return [(row,) for row in data[:row_count].toarray()]
+    return [(value,) for value in itertools.islice(data, row_count)]
+
+
+def get_row_count(data):
+    """
+    Get the number of rows of some operator input or output
+    """
+    if isinstance(data, list):
+        return len(data)
+    return data.shape[0]
@@ -0,0 +1,30 @@
+"""
+Counts of inspections that only saw a sample of the rows
+"""
+import dataclasses
+import math
+from statistics import NormalDist
+
+
+@dataclasses.dataclass(frozen=True)
+class SampledCount:
+    """
+    A count estimated from a row sample with the bounds of its confidence interval
+    """
+    sample_count: int
+    estimate: float
+    lower_bound: float
+    upper_bound: float
+
+    @staticmethod
+    def from_sample(sample_count: int, sampling_fraction: float, confidence: float) -> 'SampledCount':
+        """
+        Scale a count from a sample where each row was included with probability sampling_fraction. The interval
+        uses the normal approximation of the binomial sampling variance sample_count * (1 - sampling_fraction).
+        Rows of joins on columns that were not sampled by key or rows with duplicate sampling keys are not included
+        independently, their true variance is larger than these bounds.
+        """
+        estimate = sample_count / sampling_fraction
+        z_score = NormalDist().inv_cdf((1 + confidence) / 2)
+        margin = z_score * math.sqrt(sample_count * (1 - sampling_fraction)) / sampling_fraction
+        return SampledCount(sample_count, estimate, max(estimate - margin, sample_count), estimate + margin)
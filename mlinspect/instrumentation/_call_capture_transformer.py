@@ -9,9 +9,11 @@ class CallCaptureTransformer(ast.NodeTransformer):
     ast.NodeTransformer to replace calls with captured calls
     """
 
-    def __init__(self, source_code):
+    def __init__(self, source_code, pruned_nodes=frozenset(), guarded_nodes=frozenset()):
         super().__init__()
         self.source_code = source_code
+        self.pruned_nodes = pruned_nodes
+        self.guarded_nodes = guarded_nodes
 
     def visit_Call(self, node):
         """
@@ -19,6 +21,8 @@ class CallCaptureTransformer(ast.NodeTransformer):
         """
         # pylint: disable=invalid-name
         ast.NodeTransformer.generic_visit(self, node)
+        if node in self.pruned_nodes:
+            return self.add_pruned_call_guard(node)
         call_code = ast.get_source_segment(self.source_code, node)
 
         self.add_before_call_used_value_capturing_call(call_code, node, self.source_code)
@@ -34,7 +38,9 @@ class CallCaptureTransformer(ast.NodeTransformer):
         """
         # pylint: disable=invalid-name
         ast.NodeTransformer.generic_visit(self, node)
-        if isinstance(node.ctx, ast.Load):
+        if node in self.pruned_nodes:
+            result = self.add_pruned_call_guard(node)
+        elif isinstance(node.ctx, ast.Load):
             subscript_code = ast.get_source_segment(self.source_code, node)
 
             self.add_before_call_used_value_capturing_subscript(subscript_code, node, self.source_code)
@@ -51,6 +57,23 @@ class CallCaptureTransformer(ast.NodeTransformer):
             assert False
         return result
 
+    def add_pruned_call_guard(self, node):
+        """
+        Calls that can not reach relevant objects stay uninstrumented. If their result is used, a cheap guard
+        checks that they really do not return objects a backend is responsible for.
+        """
+        if node not in self.guarded_nodes:
+            return node
+        guarded_call_node = ast.Call(func=ast.Name(id='after_pruned_call_used', ctx=ast.Load()),
+                                     args=[node,
+                                           ast.Constant(n=node.lineno, kind=None),
+                                           ast.Constant(n=node.col_offset, kind=None),
+                                           ast.Constant(n=node.end_lineno, kind=None),
+                                           ast.Constant(n=node.end_col_offset, kind=None)],
+                                     keywords=[])
+        guarded_call_node = ast.copy_location(guarded_call_node, node)
+        return guarded_call_node
+
     @staticmethod
     def add_before_call_used_value_capturing_call(call_code, node, all_source_code):
         """
@@ -0,0 +1,193 @@
+"""
+Static analysis to find the call sites that can not reach objects any backend is responsible for
+"""
+import ast
+import builtins
+import sys
+
+from ._dag_node import CodeReference
+
+# Python 3.10+ provides sys.stdlib_module_names, for older versions we use a list of common stdlib modules
+STDLIB_MODULE_NAMES = frozenset(getattr(sys, "stdlib_module_names", (
+    "abc", "argparse", "array", "ast", "base64", "bisect", "builtins", "calendar", "collections", "contextlib",
+    "copy", "csv", "dataclasses", "datetime", "decimal", "difflib", "enum", "errno", "fnmatch", "fractions",
+    "functools", "gc", "getpass", "glob", "gzip", "hashlib", "heapq", "hmac", "html", "inspect", "io",
+    "itertools", "json", "locale", "logging", "lzma", "math", "numbers", "operator", "os", "pathlib", "pickle",
+    "platform", "pprint", "queue", "random", "re", "secrets", "shlex", "shutil", "signal", "socket",
+    "statistics", "string", "struct", "subprocess", "sys", "tempfile", "textwrap", "threading", "time",
+    "timeit", "traceback", "types", "typing", "unicodedata", "urllib", "uuid", "warnings", "weakref", "zipfile",
+    "zlib")))
+
+# Builtins that never return objects a backend is responsible for, calls to them need no runtime guard
+NON_RELEVANT_RESULT_BUILTINS = frozenset((
+    "abs", "bool", "callable", "chr", "float", "format", "hasattr", "hash", "id", "int", "isinstance",
+    "issubclass", "len", "ord", "print", "range", "repr", "round", "str"))
+
+
+class CallRelevanceAnalysis:
+    """
+    Finds the calls and subscripts in the pipeline code that can not possibly be called on pandas or sklearn
+    objects. The analysis uses the import table and a simple flow-insensitive dataflow analysis: names are
+    relevant if they are imported from non-stdlib modules, are function parameters, are unknown, get
+    assigned values computed from relevant names, or are the receivers of method calls with relevant arguments,
+    e.g., frames for 'frames.append(pd.read_csv(path))'. Calls that returned relevant objects in an earlier run
+    are relevant too.
+    """
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, ast_root: ast.Module, relevant_calls=frozenset()):
+        self.ast_root = ast_root
+        self.relevant_calls = relevant_calls
+        self.relevant_names = set()
+        self.bound_names = set()
+        self.bindings = []
+        self.receiver_bindings = []
+        self.stdlib_module_names = set()
+        self.prune_nothing = False
+
+    def analyse(self):
+        """
+        Returns the call and subscript nodes that can be left uninstrumented and the subset of those that need
+        a runtime guard because their result is used
+        """
+        for node in ast.walk(self.ast_root):
+            self.collect_bindings(node)
+        if self.prune_nothing:
+            return set(), set()
+
+        for node in ast.walk(self.ast_root):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in self.bound_names \
+                    and not hasattr(builtins, node.id):
+                self.relevant_names.add(node.id)  # Unknown names, e.g., names injected into the script scope
+        self.propagate_relevance()
+
+        pruned_nodes = set()
+        guarded_nodes = set()
+        for parent in ast.walk(self.ast_root):
+            for node in ast.iter_child_nodes(parent):
+                if isinstance(node, ast.Call) and not self.is_relevant(node.func) and not self.is_relevant_call(node):
+                    pruned_nodes.add(node)
+                    if not isinstance(parent, ast.Expr) and not self.has_non_relevant_result(node):
+                        guarded_nodes.add(node)
+                elif isinstance(node, ast.Subscript) and not self.is_relevant(node.value) \
+                        and not self.is_relevant_call(node):
+                    pruned_nodes.add(node)
+                    if isinstance(node.ctx, ast.Load) and not isinstance(parent, ast.Expr):
+                        guarded_nodes.add(node)
+        return pruned_nodes, guarded_nodes
+
+    def collect_bindings(self, node):
+        """
+        Collect all (targets, values) pairs that bind names
+        """
+        # pylint: disable=too-many-branches
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            self.collect_import(node)
+        elif isinstance(node, ast.Assign):
+            self.bindings.append((node.targets, [node.value]))
+        elif isinstance(node, (ast.AnnAssign, ast.NamedExpr)):
+            self.bindings.append(([node.target], [node.value] if node.value is not None else []))
+        elif isinstance(node, ast.AugAssign):
+            self.bindings.append(([node.target], [node.value]))
+        elif isinstance(node, (ast.For, ast.AsyncFor, ast.comprehension)):
+            self.bindings.append(([node.target], [node.iter]))
+        elif isinstance(node, ast.withitem) and node.optional_vars is not None:
+            self.bindings.append(([node.optional_vars], [node.context_expr]))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self.bound_names.add(node.name)
+            # Calling a function is relevant if it may return relevant values
+            returned_values = [child.value for child in ast.walk(node)
+                               if isinstance(child, (ast.Return, ast.Yield, ast.YieldFrom)) and child.value]
+            self.bindings.append(([ast.Name(id=node.name, ctx=ast.Store())], node.decorator_list + returned_values))
+        elif isinstance(node, ast.ClassDef):
+            self.bound_names.add(node.name)
+            base_values = node.bases + [keyword.value for keyword in node.keywords] + node.decorator_list
+            self.bindings.append(([ast.Name(id=node.name, ctx=ast.Store())], base_values))
+        elif isinstance(node, ast.arguments):
+            # We do not know which values functions get called with
+            all_args = node.posonlyargs + node.args + node.kwonlyargs + [node.vararg, node.kwarg]
+            for arg in all_args:
+                if arg is not None:
+                    self.bound_names.add(arg.arg)
+                    self.relevant_names.add(arg.arg)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            argument_values = node.args + [keyword.value for keyword in node.keywords]
+            self.receiver_bindings.append(([node.func.value], argument_values))
+        elif isinstance(node, ast.ExceptHandler) and node.name is not None:
+            self.bound_names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            self.bound_names.update(node.names)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            self.bound_names.add(node.id)
+
+    def collect_import(self, node):
+        """
+        Names imported from modules other than the standard library are relevant
+        """
+        if isinstance(node, ast.ImportFrom):
+            module_name = node.module if node.level == 0 and node.module else None
+        else:
+            module_name = None
+        for alias in node.names:
+            imported_module = module_name or alias.name
+            if alias.name == "*":
+                if imported_module.split(".", 1)[0] not in STDLIB_MODULE_NAMES:
+                    self.prune_nothing = True
+                continue
+            bound_name = alias.asname or alias.name.split(".", 1)[0]
+            self.bound_names.add(bound_name)
+            if imported_module.split(".", 1)[0] not in STDLIB_MODULE_NAMES:
+                self.relevant_names.add(bound_name)
+            else:
+                self.stdlib_module_names.add(bound_name)
+
+    def propagate_relevance(self):
+        """
+        Mark names as relevant until reaching a fixpoint
+        """
+        # Calls like os.path.join(data_dir, ...) do not modify the stdlib modules they are called on
+        receiver_bindings = [(receivers, values) for receivers, values in self.receiver_bindings
+                             if not set(self.get_target_names(receivers)) & self.stdlib_module_names]
+        changed = True
+        while changed:
+            changed = False
+            for targets, values in self.bindings + receiver_bindings:
+                if any(self.is_relevant(value) for value in values):
+                    for target_name in self.get_target_names(targets):
+                        if target_name not in self.relevant_names:
+                            self.relevant_names.add(target_name)
+                            changed = True
+
+    def is_relevant(self, expression):
+        """
+        An expression is relevant if it uses any relevant name or contains a call that returned a relevant object
+        in an earlier run
+        """
+        return any((isinstance(node, ast.Name) and node.id in self.relevant_names) or self.is_relevant_call(node)
+                   for node in ast.walk(expression))
+
+    def is_relevant_call(self, node):
+        """
+        Check if a runtime guard found the call or subscript to return a relevant object in an earlier run
+        """
+        return isinstance(node, (ast.Call, ast.Subscript)) and \
+            CodeReference(node.lineno, node.col_offset, node.end_lineno, node.end_col_offset) in self.relevant_calls
+
+    def has_non_relevant_result(self, call_node):
+        """
+        Check if the call is a call to a builtin that never returns relevant values
+        """
+        return isinstance(call_node.func, ast.Name) and call_node.func.id in NON_RELEVANT_RESULT_BUILTINS \
+            and call_node.func.id not in self.bound_names
+
+    @staticmethod
+    def get_target_names(targets):
+        """
+        The names that get modified by an assignment, e.g., data for 'data.x = ...' or 'data[x] = ...'
+        """
+        target_names = []
+        for target in targets:
+            for node in ast.walk(target):
+                if isinstance(node, ast.Name):
+                    target_names.append(node.id)
+        return target_names
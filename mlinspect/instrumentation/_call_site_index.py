@@ -0,0 +1,264 @@
+"""
+Find the call sites in the pipeline code that correspond to runtime calls, used by the monkey patching executor
+"""
+import ast
+import dataclasses
+import dis
+import sys
+from typing import Tuple
+
+from ._dag_node import CodeReference
+
+# The call opcodes and the bytecode offsets of frames change between CPython versions, the index only knows the
+# bytecode of this one
+SUPPORTED_PYTHON_VERSION = (3, 9)
+
+# The opcodes that can invoke a patched function or a __getitem__/__setitem__ directly from the pipeline code
+CALL_OPCODES = frozenset(("CALL_FUNCTION", "CALL_FUNCTION_KW", "CALL_FUNCTION_EX", "CALL_METHOD",
+                          "BINARY_SUBSCR", "STORE_SUBSCR", "DELETE_SUBSCR"))
+
+SUBSCRIPT_FUNCTION_NAMES = frozenset(("__getitem__", "__setitem__", "__delitem__"))
+
+COMPREHENSION_CODE_NAMES = {
+    ast.ListComp: "<listcomp>",
+    ast.SetComp: "<setcomp>",
+    ast.DictComp: "<dictcomp>",
+    ast.GeneratorExp: "<genexpr>",
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class CallSite:
+    """
+    A call or subscript in the user pipeline code
+    """
+    function_name: str
+    code_reference: CodeReference
+    call_code: str
+    value_code: str or None
+    args_code: Tuple[str]
+    kwargs_code: Tuple[str]
+
+
+def check_bytecode_support():
+    """
+    Fail fast on interpreters whose bytecode we can not map to call sites
+    """
+    python_version = tuple(sys.version_info[:2])
+    if sys.implementation.name != "cpython" or python_version != SUPPORTED_PYTHON_VERSION:
+        raise RuntimeError("The call site index only supports the bytecode of CPython {}.{}, got {} {}.{}!".format(
+            *SUPPORTED_PYTHON_VERSION, sys.implementation.name, *python_version))
+
+
+class CallSiteIndex:
+    """
+    Maps the frames of the running pipeline to the call sites in the source code. The bytecode offset of the
+    frame identifies the call if a line contains multiple calls, e.g., for selections like
+    'data[data['age'] > 30]'. If the bytecode of a line does not match the AST, we fall back to matching by
+    function name and line number.
+    """
+
+    def __init__(self, source_code: str):
+        self.source_code = source_code
+        self.function_name_to_call_sites = {}
+        self.scope_key_to_line_to_call_sites = {}
+        self.ambiguous_scope_keys = set()
+        self.code_to_offset_to_call_site = {}
+        self.cached_lookups = {}
+        self.annotation_scope_keys = {("<module>", 1)}
+        self.visit_in_evaluation_order(ast.parse(source_code), ("<module>", 1))
+
+    def visit_in_evaluation_order(self, node, scope_key):
+        """
+        Record the calls and subscripts per code object scope in the order CPython evaluates them, which
+        is the order of the call opcodes in the bytecode
+        """
+        # pylint: disable=too-many-branches,too-many-statements
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            for decorator in node.decorator_list:
+                self.visit_in_evaluation_order(decorator, scope_key)
+            if isinstance(node, ast.ClassDef):
+                self.visit_all_in_evaluation_order(node.bases + [keyword.value for keyword in node.keywords],
+                                                   scope_key)
+                self.add_opaque_call(node.lineno, scope_key)  # __build_class__
+            else:
+                self.visit_all_in_evaluation_order([node.args] + ([node.returns] if node.returns else []),
+                                                   scope_key)
+            for _ in node.decorator_list:
+                self.add_opaque_call(node.lineno, scope_key)
+            first_lineno = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            body_scope_key = self.get_new_scope_key(node.name, first_lineno)
+            if isinstance(node, ast.ClassDef):
+                self.annotation_scope_keys.add(body_scope_key)
+            self.visit_all_in_evaluation_order(node.body, body_scope_key)
+        elif isinstance(node, ast.Lambda):
+            self.visit_in_evaluation_order(node.args, scope_key)
+            self.visit_in_evaluation_order(node.body, self.get_new_scope_key("<lambda>", node.lineno))
+        elif isinstance(node, tuple(COMPREHENSION_CODE_NAMES)):
+            self.visit_in_evaluation_order(node.generators[0].iter, scope_key)
+            self.add_opaque_call(node.lineno, scope_key)
+            comprehension_scope_key = self.get_new_scope_key(COMPREHENSION_CODE_NAMES[type(node)], node.lineno)
+            for index, generator in enumerate(node.generators):
+                if index != 0:
+                    self.visit_in_evaluation_order(generator.iter, comprehension_scope_key)
+                self.visit_in_evaluation_order(generator.target, comprehension_scope_key)
+                self.visit_all_in_evaluation_order(generator.ifs, comprehension_scope_key)
+            if isinstance(node, ast.DictComp):
+                self.visit_all_in_evaluation_order([node.key, node.value], comprehension_scope_key)
+            else:
+                self.visit_in_evaluation_order(node.elt, comprehension_scope_key)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.NamedExpr)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            if node.value is not None:
+                self.visit_in_evaluation_order(node.value, scope_key)
+            self.visit_all_in_evaluation_order(targets, scope_key)
+            if isinstance(node, ast.AnnAssign) and node.simple and scope_key in self.annotation_scope_keys:
+                # Annotations of modules and classes get stored in __annotations__
+                self.visit_in_evaluation_order(node.annotation, scope_key)
+                self.add_opaque_call(node.lineno, scope_key)
+        elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Subscript):
+            self.visit_all_in_evaluation_order([node.target.value, node.target.slice], scope_key)
+            self.add_opaque_call(node.target.lineno, scope_key)  # Loading the old value
+            self.visit_in_evaluation_order(node.value, scope_key)
+            self.add_subscript(node.target, scope_key)
+        elif isinstance(node, ast.Dict):
+            for key, value in zip(node.keys, node.values):
+                self.visit_all_in_evaluation_order([key, value] if key is not None else [value], scope_key)
+        elif isinstance(node, (ast.For, ast.AsyncFor)):
+            self.visit_all_in_evaluation_order([node.iter, node.target] + node.body + node.orelse, scope_key)
+        elif isinstance(node, (ast.With, ast.AsyncWith)):
+            self.visit_all_in_evaluation_order(node.items + node.body, scope_key)
+            # The __exit__ calls belong to the line executed last, we can only know it for simple statements
+            last_lineno = node.body[-1].lineno if not hasattr(node.body[-1], "body") else node.lineno
+            for _ in node.items:
+                self.add_opaque_call(last_lineno, scope_key)
+        else:
+            self.visit_all_in_evaluation_order(list(ast.iter_child_nodes(node)), scope_key)
+            if isinstance(node, ast.Call):
+                self.add_call(node, scope_key)
+            elif isinstance(node, ast.Subscript):
+                self.add_subscript(node, scope_key)
+
+    def visit_all_in_evaluation_order(self, nodes, scope_key):
+        """
+        Visit a list of nodes that get evaluated one after another
+        """
+        for node in nodes:
+            self.visit_in_evaluation_order(node, scope_key)
+
+    def get_new_scope_key(self, code_name, first_lineno):
+        """
+        Code objects are identified by their name and first line, which is not unique, e.g., for two lambdas
+        on the same line
+        """
+        scope_key = (code_name, first_lineno)
+        if scope_key in self.scope_key_to_line_to_call_sites:
+            self.ambiguous_scope_keys.add(scope_key)
+        self.scope_key_to_line_to_call_sites.setdefault(scope_key, {})
+        return scope_key
+
+    def add_call(self, node, scope_key):
+        """
+        Calls are identified by the name of the called function
+        """
+        if isinstance(node.func, ast.Attribute):
+            function_name = node.func.attr
+            value_code = ast.get_source_segment(self.source_code, node.func.value)
+        elif isinstance(node.func, ast.Name):
+            function_name = node.func.id
+            value_code = None
+        else:
+            function_name = None
+            value_code = ast.get_source_segment(self.source_code, node.func)
+        args_code = tuple(ast.get_source_segment(self.source_code, arg) for arg in node.args)
+        kwargs_code = tuple(ast.get_source_segment(self.source_code, kwarg) for kwarg in node.keywords)
+        self.add_call_site(function_name, node, value_code, args_code, kwargs_code, scope_key)
+
+    def add_subscript(self, node, scope_key):
+        """
+        Subscripts are identified by __getitem__, __setitem__, and __delitem__
+        """
+        function_name = {ast.Load: "__getitem__", ast.Store: "__setitem__", ast.Del: "__delitem__"}[type(node.ctx)]
+        value_code = ast.get_source_segment(self.source_code, node.value)
+        args_code = (ast.get_source_segment(self.source_code, node.slice),)
+        self.add_call_site(function_name, node, value_code, args_code, (), scope_key)
+
+    def add_call_site(self, function_name, node, value_code, args_code, kwargs_code, scope_key):
+        """
+        Store a new call site
+        """
+        # pylint: disable=too-many-arguments
+        code_reference = CodeReference(node.lineno, node.col_offset, node.end_lineno, node.end_col_offset)
+        call_code = ast.get_source_segment(self.source_code, node)
+        call_site = CallSite(function_name, code_reference, call_code, value_code, args_code, kwargs_code)
+        self.function_name_to_call_sites.setdefault(function_name, []).append(call_site)
+        line_to_call_sites = self.scope_key_to_line_to_call_sites.setdefault(scope_key, {})
+        line_to_call_sites.setdefault(node.lineno, []).append(call_site)
+
+    def add_opaque_call(self, lineno, scope_key):
+        """
+        Some statements execute call opcodes that do not correspond to a call site
+        """
+        line_to_call_sites = self.scope_key_to_line_to_call_sites.setdefault(scope_key, {})
+        line_to_call_sites.setdefault(lineno, []).append(None)
+
+    def get_call_site(self, function_name: str, lineno: int, code=None, lasti=None) -> CallSite or None:
+        """
+        Get the call site of a function call that is executed on this line. If the code object and the
+        bytecode offset of the calling frame are known, they identify the call site exactly.
+        """
+        lookup_key = (function_name, lineno, code, lasti)
+        if lookup_key in self.cached_lookups:
+            return self.cached_lookups[lookup_key]
+        call_site = None
+        if code is not None:
+            call_site = self.get_offset_to_call_site(code).get(lasti)
+        is_subscript = function_name in SUBSCRIPT_FUNCTION_NAMES
+        if call_site is None or (call_site.function_name in SUBSCRIPT_FUNCTION_NAMES) != is_subscript \
+                or (is_subscript and call_site.function_name != function_name):
+            call_site = self.get_call_site_by_name(function_name, lineno)
+        self.cached_lookups[lookup_key] = call_site
+        return call_site
+
+    def get_offset_to_call_site(self, code):
+        """
+        Map the call opcodes of a code object to the call sites, for all lines where the number of call
+        opcodes matches the number of call sites
+        """
+        offset_to_call_site = self.code_to_offset_to_call_site.get(code)
+        if offset_to_call_site is not None:
+            return offset_to_call_site
+        offset_to_call_site = {}
+        scope_key = (code.co_name, code.co_firstlineno)
+        if code.co_name == "<module>":
+            scope_key = ("<module>", 1)
+        line_to_call_sites = self.scope_key_to_line_to_call_sites.get(scope_key)
+        if line_to_call_sites is not None and scope_key not in self.ambiguous_scope_keys:
+            line_to_offsets = {}
+            current_lineno = None
+            for instruction in dis.get_instructions(code):
+                if instruction.starts_line is not None:
+                    current_lineno = instruction.starts_line
+                if instruction.opname in CALL_OPCODES:
+                    line_to_offsets.setdefault(current_lineno, []).append(instruction.offset)
+            for lineno, offsets in line_to_offsets.items():
+                call_sites = line_to_call_sites.get(lineno, [])
+                if len(call_sites) == len(offsets):
+                    offset_to_call_site.update(zip(offsets, call_sites))
+        self.code_to_offset_to_call_site[code] = offset_to_call_site
+        return offset_to_call_site
+
+    def get_call_site_by_name(self, function_name: str, lineno: int) -> CallSite or None:
+        """
+        Calls can span multiple lines, so we prefer calls starting on the line and otherwise take the innermost
+        call containing it
+        """
+        candidates = [call_site for call_site in self.function_name_to_call_sites.get(function_name, [])
+                      if call_site.code_reference.lineno <= lineno <= call_site.code_reference.end_lineno]
+        call_site = None
+        if candidates:
+            call_site = min(candidates, key=lambda candidate: (
+                candidate.code_reference.lineno != lineno,
+                candidate.code_reference.end_lineno - candidate.code_reference.lineno,
+                candidate.code_reference.col_offset))
+        return call_site
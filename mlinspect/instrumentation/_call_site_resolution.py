@@ -0,0 +1,76 @@
+"""
+Caches which function an instrumented call site calls and which backend is responsible for it
+"""
+import builtins
+from types import ModuleType
+
+
+class CallSiteResolution:
+    """
+    The resolved function info and responsible backends of one call site in the user pipeline code.
+    The resolution is only redone when the type of the object the function is called on changes, or on each call
+    if that type is unknown.
+    """
+    NO_RECEIVER = object()
+
+    def __init__(self, function_string):
+        self.function_string = function_string
+        self.receiver_is_name = function_string.isidentifier()
+        self.captured_receiver_key = None
+        self.receiver_key = CallSiteResolution.NO_RECEIVER
+        self.function_info = None
+        self.function_prefix = None
+        self.hook_and_value_type_to_backend = {}
+
+    def capture_receiver(self, value):
+        """
+        before_call_used_value gets called before the other hooks of a call site with the object the
+        function is called on. Modules all share the same type, so we use the module itself.
+        """
+        self.captured_receiver_key = value if isinstance(value, ModuleType) else type(value)
+
+    def get_receiver_key(self, script_scope, subscript, store):
+        """
+        The type of the object the function is called on. For call sites without a before_call_used_value
+        capture, e.g., 'print(x)' or 'data['a'] = b', the receiver can only be looked up by name.
+        """
+        if self.captured_receiver_key is not None:
+            return self.captured_receiver_key
+        if not self.receiver_is_name:
+            return None
+        receiver = script_scope.get(self.function_string, getattr(builtins, self.function_string, None))
+        if subscript and store:
+            return type(receiver)
+        return receiver
+
+    def is_resolved_for(self, receiver_key):
+        """
+        Check whether the cached function info is still valid for this receiver. Without a receiver key, we can
+        not tell whether the call site calls something else now, so these call sites get resolved on each call.
+        """
+        return receiver_key is not None and self.function_info is not None and self.receiver_key is receiver_key
+
+    def update(self, receiver_key, function_info, function_prefix):
+        """
+        Store a new resolution and invalidate the cached backends
+        """
+        self.receiver_key = receiver_key
+        self.function_info = function_info
+        self.function_prefix = function_prefix
+        self.hook_and_value_type_to_backend = {}
+
+    def get_responsible_backend(self, backends, hook, value=None):
+        """
+        Get the backend responsible for the call. Some backends decide based on the type of the value
+        passed to the hook, so the value type is part of the cache key.
+        """
+        backend_key = (hook, type(value))
+        if backend_key in self.hook_and_value_type_to_backend:
+            return self.hook_and_value_type_to_backend[backend_key]
+        responsible_backend = None
+        for backend in backends:
+            if backend.is_responsible_for_call(self.function_info, self.function_prefix, value):
+                responsible_backend = backend
+                break
+        self.hook_and_value_type_to_backend[backend_key] = responsible_backend
+        return responsible_backend
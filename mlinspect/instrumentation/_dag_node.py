@@ -20,6 +20,10 @@ class OperatorType(Enum):
     FIT = "Fit Transformers and Estimators"
     TRAIN_DATA = "Train Data"
     TRAIN_LABELS = "Train Labels"
+    TEST_DATA = "Test Data"
+    TEST_LABELS = "Test Labels"
+    PREDICT = "Predict"
+    SCORE = "Score"
     JOIN = "Join"
     GROUP_BY_AGG = "Groupby and Aggregate"
     TRAIN_TEST_SPLIT = "Train Test Split"
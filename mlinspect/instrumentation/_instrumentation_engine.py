@@ -0,0 +1,13 @@
+"""
+The different ways to capture the operators of a pipeline
+"""
+from enum import Enum
+
+
+class InstrumentationEngine(Enum):
+    """
+    AST_REWRITING instruments all calls in the pipeline code, MONKEY_PATCHING only wraps the pandas and sklearn
+    functions the backends know at runtime
+    """
+    AST_REWRITING = "AST Rewriting"
+    MONKEY_PATCHING = "Monkey Patching"
@@ -0,0 +1,624 @@
+"""
+Instrument the pipeline by wrapping the pandas and sklearn functions the backends know at runtime
+instead of rewriting the pipeline AST
+"""
+import contextlib
+import functools
+import importlib
+import sys
+import threading
+
+import networkx
+import numpy
+from pandas import DataFrame
+from sklearn.base import BaseEstimator
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from tensorflow.python.keras.wrappers.scikit_learn import BaseWrapper  # pylint: disable=no-name-in-module
+
+from ..backends._pandas_backend_frame_wrapper import MlinspectDataFrame
+from ..backends._sklearn_backend import SklearnBackend
+from ..backends._sklearn_backend_transformer_wrapper import MlinspectEstimatorTransformer, transformer_names
+from ..backends._sklearn_wir_processor import SklearnWirPreprocessor
+from ..inspections._inspection_result import InspectionResult
+from ._call_site_index import CallSiteIndex, check_bytecode_support
+from ._dag_node import DagNode
+from ._pipeline_executor import PipelineExecutor, current_executor
+from ._wir_to_dag_transformer import WirToDagTransformer
+
+PIPELINE_FILE_NAME = "<mlinspect-pipeline>"
+
+# Calls the backends need to see although they create no DAG nodes, e.g., groupby for the descriptions of agg
+AUXILIARY_CALLS = [('pandas.core.frame', 'groupby')]
+
+# The subscript calls have wrappers of their own
+SUBSCRIPT_FUNCTION_NAMES = {'__getitem__', '__setitem__'}
+
+# The estimators in the operator maps, their DAG nodes use the code references of their constructor calls. The
+# pipeline operators are named after the class, e.g., ('sklearn.pipeline', 'fit', 'Pipeline').
+ESTIMATOR_CLASS_INFOS = frozenset(('sklearn.pipeline', 'Pipeline') if function_info[0] == 'sklearn.pipeline'
+                                  else function_info[:2]
+                                  for function_info in WirToDagTransformer.OPERATOR_MAP
+                                  if len(function_info) == 3 and function_info[1] not in SUBSCRIPT_FUNCTION_NAMES)
+
+
+class MonkeyPatchingExecutor(PipelineExecutor):
+    """
+    Executes the unmodified pipeline code with the backend entry points wrapped. The wrappers only inspect
+    calls coming directly from the pipeline code, calls from within pandas or sklearn pass through.
+    The DAG gets built while executing the pipeline, so there is no WIR. The patches are shared by all
+    concurrent runs, the wrappers look up the executor of the current run and pass through without one.
+    """
+    # pylint: disable=too-many-public-methods
+
+    patch_lock = threading.Lock()
+    patched_run_count = 0
+    patches = []
+
+    def __init__(self):
+        check_bytecode_support()
+        super().__init__()
+        self.call_site_index = None
+        self.dag = networkx.DiGraph()
+        self.next_dag_node_id = 0
+        self.value_id_to_dag_nodes = {}
+        self.estimator_id_to_call_site = {}
+        self.estimator_id_to_end_dag_nodes = {}
+        self.tracked_values = []
+
+    def run_inspections(self, notebook_path, python_code, python_path, code_cache=None,
+                        checkpoint_store=None) -> InspectionResult:
+        """
+        Execute the pipeline with the patched entry points. There is no instrumented code to cache and no
+        statement-level execution to resume.
+        """
+        # pylint: disable=unused-argument, too-many-arguments
+        source_code = self.load_source_code(notebook_path, python_path, python_code)
+        self.call_site_index = CallSiteIndex(source_code)
+        self.dag = networkx.DiGraph()
+        self.next_dag_node_id = 0
+        self.value_id_to_dag_nodes = {}
+        self.estimator_id_to_call_site = {}
+        self.estimator_id_to_end_dag_nodes = {}
+        self.tracked_values = []
+
+        pipeline_code = compile(source_code, filename=PIPELINE_FILE_NAME, mode="exec")
+        try:
+            with self.patched_entry_points():
+                exec(pipeline_code, self.script_scope)
+        finally:
+            self.value_id_to_dag_nodes = {}
+            self.estimator_id_to_call_site = {}
+            self.estimator_id_to_end_dag_nodes = {}
+            self.tracked_values = []
+
+        dag = self.dag
+        for backend in self.backends:
+            dag = backend.process_dag(dag)
+        inspection_to_call_to_annotation = self.build_inspection_result_map(dag)
+        return InspectionResult(dag, inspection_to_call_to_annotation)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def patched_entry_points():
+        """
+        Wrap the entry points while at least one pipeline runs and restore the originals afterwards, also if the
+        pipeline fails
+        """
+        with MonkeyPatchingExecutor.patch_lock:
+            if MonkeyPatchingExecutor.patched_run_count == 0:
+                MonkeyPatchingExecutor.patches = MonkeyPatchingExecutor.patch_entry_points()
+            MonkeyPatchingExecutor.patched_run_count += 1
+        try:
+            yield
+        finally:
+            with MonkeyPatchingExecutor.patch_lock:
+                MonkeyPatchingExecutor.patched_run_count -= 1
+                if MonkeyPatchingExecutor.patched_run_count == 0:
+                    for owner, attribute_name, original in reversed(MonkeyPatchingExecutor.patches):
+                        if original is None:
+                            delattr(owner, attribute_name)
+                        else:
+                            setattr(owner, attribute_name, original)
+                    MonkeyPatchingExecutor.patches = []
+
+    @staticmethod
+    def patch_entry_points():
+        """
+        Replace the entry points with the wrappers, returns what is needed to restore the originals
+        """
+        patches = []
+
+        def patch(owner, attribute_name, replacement):
+            patches.append((owner, attribute_name, owner.__dict__.get(attribute_name)))
+            setattr(owner, attribute_name, replacement)
+
+        operator_calls = [function_info for function_info in WirToDagTransformer.OPERATOR_MAP
+                          if len(function_info) == 2 and function_info[1] not in SUBSCRIPT_FUNCTION_NAMES]
+        for function_info in sorted(set(operator_calls + AUXILIARY_CALLS)):
+            for owner, attribute_name, replacement in get_call_patches(function_info):
+                patch(owner, attribute_name, replacement)
+        patch(DataFrame, "__getitem__", MonkeyPatchingExecutor.wrap_getitem(DataFrame.__getitem__))
+        patch(MlinspectDataFrame, "__setitem__", MonkeyPatchingExecutor.wrap_setitem(MlinspectDataFrame.__setitem__))
+        for function_info in WirToDagTransformer.OPERATOR_MAP:
+            if function_info[0] == 'sklearn.pipeline' and len(function_info) == 3 and function_info[2] == 'Pipeline':
+                if function_info[1] == 'fit':
+                    patch(Pipeline, "fit", MonkeyPatchingExecutor.wrap_pipeline_fit(Pipeline.fit))
+                else:
+                    original = Pipeline.__dict__[function_info[1]]
+                    patch(Pipeline, function_info[1],
+                          MonkeyPatchingExecutor.wrap_pipeline_inference(original, function_info[1]))
+        for module_name, class_name in sorted(ESTIMATOR_CLASS_INFOS):
+            # The estimators of modules the pipeline imports later get patched by wrap_init_subclass
+            estimator_class = getattr(sys.modules.get(module_name), class_name, None)
+            if isinstance(estimator_class, type):
+                patch(estimator_class, "__init__", wrap_estimator_init(estimator_class.__init__))
+        for owner in (BaseEstimator, BaseWrapper):
+            patch(owner, "__init_subclass__", wrap_init_subclass(owner))
+        return patches
+
+    @staticmethod
+    def get_active_executor():
+        """
+        The executor of the pipeline running in the current thread or asyncio task, if it uses monkey patching
+        """
+        executor = current_executor.get()
+        if isinstance(executor, MonkeyPatchingExecutor):
+            return executor
+        return None
+
+    def get_pipeline_call_site(self, function_name):
+        """
+        Get the call site if the patched function got called directly from the pipeline code, else None
+        """
+        caller = sys._getframe(2)  # pylint: disable=protected-access
+        if caller.f_code.co_filename != PIPELINE_FILE_NAME:
+            return None
+        return self.call_site_index.get_call_site(function_name, caller.f_lineno, caller.f_code, caller.f_lasti)
+
+    @staticmethod
+    def wrap_call(original, function_info, is_method):
+        """
+        Wrap functions and methods from the operator maps
+        """
+        @functools.wraps(original)
+        def patched_call(*args, **kwargs):
+            if isinstance(original, type):
+                args = args[1:]  # The replacement class, see wrap_class
+            executor = MonkeyPatchingExecutor.get_active_executor()
+            call_site = executor.get_pipeline_call_site(function_info[1]) if executor is not None else None
+            if call_site is None or (is_method and not executor.is_tracked(args[0])):
+                return original(*args, **kwargs)
+            if is_method:
+                receiver, args = args[0], list(args[1:])
+            else:
+                receiver, args = sys.modules[original.__module__], list(args)
+            backend = executor.get_responsible_backend(function_info, function_info[0].split(".", 1)[0], receiver)
+            code_reference = call_site.code_reference
+            backend.before_call_used_value(function_info, False, call_site.call_code, call_site.value_code,
+                                           receiver, code_reference)
+            backend.before_call_used_args(function_info, False, call_site.call_code, list(call_site.args_code),
+                                          code_reference, False, args)
+            backend.before_call_used_kwargs(function_info, False, call_site.call_code, list(call_site.kwargs_code),
+                                            code_reference, kwargs)
+            if is_method:
+                return_value = original(receiver, *args, **kwargs)
+            else:
+                return_value = original(*args, **kwargs)
+            return_value = backend.after_call_used(function_info, False, call_site.call_code, return_value,
+                                                   code_reference)
+            executor.add_backend_dag_node(backend, call_site, [receiver, *args, *kwargs.values()], return_value)
+            return return_value
+
+        return patched_call
+
+    @staticmethod
+    def wrap_getitem(original):
+        """
+        Wrap DataFrame.__getitem__ for projections and selections
+        """
+        function_info = ('pandas.core.frame', '__getitem__')
+
+        @functools.wraps(original)
+        def patched_getitem(data_frame, key):
+            executor = MonkeyPatchingExecutor.get_active_executor()
+            call_site = executor.get_pipeline_call_site("__getitem__") if executor is not None else None
+            if call_site is None or not executor.is_tracked(data_frame):
+                return original(data_frame, key)
+            backend = executor.get_responsible_backend(function_info, "pandas", data_frame)
+            code_reference = call_site.code_reference
+            backend.before_call_used_value(function_info, True, call_site.call_code, call_site.value_code,
+                                           data_frame, code_reference)
+            backend.before_call_used_args(function_info, True, call_site.call_code, list(call_site.args_code),
+                                          code_reference, False, key)
+            return_value = original(data_frame, key)
+            return_value = backend.after_call_used(function_info, True, call_site.call_code, return_value,
+                                                   code_reference)
+            # Like with AST rewriting, the selection condition is no DAG parent
+            executor.add_backend_dag_node(backend, call_site, [data_frame], return_value)
+            return return_value
+
+        return patched_getitem
+
+    @staticmethod
+    def wrap_setitem(original):
+        """
+        Wrap MlinspectDataFrame.__setitem__, which executes the inspections itself
+        """
+        function_info = ('pandas.core.frame', '__setitem__')
+
+        @functools.wraps(original)
+        def patched_setitem(data_frame, key, value):
+            executor = MonkeyPatchingExecutor.get_active_executor()
+            call_site = executor.get_pipeline_call_site("__setitem__") if executor is not None else None
+            if call_site is None:
+                original(data_frame, key, value)
+                return
+            backend = executor.get_responsible_backend(function_info, "pandas", data_frame)
+            backend.before_call_used_args(function_info, True, call_site.call_code, list(call_site.args_code),
+                                          call_site.code_reference, True, key)
+            original(data_frame, key, value)
+            # Like with AST rewriting, the assigned value is no DAG parent
+            executor.add_backend_dag_node(backend, call_site, [data_frame], data_frame)
+
+        return patched_setitem
+
+    def after_estimator_created(self, estimator):
+        """
+        Remember where estimators get created, their DAG nodes use the code references of the constructor calls
+        """
+        caller = sys._getframe(2)  # pylint: disable=protected-access
+        if caller.f_code.co_filename != PIPELINE_FILE_NAME:
+            return
+        call_site = self.call_site_index.get_call_site(type(estimator).__name__, caller.f_lineno, caller.f_code,
+                                                       caller.f_lasti)
+        if call_site is not None:
+            self.estimator_id_to_call_site[id(estimator)] = call_site
+            self.tracked_values.append(estimator)
+
+    @staticmethod
+    def wrap_pipeline_fit(original):
+        """
+        Wrap Pipeline.fit: The pipeline steps only get wrapped for the duration of the fit call
+        """
+        @functools.wraps(original)
+        def patched_fit(pipeline, X, y=None, **fit_params):
+            # pylint: disable=invalid-name
+            executor = MonkeyPatchingExecutor.get_active_executor()
+            call_site = executor.get_pipeline_call_site("fit") if executor is not None else None
+            if call_site is None or fit_params or not executor.is_tracked(X):
+                return original(pipeline, X, y, **fit_params)
+            sklearn_backend = [backend for backend in executor.backends if isinstance(backend, SklearnBackend)][0]
+            # The fit visits store new annotations for X and y, so we need their DAG parents before
+            x_parents = executor.get_dag_parents([X])
+            y_parents = executor.get_dag_parents([y]) if y is not None else None
+            wrapped_pipeline = executor.wrap_estimator(pipeline, sklearn_backend, call_site)
+            try:
+                wrapped_pipeline.fit(X, y)
+            finally:
+                executor.unwrap_estimator(wrapped_pipeline)
+            executor.add_pipeline_fit_dag_nodes(pipeline, call_site, x_parents, y_parents)
+            return pipeline
+
+        return patched_fit
+
+    @staticmethod
+    def wrap_pipeline_inference(original, function_name):
+        """
+        Wrap Pipeline.transform, predict, predict_proba and score of pipelines fitted in the pipeline code. Some
+        of them are descriptors that check if the last step supports the call.
+        """
+        @functools.wraps(original)
+        def patched_inference(pipeline, *args, **kwargs):
+            executor = MonkeyPatchingExecutor.get_active_executor()
+            call_site = executor.get_pipeline_call_site(function_name) if executor is not None else None
+            bound_original = original.__get__(pipeline, type(pipeline))
+            if call_site is None or kwargs or id(pipeline) not in executor.estimator_id_to_end_dag_nodes:
+                return bound_original(*args, **kwargs)
+            sklearn_backend = [backend for backend in executor.backends if isinstance(backend, SklearnBackend)][0]
+            x_parents = executor.get_dag_parents(args[:1])
+            y_parents = executor.get_dag_parents(args[1:2]) if function_name == 'score' and args[1:2] else None
+            wrapped_pipeline = MlinspectEstimatorTransformer(pipeline, call_site.code_reference,
+                                                             sklearn_backend.inspections,
+                                                             sklearn_backend.wir_post_processing_map,
+                                                             operator_scope=sklearn_backend.operator_scope,
+                                                             annotation_registry=sklearn_backend.annotation_registry,
+                                                             fit_result_cache=sklearn_backend.fit_result_cache)
+            wrapped_pipeline.inference_code_reference = call_site.code_reference
+            wrapped_pipeline.inference_aggregates_only = sklearn_backend.inference_aggregates_only
+            return_value = getattr(wrapped_pipeline, function_name)(*args)
+            executor.add_pipeline_inference_dag_nodes(pipeline, function_name, call_site, x_parents, y_parents,
+                                                      return_value)
+            return return_value
+
+        return patched_inference
+
+    def wrap_estimator(self, estimator, sklearn_backend, fit_call_site):
+        """
+        Wrap the estimator and all its children like the SklearnBackend does when they get created
+        """
+        if not isinstance(estimator, (BaseEstimator, BaseWrapper)):
+            return estimator  # e.g., 'drop' or 'passthrough'
+        if isinstance(estimator, Pipeline):
+            estimator.steps = [(name, self.wrap_estimator(step, sklearn_backend, fit_call_site))
+                               for name, step in estimator.steps]
+        elif isinstance(estimator, ColumnTransformer):
+            estimator.transformers = [(name, self.wrap_estimator(transformer, sklearn_backend, fit_call_site),
+                                       columns) for name, transformer, columns in estimator.transformers]
+        call_site = self.get_estimator_call_site(estimator, fit_call_site)
+        return MlinspectEstimatorTransformer(estimator, call_site.code_reference, sklearn_backend.inspections,
+                                             sklearn_backend.wir_post_processing_map,
+                                             operator_scope=sklearn_backend.operator_scope,
+                                             annotation_registry=sklearn_backend.annotation_registry,
+                                             fit_result_cache=sklearn_backend.fit_result_cache)
+
+    def unwrap_estimator(self, maybe_wrapper):
+        """
+        Restore the original estimators, the pipeline code should not see our wrappers after fit
+        """
+        if not isinstance(maybe_wrapper, MlinspectEstimatorTransformer):
+            return maybe_wrapper
+        estimator = maybe_wrapper.transformer
+        if isinstance(estimator, Pipeline):
+            estimator.steps = [(name, self.unwrap_estimator(step)) for name, step in estimator.steps]
+        elif isinstance(estimator, ColumnTransformer):
+            estimator.transformers = [(name, self.unwrap_estimator(transformer), columns)
+                                      for name, transformer, columns in estimator.transformers]
+            if hasattr(estimator, "transformers_"):
+                estimator.transformers_ = [(name, self.unwrap_estimator(transformer), columns)
+                                           for name, transformer, columns in estimator.transformers_]
+        return estimator
+
+    def get_estimator_call_site(self, estimator, fit_call_site):
+        """
+        The call site where the estimator got created. If that did not happen in the pipeline code, we use the
+        fit call site instead.
+        """
+        return self.estimator_id_to_call_site.get(id(estimator), fit_call_site)
+
+    def is_tracked(self, value):
+        """
+        Check if the value is the result of a call we instrumented
+        """
+        return isinstance(value, MlinspectDataFrame) or bool(self.get_dag_parents([value]))
+
+    def get_dag_parents(self, values):
+        """
+        Get the DAG nodes that produced the values. Values derived from our results, e.g., numpy views from ravel,
+        share the annotations object with them.
+        """
+        parents = []
+        for value in self.flatten_values(values):
+            dag_nodes = self.value_id_to_dag_nodes.get(id(value))
+            annotations = self.get_annotations(value)
+            if dag_nodes is None and annotations is not None:
+                dag_nodes = self.value_id_to_dag_nodes.get(id(annotations))
+            if dag_nodes is None and isinstance(value, numpy.ndarray) and value.base is not None:
+                # Without inspections, there are no annotations, but numpy views know the array they are a view of
+                dag_nodes = self.value_id_to_dag_nodes.get(id(value.base))
+            for dag_node in dag_nodes or []:
+                if dag_node not in parents:
+                    parents.append(dag_node)
+        return parents
+
+    def set_dag_nodes(self, values, dag_nodes):
+        """
+        Remember which DAG nodes produced the values. We keep references to the values, so their ids stay valid.
+        """
+        for value in self.flatten_values(values):
+            self.value_id_to_dag_nodes[id(value)] = dag_nodes
+            self.tracked_values.append(value)
+            annotations = self.get_annotations(value)
+            if annotations is not None:
+                self.value_id_to_dag_nodes[id(annotations)] = dag_nodes
+                self.tracked_values.append(annotations)
+
+    def get_annotations(self, value):
+        """
+        The row annotations the backends stored for the value, None for other values
+        """
+        if not self.backends:
+            return None
+        return self.backends[0].annotation_registry.get_annotations(value)
+
+    @staticmethod
+    def flatten_values(values):
+        """
+        Tuples and lists, e.g., the result of train_test_split, get flattened one level
+        """
+        flat_values = []
+        for value in values:
+            if isinstance(value, (tuple, list)):
+                flat_values.extend(value)
+            else:
+                flat_values.append(value)
+        return flat_values
+
+    def add_dag_node(self, module, code_reference, description, source_code, parents):
+        """
+        Add a new DAG node with edges from its parents
+        """
+        # pylint: disable=too-many-arguments
+        dag_node = DagNode(self.next_dag_node_id, WirToDagTransformer.OPERATOR_MAP[module], code_reference, module,
+                           description, source_code=source_code)
+        self.next_dag_node_id += 1
+        self.dag.add_node(dag_node)
+        for parent in parents:
+            self.dag.add_edge(parent, dag_node)
+        return dag_node
+
+    def add_backend_dag_node(self, backend, call_site, inputs, return_value):
+        """
+        Add the DAG node for a call if the backend knows it as an operator, otherwise the return value
+        inherits the DAG parents of the inputs
+        """
+        code_reference = call_site.code_reference
+        parents = self.get_dag_parents(inputs)
+        module = backend.code_reference_to_module.get(code_reference)
+        if module is not None and module[1] == '__getitem__':
+            set_item_op = getattr(backend, "code_reference_to_set_item_op", {}).get(code_reference)
+            if set_item_op is not None:
+                module = (module[0], module[1], set_item_op)
+        if module in WirToDagTransformer.OPERATOR_MAP:
+            description = backend.code_reference_to_description.get(code_reference)
+            dag_node = self.add_dag_node(module, code_reference, description, call_site.call_code, parents)
+            self.set_dag_nodes([return_value], [dag_node])
+        elif parents:
+            self.set_dag_nodes([return_value], parents)
+
+    def add_pipeline_fit_dag_nodes(self, pipeline, fit_call_site, x_parents, y_parents):
+        """
+        The same DAG nodes the SklearnWirPreprocessor creates: Train Data, Train Labels, and the fit node with the
+        estimator DAG nodes in-between. The parents of the labels are None if there are no labels.
+        """
+        code_reference = self.get_estimator_call_site(pipeline, fit_call_site).code_reference
+        train_data = self.add_dag_node(('sklearn.pipeline', 'fit', 'Train Data'), code_reference, None,
+                                       fit_call_site.call_code, x_parents)
+        fit_parents = self.add_estimator_dag_nodes(pipeline, [train_data], fit_call_site)
+        self.estimator_id_to_end_dag_nodes[id(pipeline)] = fit_parents
+        self.tracked_values.append(pipeline)
+        if y_parents is not None:
+            train_labels = self.add_dag_node(('sklearn.pipeline', 'fit', 'Train Labels'), code_reference, None,
+                                             fit_call_site.call_code, y_parents)
+            fit_parents = fit_parents + [train_labels]
+        self.add_dag_node(('sklearn.pipeline', 'fit', 'Pipeline'), code_reference, None, fit_call_site.call_code,
+                          fit_parents)
+
+    def add_pipeline_inference_dag_nodes(self, pipeline, function_name, call_site, x_parents, y_parents,
+                                         return_value):
+        """
+        The same DAG nodes the SklearnWirPreprocessor creates for inference calls: Test Data, Test Labels for
+        score, and the inference node after the end of the fitted pipeline
+        """
+        # pylint: disable=too-many-arguments
+        code_reference = call_site.code_reference
+        test_data = self.add_dag_node(('sklearn.pipeline', function_name, 'Test Data'), code_reference, None,
+                                      call_site.call_code, x_parents)
+        inference_parents = self.estimator_id_to_end_dag_nodes[id(pipeline)] + [test_data]
+        if y_parents is not None:
+            test_labels = self.add_dag_node(('sklearn.pipeline', function_name, 'Test Labels'), code_reference,
+                                            None, call_site.call_code, y_parents)
+            inference_parents = inference_parents + [test_labels]
+        inference = self.add_dag_node(('sklearn.pipeline', function_name, 'Pipeline'), code_reference, None,
+                                      call_site.call_code, inference_parents)
+        self.set_dag_nodes([return_value], [inference])
+
+    def add_estimator_dag_nodes(self, estimator, parents, fit_call_site, column=None):
+        """
+        Add the DAG nodes for an estimator and its children, returns the DAG nodes at the end of the estimator
+        """
+        # pylint: disable=too-many-locals
+        call_site = self.get_estimator_call_site(estimator, fit_call_site)
+        estimator_info = (type(estimator).__module__, type(estimator).__name__)
+        if isinstance(estimator, Pipeline):
+            for _, step in estimator.steps:
+                parents = self.add_estimator_dag_nodes(step, parents, fit_call_site, column)
+        elif isinstance(estimator, ColumnTransformer):
+            concatenation_parents = []
+            for _, transformer, columns in estimator.transformers:
+                for transformer_column in columns:
+                    description = "to {} (ColumnTransformer)".format([transformer_column])
+                    projection = self.add_dag_node((*estimator_info, 'Projection'), call_site.code_reference,
+                                                   description, call_site.call_code, parents)
+                    concatenation_parents.extend(self.add_estimator_dag_nodes(transformer, [projection],
+                                                                              fit_call_site, transformer_column))
+            concatenation = self.add_dag_node((*estimator_info, 'Concatenation'), call_site.code_reference, None,
+                                              call_site.call_code, concatenation_parents)
+            parents = [concatenation]
+        elif estimator_info in SklearnWirPreprocessor.KNOWN_SINGLE_STEPS:
+            description = transformer_names.get(estimator_info)
+            if column is not None:
+                description = "{}, Column: '{}'".format(description, column)
+            parents = [self.add_dag_node((*estimator_info, 'Pipeline'), call_site.code_reference, description,
+                                         call_site.call_code, parents)]
+        return parents
+
+
+def get_call_patches(function_info):
+    """
+    The replacements for a call from the operator maps: (owner, attribute name, replacement). Functions get
+    replaced in their module and in the packages that export them, e.g., pandas.read_csv. Classes only get replaced
+    in the packages that export them, e.g., pandas.DataFrame, the module they are defined in keeps using the
+    original. Methods get replaced in the classes of the module that define them.
+    """
+    module_name, function_name = function_info
+    module = importlib.import_module(module_name)
+    original = module.__dict__.get(function_name)
+    if original is None:
+        return [(owner, function_name, MonkeyPatchingExecutor.wrap_call(owner.__dict__[function_name], function_info,
+                                                                        True))
+                for owner in vars(module).values()
+                if isinstance(owner, type) and owner.__module__ == module_name and function_name in owner.__dict__]
+    if isinstance(original, type):
+        replacement = wrap_class(original, function_info)
+        package_names = get_package_names(module_name)
+    else:
+        replacement = MonkeyPatchingExecutor.wrap_call(original, function_info, False)
+        package_names = [module_name] + get_package_names(module_name)
+    return [(importlib.import_module(package_name), function_name, replacement) for package_name in package_names
+            if importlib.import_module(package_name).__dict__.get(function_name) is original]
+
+
+def get_package_names(module_name):
+    """
+    The names of the packages containing the module, e.g., pandas.io and pandas for pandas.io.parsers
+    """
+    module_name_parts = module_name.split(".")
+    return [".".join(module_name_parts[:part_count]) for part_count in range(len(module_name_parts) - 1, 0, -1)]
+
+
+def wrap_class(original, function_info):
+    """
+    A subclass to replace classes whose constructor calls are operators, e.g., pandas.DataFrame for data sources.
+    Its instances are the instances of the original class, so isinstance checks in the pipeline code still work.
+    """
+    class PatchedClassType(type(original)):
+        """
+        The constructor calls of the replacement class are wrapped
+        """
+        # pylint: disable=no-self-argument
+        __call__ = MonkeyPatchingExecutor.wrap_call(original, function_info, False)
+
+        def __instancecheck__(cls, instance):
+            return isinstance(instance, original)
+
+        def __subclasscheck__(cls, subclass):
+            return issubclass(subclass, original)
+
+    return PatchedClassType(original.__name__, (original,), {"__module__": original.__module__,
+                                                             "__doc__": original.__doc__})
+
+
+def wrap_estimator_init(original):
+    """
+    Remember where estimators get created. We do not override __new__ because CPython can not restore the
+    original constructor slots after that.
+    """
+    @functools.wraps(original)
+    def patched_init(estimator, *args, **kwargs):
+        original(estimator, *args, **kwargs)
+        executor = MonkeyPatchingExecutor.get_active_executor()
+        if executor is not None:
+            executor.after_estimator_created(estimator)
+
+    return patched_init
+
+
+def wrap_init_subclass(owner):
+    """
+    Estimator classes from the operator maps defined while the pipeline runs, e.g., in modules the pipeline
+    imports, need the __init__ wrapper too
+    """
+    original = owner.__dict__.get("__init_subclass__")
+
+    def patched_init_subclass(cls, **kwargs):
+        if original is not None:
+            original.__func__(cls, **kwargs)
+        else:
+            super(owner, cls).__init_subclass__(**kwargs)
+        if (cls.__module__, cls.__name__) in ESTIMATOR_CLASS_INFOS:
+            with MonkeyPatchingExecutor.patch_lock:
+                MonkeyPatchingExecutor.patches.append((cls, "__init__", cls.__dict__.get("__init__")))
+                cls.__init__ = wrap_estimator_init(cls.__init__)
+
+    return classmethod(patched_init_subclass)
@@ -0,0 +1,174 @@
+"""
+Load the pipeline code from notebooks directly with nbformat, without the nbconvert templates
+"""
+import collections
+import dataclasses
+import hashlib
+import re
+import threading
+from typing import Dict, Tuple
+
+from nbformat import reader, convert
+
+from ._dag_node import CodeReference
+
+# The same layout the nbconvert PythonExporter uses, so the code references do not change
+NOTEBOOK_HEADER = "#!/usr/bin/env python\n# coding: utf-8\n"
+CELL_HEADER = "\n# In[{}]:\n\n\n"
+CELL_FOOTER = "\n\n"
+MARKDOWN_CELL_HEADER = "\n"
+MARKDOWN_CELL_FOOTER = "\n"
+
+# Raw cells with these mimetypes are python code for the PythonExporter
+PYTHON_RAW_MIMETYPES = frozenset(("", "text/x-python"))
+
+# Magics whose arguments are the python code they execute
+PYTHON_LINE_MAGICS = frozenset(("time", "timeit", "prun"))
+PYTHON_CELL_MAGICS = frozenset(("time", "timeit", "prun", "capture"))
+
+MAGIC_OPTIONS = re.compile(r"^(?:-[nr]\s*\d+\s+|-[a-zA-Z]+\s+)*")
+MAGIC_ASSIGNMENT = re.compile(r"^([\w.]+(?:\s*,\s*[\w.]+)*)\s*=\s*[%!]")
+
+
+@dataclasses.dataclass(frozen=True)
+class NotebookSource:
+    """
+    The python code of the notebook and where the lines of the code cells come from. Cells are identified by their index in the
+    notebook, including markdown and raw cells, and line numbers start at 1 like in code references.
+    """
+    source_code: str
+    lineno_to_cell_line: Dict[int, Tuple[int, int]]
+    cell_line_to_lineno: Dict[Tuple[int, int], int]
+
+    def get_cell_code_reference(self, code_reference: CodeReference) -> Tuple[int, CodeReference]:
+        """
+        Get the cell index and the code reference relative to the cell for a code reference in the pipeline code
+        """
+        cell_index, cell_lineno = self.lineno_to_cell_line[code_reference.lineno]
+        _, end_cell_lineno = self.lineno_to_cell_line[code_reference.end_lineno]
+        return cell_index, CodeReference(cell_lineno, code_reference.col_offset, end_cell_lineno,
+                                         code_reference.end_col_offset)
+
+    def get_code_reference(self, cell_index: int, cell_code_reference: CodeReference) -> CodeReference:
+        """
+        Get the code reference in the pipeline code for a code reference relative to a cell
+        """
+        return CodeReference(self.cell_line_to_lineno[(cell_index, cell_code_reference.lineno)],
+                             cell_code_reference.col_offset,
+                             self.cell_line_to_lineno[(cell_index, cell_code_reference.end_lineno)],
+                             cell_code_reference.end_col_offset)
+
+
+class NotebookLoader:
+    """
+    Converts notebooks to python code. IPython magics and shell commands get replaced by the python code they run
+    or by a no-op, so the line numbers stay the same. Conversions are cached by the hash of the notebook file.
+    """
+
+    cache_size = 64
+    cache = collections.OrderedDict()
+    cache_lock = threading.Lock()
+
+    @staticmethod
+    def load(notebook_path: str) -> NotebookSource:
+        """
+        Load the notebook file or get its conversion from the cache
+        """
+        with open(notebook_path, "rb") as file:
+            notebook_bytes = file.read()
+        notebook_hash = hashlib.sha256(notebook_bytes).hexdigest()
+        with NotebookLoader.cache_lock:
+            notebook_source = NotebookLoader.cache.get(notebook_hash)
+            if notebook_source is not None:
+                NotebookLoader.cache.move_to_end(notebook_hash)
+                return notebook_source
+
+        notebook_source = NotebookLoader.convert_notebook(notebook_bytes.decode("utf-8"))
+        with NotebookLoader.cache_lock:
+            NotebookLoader.cache[notebook_hash] = notebook_source
+            if len(NotebookLoader.cache) > NotebookLoader.cache_size:
+                NotebookLoader.cache.popitem(last=False)
+        return notebook_source
+
+    @staticmethod
+    def convert_notebook(notebook_json: str) -> NotebookSource:
+        """
+        Concatenate the cells in the layout of the PythonExporter. We skip the nbformat schema validation, running
+        the pipeline is the validation we need.
+        """
+        notebook = reader.reads(notebook_json)
+        if notebook.nbformat < 4:
+            notebook = convert(notebook, 4)
+
+        code_parts = [NOTEBOOK_HEADER]
+        lineno = NOTEBOOK_HEADER.count("\n") + 1
+        lineno_to_cell_line = {}
+        cell_line_to_lineno = {}
+        for cell_index, cell in enumerate(notebook.cells):
+            if cell.cell_type == "markdown":
+                # Like the PythonExporter, we keep markdown cells as comments, so the line numbers stay the same
+                markdown_code = "\n".join("# " + line for line in cell.source.split("\n"))
+                code_parts.extend((MARKDOWN_CELL_HEADER, markdown_code, MARKDOWN_CELL_FOOTER))
+                lineno += (MARKDOWN_CELL_HEADER + markdown_code + MARKDOWN_CELL_FOOTER).count("\n")
+                continue
+            if cell.cell_type == "raw":
+                if cell.get("metadata", {}).get("raw_mimetype", "").lower() in PYTHON_RAW_MIMETYPES:
+                    code_parts.append(cell.source)
+                    lineno += cell.source.count("\n")
+                continue
+            execution_count = cell.get("execution_count")
+            cell_header = CELL_HEADER.format(execution_count if execution_count is not None else " ")
+            cell_code = NotebookLoader.convert_magics(cell.source)
+            code_parts.extend((cell_header, cell_code, CELL_FOOTER))
+            lineno += cell_header.count("\n")
+            for cell_lineno in range(1, cell_code.count("\n") + 2):
+                lineno_to_cell_line[lineno] = (cell_index, cell_lineno)
+                cell_line_to_lineno[(cell_index, cell_lineno)] = lineno
+                lineno += 1
+            lineno += CELL_FOOTER.count("\n") - 1
+        return NotebookSource("".join(code_parts), lineno_to_cell_line, cell_line_to_lineno)
+
+    @staticmethod
+    def convert_magics(cell_code: str) -> str:
+        """
+        Replace the IPython syntax in a cell, line by line
+        """
+        lines = cell_code.split("\n")
+        first_code_line = next((index for index, line in enumerate(lines) if line.strip()), None)
+        if first_code_line is not None and lines[first_code_line].startswith("%%"):
+            magic_name = lines[first_code_line][2:].split(maxsplit=1)[0] if lines[first_code_line][2:] else ""
+            lines[first_code_line] = "# " + lines[first_code_line]
+            if magic_name not in PYTHON_CELL_MAGICS:
+                # The cell body is no python code, e.g., for %%bash or %%html
+                return "\n".join(line if line.startswith("# %%") else "# " + line for line in lines)
+
+        converted_lines = []
+        in_magic_continuation = False
+        for line in lines:
+            stripped_line = line.lstrip()
+            indentation = line[:len(line) - len(stripped_line)]
+            if in_magic_continuation:
+                converted_lines.append(indentation + "# " + stripped_line)
+            elif stripped_line.startswith("%") and not stripped_line.startswith("%%"):
+                converted_lines.append(indentation + NotebookLoader.convert_line_magic(stripped_line[1:]))
+            elif stripped_line.startswith("!") or stripped_line.startswith("?") or \
+                    (stripped_line.endswith("?") and "#" not in stripped_line):
+                converted_lines.append(indentation + "pass  # " + stripped_line)
+            elif MAGIC_ASSIGNMENT.match(stripped_line):
+                targets = MAGIC_ASSIGNMENT.match(stripped_line).group(1)
+                converted_lines.append("{}{} = None  # {}".format(indentation, targets, stripped_line))
+            else:
+                converted_lines.append(line)
+                continue
+            in_magic_continuation = stripped_line.endswith("\\")
+        return "\n".join(converted_lines)
+
+    @staticmethod
+    def convert_line_magic(magic_code: str) -> str:
+        """
+        Line magics like %time run their python code, all others become a no-op
+        """
+        magic_name, _, magic_arguments = magic_code.partition(" ")
+        if magic_name in PYTHON_LINE_MAGICS and magic_arguments.strip() and not magic_code.endswith("\\"):
+            return MAGIC_OPTIONS.sub("", magic_arguments.lstrip())
+        return "pass  # %" + magic_code
@@ -0,0 +1,49 @@
+"""
+Restrict the inspection visits to some operators
+"""
+import dataclasses
+from typing import FrozenSet
+
+from ._dag_node import CodeReference, OperatorType
+
+# Operators that create or combine the row annotations of their inputs. They are always visited, otherwise the
+# operators after them could not get correct annotations.
+ANNOTATION_SOURCE_OPERATORS = frozenset((OperatorType.DATA_SOURCE, OperatorType.JOIN, OperatorType.CONCATENATION,
+                                         OperatorType.GROUP_BY_AGG))
+
+
+@dataclasses.dataclass(frozen=True)
+class OperatorScope:
+    """
+    The operators to visit with the inspections: operators with one of the operator types or at one of the code
+    references. Operators outside of the scope get no DAG annotations. If all inspections pass the annotations
+    through for them, they do not get visited and their output rows keep the annotations of their input rows.
+    """
+    operator_types: FrozenSet[OperatorType] or None = None
+    code_references: FrozenSet[CodeReference] or None = None
+
+    def contains(self, operator_type: OperatorType, code_reference: CodeReference) -> bool:
+        """
+        Whether the inspections need to visit an operator
+        """
+        return operator_type in ANNOTATION_SOURCE_OPERATORS or \
+            (self.operator_types is not None and operator_type in self.operator_types) or \
+            (self.code_references is not None and code_reference in self.code_references)
+
+
+def is_in_operator_scope(operator_scope: OperatorScope or None, operator_type: OperatorType,
+                         code_reference: CodeReference) -> bool:
+    """
+    Without an operator scope, all operators get visited
+    """
+    return operator_scope is None or operator_scope.contains(operator_type, code_reference)
+
+
+def skips_inspection_visits(operator_scope: OperatorScope or None, operator_context, code_reference: CodeReference,
+                            inspections) -> bool:
+    """
+    Operators outside of the operator scope still get visited if an inspection computes new annotations for their
+    rows, e.g., HistogramForColumns after an imputer. Otherwise, the operators after them would get stale annotations.
+    """
+    return not is_in_operator_scope(operator_scope, operator_context.operator, code_reference) and \
+        all(inspection.passes_annotations_through(operator_context) for inspection in inspections)
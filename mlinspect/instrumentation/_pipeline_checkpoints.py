@@ -0,0 +1,310 @@
+"""
+Snapshots of the pipeline scope and the backend state after top-level statements that called operators, so
+re-inspecting an edited pipeline can resume from the last snapshot before the first changed statement
+"""
+import ast
+import contextlib
+import dataclasses
+import io
+import os
+import pickle
+import random
+import sys
+import threading
+import types
+import uuid
+import weakref
+from typing import Dict, List, Tuple
+
+import numpy
+
+from ..backends._backend import Backend
+from ._dag_node import CodeReference
+
+# Objects we do not copy but keep references to, e.g., the imported modules and functions
+SHARED_TYPES = (types.ModuleType, types.FunctionType, types.BuiltinFunctionType, type)
+
+# The paths of the files opened for reading by the pipeline that currently runs with checkpoints in this thread
+FILE_READS = threading.local()
+
+
+def record_file_read(event, args):
+    """
+    Audit hook that records the files opened for reading while the checkpoints of a pipeline record file reads
+    """
+    paths = getattr(FILE_READS, "paths", None)
+    if event != "open" or paths is None:
+        return
+    path, mode, flags = args
+    if not isinstance(path, (str, bytes, os.PathLike)):
+        return
+    if isinstance(mode, str):
+        is_read = not any(character in mode for character in "wax+")
+    else:
+        is_read = not flags & (os.O_WRONLY | os.O_RDWR)
+    if is_read:
+        paths.add(os.path.abspath(os.fsdecode(path)))
+
+
+sys.addaudithook(record_file_read)
+
+
+def get_file_fingerprint(path: str) -> Tuple[int, int] or None:
+    """
+    The modification time and size of a file, None if it does not exist anymore
+    """
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return stat_result.st_mtime_ns, stat_result.st_size
+
+
+def get_statement_key(statement: ast.stmt) -> str:
+    """
+    Identifies a top-level statement independent of its line, so inserting lines above a statement does not
+    invalidate its snapshots. The positions of the nodes relative to the statement are part of the key, because
+    the code references of the restored state get shifted line by line.
+    """
+    relative_positions = [(node.lineno - statement.lineno, node.col_offset, node.end_lineno - statement.lineno,
+                           node.end_col_offset) for node in ast.walk(statement) if hasattr(node, "lineno")]
+    return ast.dump(statement) + repr(relative_positions)
+
+
+def get_code_objects(code: types.CodeType):
+    """
+    The code object and all code objects nested in it, e.g., of the functions a statement defines
+    """
+    yield code
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            yield from get_code_objects(constant)
+
+
+class CheckpointPickler(pickle.Pickler):
+    """
+    Pickles the pipeline state, objects of the shared types are kept as references
+    """
+
+    def __init__(self, file, shared_objects, script_scope):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.shared_objects = shared_objects
+        self.script_scope = script_scope
+
+    def persistent_id(self, obj):
+        if isinstance(obj, CodeReference):
+            return "code_reference", dataclasses.astuple(obj)
+        if isinstance(obj, types.FunctionType) and obj.__globals__ is self.script_scope:
+            self.shared_objects[id(obj)] = obj
+            return "pipeline_function", id(obj)
+        if isinstance(obj, SHARED_TYPES):
+            self.shared_objects[id(obj)] = obj
+            return "shared", id(obj)
+        return None
+
+
+class CheckpointUnpickler(pickle.Unpickler):
+    """
+    Restores the pipeline state pickled by the CheckpointPickler. The code references get shifted to the current
+    lines of their statements and the functions the pipeline defined get bound to the new script scope.
+    """
+
+    def __init__(self, file, shared_objects, script_scope, line_shifts, code_replacements):
+        # pylint: disable=too-many-arguments
+        super().__init__(file)
+        self.shared_objects = shared_objects
+        self.script_scope = script_scope
+        self.line_shifts = line_shifts
+        self.code_replacements = code_replacements
+        self.rebound_functions = {}
+
+    def persistent_load(self, pid):
+        kind, value = pid
+        if kind == "code_reference":
+            lineno, col_offset, end_lineno, end_col_offset = value
+            line_shift = next((shift for first_lineno, last_lineno, shift in self.line_shifts
+                               if first_lineno <= lineno <= last_lineno), 0)
+            return CodeReference(lineno + line_shift, col_offset, end_lineno + line_shift, end_col_offset)
+        if kind == "pipeline_function":
+            if value not in self.rebound_functions:
+                self.rebound_functions[value] = self.rebind_function(self.shared_objects[value])
+            return self.rebound_functions[value]
+        return self.shared_objects[value]
+
+    def rebind_function(self, function):
+        """
+        Copy a function the pipeline defined with the new script scope as globals and, if its statement moved,
+        the code compiled for the current lines
+        """
+        code = function.__code__
+        code = self.code_replacements.get((code.co_name, code.co_firstlineno, code.co_code), code)
+        rebound_function = types.FunctionType(code, self.script_scope, function.__name__, function.__defaults__,
+                                              function.__closure__)
+        rebound_function.__kwdefaults__ = function.__kwdefaults__
+        rebound_function.__qualname__ = function.__qualname__
+        rebound_function.__annotations__ = function.__annotations__
+        rebound_function.__dict__.update(function.__dict__)
+        return rebound_function
+
+
+class PipelineCheckpoints:
+    """
+    The checkpoints of the last run of one pipeline. Statements are identified by their AST without the code
+    locations, the code references in restored snapshots get shifted to the current lines. Each snapshot keeps the
+    fingerprints of the files read before it and is only valid while these files are unchanged.
+    """
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.configuration = None
+        self.statement_keys = []
+        self.statement_lines = []
+        self.statement_count_to_snapshot = {}
+        self.shared_objects = {}
+        self.pickling_failed = False
+        self.reused_statement_count = 0
+        self.read_paths = set()
+
+    def get_resume_index(self, configuration, statement_keys: List[str],
+                         statement_lines: List[Tuple[int, int]]) -> int:
+        """
+        The number of statements we can skip, i.e., the length of the longest snapshot before the first changed
+        statement whose read files did not change. Snapshots after that get discarded.
+        """
+        if configuration != self.configuration:
+            self.clear()
+            self.configuration = configuration
+        unchanged_count = 0
+        max_unchanged_count = min(len(self.statement_keys), len(statement_keys))
+        while unchanged_count < max_unchanged_count and \
+                self.statement_keys[unchanged_count] == statement_keys[unchanged_count]:
+            unchanged_count += 1
+        resume_index = max((statement_count for statement_count, (_, file_fingerprints, _)
+                            in self.statement_count_to_snapshot.items()
+                            if statement_count <= unchanged_count and all(
+                                get_file_fingerprint(path) == fingerprint
+                                for path, fingerprint in file_fingerprints.items())), default=0)
+        self.statement_count_to_snapshot = {statement_count: snapshot for statement_count, snapshot
+                                            in self.statement_count_to_snapshot.items()
+                                            if statement_count <= resume_index}
+        self.statement_keys = list(statement_keys)
+        self.statement_lines = list(statement_lines)
+        self.pickling_failed = False
+        self.reused_statement_count = resume_index
+        self.read_paths = set(self.statement_count_to_snapshot[resume_index][1]) if resume_index != 0 else set()
+        return resume_index
+
+    @contextlib.contextmanager
+    def recording_file_reads(self):
+        """
+        Record the files the pipeline opens for reading in this thread, the snapshots keep their fingerprints
+        """
+        FILE_READS.paths = self.read_paths
+        try:
+            yield
+        finally:
+            FILE_READS.paths = None
+
+    def store(self, statement_count: int, script_scope: Dict, backends: List[Backend]):
+        """
+        Snapshot the state after the first statement_count statements, including the global random number
+        generator states and the fingerprints of the files read so far. If the state can not be pickled, there
+        are no further snapshots in this run.
+        """
+        if self.pickling_failed:
+            return
+        file = io.BytesIO()
+        scope_items = {name: value for name, value in script_scope.items() if name != "__builtins__"}
+        random_states = (random.getstate(), numpy.random.get_state())
+        try:
+            CheckpointPickler(file, self.shared_objects, script_scope).dump((scope_items, backends, random_states))
+        except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+            self.pickling_failed = True
+            return
+        file_fingerprints = {path: get_file_fingerprint(path) for path in self.read_paths}
+        self.statement_count_to_snapshot[statement_count] = (self.statement_lines[:statement_count],
+                                                             file_fingerprints, file.getvalue())
+
+    def restore(self, statement_count: int, statement_codes: List[types.CodeType]) -> Tuple[Dict, List[Backend]]:
+        """
+        Get a fresh copy of the state after the first statement_count statements and reset the global random
+        number generators to their state at that point. The statement_codes are the compiled current statements.
+        """
+        # pylint: disable=too-many-locals
+        snapshot_lines, _, snapshot = self.statement_count_to_snapshot[statement_count]
+        line_shifts = []
+        code_replacements = {}
+        for (first_lineno, last_lineno), (current_first_lineno, _), statement_code \
+                in zip(snapshot_lines, self.statement_lines, statement_codes):
+            line_shift = current_first_lineno - first_lineno
+            if line_shift != 0:
+                line_shifts.append((first_lineno, last_lineno, line_shift))
+                for code in get_code_objects(statement_code):
+                    code_replacements[(code.co_name, code.co_firstlineno - line_shift, code.co_code)] = code
+        script_scope = {}
+        unpickler = CheckpointUnpickler(io.BytesIO(snapshot), self.shared_objects, script_scope, line_shifts,
+                                        code_replacements)
+        scope_items, backends, (python_random_state, numpy_random_state) = unpickler.load()
+        script_scope.update(scope_items)
+        random.setstate(python_random_state)
+        numpy.random.set_state(numpy_random_state)
+        return script_scope, backends
+
+    def clear(self):
+        """
+        Discard all snapshots
+        """
+        self.configuration = None
+        self.statement_keys = []
+        self.statement_lines = []
+        self.statement_count_to_snapshot = {}
+        self.shared_objects = {}
+        self.pickling_failed = False
+        self.reused_statement_count = 0
+        self.read_paths = set()
+
+
+# The stores in this process by their id. Copies of stores from other processes, e.g., in the worker processes of
+# batch inspections, are kept until the process exits, because the copies only live for one task.
+PROCESS_STORES = weakref.WeakValueDictionary()
+UNPICKLED_STORES = {}
+PROCESS_STORES_LOCK = threading.Lock()
+
+
+class PipelineCheckpointStore:
+    """
+    Keeps the checkpoints of the last run of each pipeline in memory. Pickled copies of a store share the
+    checkpoints of the store with the same id in their process instead of copying the snapshots.
+    """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        self.store_id = uuid.uuid4().hex
+        self.pipeline_key_to_checkpoints = {}
+        with PROCESS_STORES_LOCK:
+            PROCESS_STORES[self.store_id] = self
+
+    def __getstate__(self):
+        return self.store_id
+
+    def __setstate__(self, state):
+        self.store_id = state
+        with PROCESS_STORES_LOCK:
+            store = PROCESS_STORES.get(self.store_id)
+            if store is not None:
+                self.pipeline_key_to_checkpoints = store.pipeline_key_to_checkpoints
+            else:
+                self.pipeline_key_to_checkpoints = {}
+                PROCESS_STORES[self.store_id] = self
+                UNPICKLED_STORES[self.store_id] = self
+
+    def get_checkpoints(self, pipeline_key: str) -> PipelineCheckpoints:
+        """
+        Get the checkpoints for a pipeline file, pipelines from strings share the key '<string>'
+        """
+        with PROCESS_STORES_LOCK:
+            return self.pipeline_key_to_checkpoints.setdefault(pipeline_key, PipelineCheckpoints())
+
+
+DEFAULT_CHECKPOINT_STORE = PipelineCheckpointStore()
@@ -0,0 +1,119 @@
+"""
+An on-disk cache for the instrumented pipeline code and the static WIR, similar to __pycache__
+"""
+import contextlib
+import dataclasses
+import glob
+import hashlib
+import importlib.util
+import marshal
+import os
+import pickle
+import tempfile
+from types import CodeType
+from typing import Tuple
+
+import networkx
+
+from .._version import __version__
+
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+                                 "mlinspect")
+
+
+def get_instrumentation_source_hash() -> bytes:
+    """
+    The hash of the sources of the instrumentation modules, so changing them without a new version still
+    invalidates the cache
+    """
+    source_hash = hashlib.sha256()
+    for source_path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), "*.py"))):
+        with open(source_path, "rb") as source_file:
+            source_hash.update(source_file.read())
+    return source_hash.digest()
+
+
+INSTRUMENTATION_SOURCE_HASH = get_instrumentation_source_hash()
+
+
+@dataclasses.dataclass(frozen=True)
+class PipelineCodeCacheStats:
+    """
+    Cache hit and miss statistics of a PipelineCodeCache
+    """
+    hits: int
+    misses: int
+
+
+class PipelineCodeCache:
+    """
+    Stores the compiled instrumented code object and the WIR skeleton extracted from the AST,
+    keyed by the source hash, the mlinspect version and instrumentation sources, the backend set and the
+    instrumentation options
+    """
+
+    def __init__(self, cache_dir: str or None = None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, source_code: str, backend_names: Tuple[str], instrumentation_options: Tuple[str] = ()) \
+            -> Tuple[CodeType, networkx.DiGraph] or None:
+        """
+        Load the instrumented code and the WIR skeleton. Returns None on cache misses.
+        """
+        cache_file = self.get_cache_file_path(source_code, backend_names, instrumentation_options)
+        try:
+            with open(cache_file, "rb") as file:
+                cache_entry = pickle.load(file)
+            instrumented_code = marshal.loads(cache_entry["code"])
+            wir = cache_entry["wir"]
+        except (OSError, EOFError, ValueError, KeyError, TypeError, AttributeError, ImportError,
+                pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return instrumented_code, wir
+
+    def store(self, source_code: str, backend_names: Tuple[str], instrumented_code: CodeType,
+              wir: networkx.DiGraph, instrumentation_options: Tuple[str] = ()):
+        """
+        Store the instrumented code and the WIR skeleton. Failing to write the cache is not an error, the next
+        load is a cache miss then.
+        """
+        # pylint: disable=too-many-arguments
+        cache_file = self.get_cache_file_path(source_code, backend_names, instrumentation_options)
+        try:
+            cache_entry = {"code": marshal.dumps(instrumented_code), "wir": wir}
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temporary file first so concurrent runs never read partially written entries
+            file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(file_descriptor, "wb") as file:
+                    pickle.dump(cache_entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, cache_file)
+            finally:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(temp_path)
+        except (OSError, ValueError, TypeError, AttributeError, RecursionError, pickle.PicklingError):
+            pass
+
+    def get_stats(self) -> PipelineCodeCacheStats:
+        """
+        Get the hit and miss statistics so far
+        """
+        return PipelineCodeCacheStats(self.hits, self.misses)
+
+    def get_cache_file_path(self, source_code, backend_names, instrumentation_options=()):
+        """
+        The cache key consists of the source hash, the mlinspect version, the hash of the instrumentation
+        sources, the backend set, the instrumentation options and the Python bytecode version
+        """
+        key_hash = hashlib.sha256()
+        key_hash.update(source_code.encode("utf-8"))
+        key_hash.update(__version__.encode("utf-8"))
+        key_hash.update(INSTRUMENTATION_SOURCE_HASH)
+        key_hash.update(",".join(backend_names).encode("utf-8"))
+        key_hash.update(";".join(instrumentation_options).encode("utf-8"))
+        key_hash.update(importlib.util.MAGIC_NUMBER)
+        return os.path.join(self.cache_dir, "{}.pickle".format(key_hash.hexdigest()))
@@ -2,64 +2,129 @@
 Instrument and executes the pipeline
 """
 import ast
+import contextlib
+import contextvars
 import copy
+import math
 from collections import OrderedDict
 from typing import Iterable
 
-import nbformat
-from nbconvert import PythonExporter
+import networkx
 
 from ..checks._check import Check
 from ..inspections._inspection import Inspection
 from ..inspections._inspection_result import InspectionResult
 from ..backends._all_backends import get_all_backends
+from ..backends._fit_result_cache import FitResultCache
 from ._call_capture_transformer import CallCaptureTransformer
-from ._dag_node import CodeReference, DagNodeIdentifier
+from ._call_relevance_analysis import CallRelevanceAnalysis
+from ._call_site_resolution import CallSiteResolution
+from ._dag_node import CodeReference, DagNodeIdentifier, OperatorType
+from ._notebook_loader import NotebookLoader
+from ._operator_scope import OperatorScope
+from ._pipeline_checkpoints import PipelineCheckpointStore, PipelineCheckpoints, get_statement_key
+from ._pipeline_code_cache import PipelineCodeCache
+from ._row_sampling import RowSampling
 from ._wir_extractor import WirExtractor
 from ._wir_to_dag_transformer import WirToDagTransformer
 from .._inspector_result import InspectorResult
 
 
-class PipelineExecutor:
+# The executor of the pipeline that is currently running in this thread or asyncio task. The functions we inject
+# into the pipeline code look it up here, so multiple pipelines can run concurrently.
+current_executor = contextvars.ContextVar("mlinspect_current_executor", default=None)
+
+
+
+class RelevantPrunedCallFound(BaseException):
     """
-    Internal class to instrument and execute pipelines
+    Stops a run when a call the call relevance analysis left uninstrumented returns an object a backend is
+    responsible for. It is no Exception, so the pipeline code does not catch it.
     """
 
-    script_scope = {}
-    backends = []
+
+class PipelineExecutor:
+    """
+    Internal class to instrument and execute pipelines. Each instance is the execution context of its runs.
+    """
+    # pylint: disable=too-many-public-methods, too-many-instance-attributes
+
+    def __init__(self, use_call_site_cache=True, prune_irrelevant_calls=True):
+        # use_call_site_cache=False should only be used internally for performance experiments
+        self.use_call_site_cache = use_call_site_cache
+        self.prune_irrelevant_calls = prune_irrelevant_calls
+        self.script_scope = {}
+        self.backends = []
+        self.call_sites = {}
+        self.pruned_call_value_type_is_relevant = {}
+        self.relevant_pruned_calls = set()
+        self.relevant_pruned_call_found = False
+        self.row_sampling = None
+        self.operator_scope = None
+        self.fit_result_cache = None
+        self.inference_aggregates_only = False
+        self.notebook_source = None
 
     def run(self, notebook_path: str or None, python_path: str or None, python_code: str or None,
-            inspections: Iterable[Inspection], checks: Iterable[Check], reset_state=True) -> InspectorResult:
+            inspections: Iterable[Inspection], checks: Iterable[Check], reset_state=True,
+            code_cache: PipelineCodeCache or None = None,
+            checkpoint_store: PipelineCheckpointStore or None = None,
+            row_sampling: RowSampling or None = None,
+            operator_scope: OperatorScope or None = None,
+            fit_result_cache: FitResultCache or None = None,
+            inference_aggregates_only: bool = False) -> InspectorResult:
         """
         Instrument and execute the pipeline and evaluate all checks
         """
-        # pylint: disable=too-many-arguments
+        # pylint: disable=too-many-arguments, too-many-locals
         check_inspections = set()
         for check in checks:
             check_inspections.update(check.required_inspections)
-        all_inspections = list(set(inspections).union(check_inspections))
-
+        # The inspections keep state while visiting operators, so each run uses its own copies. This allows using
+        # the same inspections in concurrent runs.
+        all_inspections = [copy.copy(inspection) for inspection in set(inspections).union(check_inspections)]
+
+        self.row_sampling = row_sampling
+        self.operator_scope = operator_scope
+        self.fit_result_cache = fit_result_cache
+        self.inference_aggregates_only = inference_aggregates_only
         if reset_state:
             # reset_state=False should only be used internally for performance experiments etc!
             # It does not ensure the same inspections are still used as args etc.
-            self.initialize_static_variables(all_inspections)
+            self.initialize_execution_state(all_inspections)
 
-        inspection_result = self.run_inspections(notebook_path, python_code, python_path)
+        with self.execution_context():
+            inspection_result = self.run_inspections(notebook_path, python_code, python_path, code_cache,
+                                                     checkpoint_store)
         check_to_results = OrderedDict((check, check.evaluate(inspection_result)) for check in checks)
-        return InspectorResult(inspection_result.dag, inspection_result.inspection_to_annotations, check_to_results)
+        code_cache_stats = code_cache.get_stats() if code_cache is not None else None
+        return InspectorResult(inspection_result.dag, inspection_result.inspection_to_annotations, check_to_results,
+                               code_cache_stats, self.notebook_source)
 
-    def run_inspections(self, notebook_path, python_code, python_path) -> InspectionResult:
+    def run_inspections(self, notebook_path, python_code, python_path, code_cache=None,
+                        checkpoint_store=None) -> InspectionResult:
         """
         Instrument and execute the pipeline
         """
-        # pylint: disable=no-self-use, too-many-locals
+        # pylint: disable=no-self-use, too-many-locals, too-many-arguments
         source_code = self.load_source_code(notebook_path, python_path, python_code)
-        parsed_ast = ast.parse(source_code)
-        original_parsed_ast = copy.deepcopy(parsed_ast)  # Some ast functions modify in-place
-        parsed_modified_ast = self.instrument_pipeline(parsed_ast, source_code)
-        exec(compile(parsed_modified_ast, filename="<ast>", mode="exec"), PipelineExecutor.script_scope)
-        wir_extractor = WirExtractor(original_parsed_ast)
-        wir_extractor.extract_wir()
+        while True:
+            try:
+                if checkpoint_store is not None:
+                    checkpoints = checkpoint_store.get_checkpoints(notebook_path or python_path or "<string>")
+                    with checkpoints.lock:
+                        wir = self.execute_with_checkpoints(source_code, checkpoints)
+                else:
+                    instrumented_code, wir = self.get_instrumented_code_and_wir(source_code, code_cache,
+                                                                                self.prune_irrelevant_calls)
+                    exec(instrumented_code, self.script_scope)
+            except RelevantPrunedCallFound:
+                pass
+            if not self.relevant_pruned_call_found:
+                break
+            # The static analysis missed a path to a relevant object, e.g., from pickle.load. We run the
+            # pipeline again with the call sites the guards found instrumented.
+            self.initialize_execution_state(self.backends[0].inspections)
         code_reference_to_description = {}
         code_reference_to_module = {}
         code_reference_to_code = {}
@@ -67,8 +132,8 @@ class PipelineExecutor:
             code_reference_to_description = {**code_reference_to_description, **backend.code_reference_to_description}
             code_reference_to_module = {**code_reference_to_module, **backend.code_reference_to_module}
             code_reference_to_code = {**code_reference_to_code, **backend.code_reference_to_code}
-        wir = wir_extractor.add_runtime_info(code_reference_to_module, code_reference_to_description,
-                                             code_reference_to_code)
+        wir = WirExtractor.add_runtime_info_to_wir(wir, code_reference_to_module, code_reference_to_description,
+                                                   code_reference_to_code)
         for backend in self.backends:
             wir = backend.process_wir(wir)
         dag = WirToDagTransformer.extract_dag(wir)
@@ -77,14 +142,113 @@ class PipelineExecutor:
         inspection_to_call_to_annotation = self.build_inspection_result_map(dag)
         return InspectionResult(dag, inspection_to_call_to_annotation)
 
-    def initialize_static_variables(self, inspections):
+    def execute_with_checkpoints(self, source_code, checkpoints: PipelineCheckpoints):
+        """
+        Execute the pipeline statement by statement and resume after the unchanged statements of the last run.
+        The instrumented code of single statements is not in the code cache.
+        """
+        parsed_ast = ast.parse(source_code)
+        wir = WirExtractor(copy.deepcopy(parsed_ast)).extract_wir()
+        self.execute_statements(parsed_ast, source_code, checkpoints, self.prune_irrelevant_calls)
+        return wir
+
+    def execute_statements(self, parsed_ast, source_code, checkpoints, prune_irrelevant_calls):
+        """
+        Execute the top-level statements one after another and snapshot the state after the statements that
+        called operators, the other statements are cheap to execute again. Snapshots get invalid when the files
+        read before them change.
         """
-        Because variables that the user code has to update are static, we need to set them here
+        statement_keys = [get_statement_key(statement) for statement in parsed_ast.body]
+        if self.row_sampling is not None:
+            # The samples are seeded with the code locations
+            statement_keys = [statement_key + str(statement.lineno)
+                              for statement_key, statement in zip(statement_keys, parsed_ast.body)]
+        statement_lines = [(statement.lineno, statement.end_lineno) for statement in parsed_ast.body]
+        configuration = (tuple(sorted(repr(inspection) for inspection in self.backends[0].inspections)),
+                         tuple(backend.__class__.__name__ for backend in self.backends), prune_irrelevant_calls,
+                         frozenset(self.relevant_pruned_calls),
+                         self.row_sampling, self.operator_scope, self.inference_aggregates_only)
+        instrumented_ast = self.instrument_pipeline(parsed_ast, source_code, prune_irrelevant_calls,
+                                                    self.relevant_pruned_calls)
+        statement_codes = [compile(ast.Module(body=[statement], type_ignores=[]), filename="<ast>", mode="exec")
+                           for statement in instrumented_ast.body]
+        import_count = len(statement_codes) - len(statement_keys)
+
+        resume_index = checkpoints.get_resume_index(configuration, statement_keys, statement_lines)
+        if resume_index != 0:
+            self.script_scope, self.backends = checkpoints.restore(resume_index, statement_codes[import_count:])
+        for statement_code in statement_codes[:import_count]:
+            exec(statement_code, self.script_scope)
+        operator_call_count = self.get_operator_call_count()
+        with checkpoints.recording_file_reads():
+            for statement_index in range(resume_index, len(statement_keys)):
+                exec(statement_codes[import_count + statement_index], self.script_scope)
+                if self.get_operator_call_count() != operator_call_count:
+                    operator_call_count = self.get_operator_call_count()
+                    checkpoints.store(statement_index + 1, self.script_scope, self.backends)
+
+    def get_operator_call_count(self):
         """
-        PipelineExecutor.backends = get_all_backends()
+        The number of operator calls the backends saw in this run so far
+        """
+        return sum(len(backend.code_reference_to_module) for backend in self.backends)
+
+    def get_instrumented_code_and_wir(self, source_code, code_cache=None, prune_irrelevant_calls=False):
+        """
+        Parse, instrument and compile the pipeline and extract the static WIR skeleton. On code cache hits,
+        all of this is skipped.
+        """
+        backend_names = tuple(backend.__class__.__name__ for backend in self.backends)
+        instrumentation_options = ()
+        if prune_irrelevant_calls:
+            instrumentation_options = ("prune_irrelevant_calls",) + tuple(sorted(
+                "relevant_call:{}:{}:{}:{}".format(code_reference.lineno, code_reference.col_offset,
+                                                   code_reference.end_lineno, code_reference.end_col_offset)
+                for code_reference in self.relevant_pruned_calls))
+        if code_cache is not None:
+            cache_entry = code_cache.load(source_code, backend_names, instrumentation_options)
+            if cache_entry is not None:
+                return cache_entry
+
+        parsed_ast = ast.parse(source_code)
+        original_parsed_ast = copy.deepcopy(parsed_ast)  # Some ast functions modify in-place
+        parsed_modified_ast = self.instrument_pipeline(parsed_ast, source_code, prune_irrelevant_calls,
+                                                       self.relevant_pruned_calls)
+        instrumented_code = compile(parsed_modified_ast, filename="<ast>", mode="exec")
+        wir_extractor = WirExtractor(original_parsed_ast)
+        wir = wir_extractor.extract_wir()
+
+        if code_cache is not None:
+            code_cache.store(source_code, backend_names, instrumented_code, wir, instrumentation_options)
+        return instrumented_code, wir
+
+    def initialize_execution_state(self, inspections):
+        """
+        Reset the state the instrumented pipeline code updates through this executor
+        """
+        self.backends = get_all_backends()
         for backend in self.backends:
             backend.inspections = inspections
-        PipelineExecutor.script_scope = {}
+            backend.row_sampling = self.row_sampling
+            backend.operator_scope = self.operator_scope
+            backend.fit_result_cache = self.fit_result_cache
+            backend.inference_aggregates_only = self.inference_aggregates_only
+        self.script_scope = {}
+        self.call_sites = {}
+        self.pruned_call_value_type_is_relevant = {}
+        self.relevant_pruned_call_found = False
+
+    @contextlib.contextmanager
+    def execution_context(self):
+        """
+        Make this executor the one the injected functions use in the current thread or asyncio task. The
+        previous executor gets restored afterwards, so runs can also be nested.
+        """
+        token = current_executor.set(self)
+        try:
+            yield self
+        finally:
+            current_executor.reset(token)
 
     def build_inspection_result_map(self, dag):
         """
@@ -117,21 +281,65 @@ class PipelineExecutor:
                     dag_node_to_annotation[dag_node] = annotation
                     inspection_to_dag_node_to_annotation[inspection] = dag_node_to_annotation
 
+        if self.row_sampling is not None:
+            self.scale_sampled_annotations(dag, inspection_to_dag_node_to_annotation)
         return inspection_to_dag_node_to_annotation
 
+    def scale_sampled_annotations(self, dag, inspection_to_dag_node_to_annotation):
+        """
+        Let the inspections adjust their DAG annotations to the sampling fractions of the operators
+        """
+        dag_node_to_sampling_fraction = self.get_sampling_fractions(dag)
+        for inspection, dag_node_to_annotation in inspection_to_dag_node_to_annotation.items():
+            for dag_node, annotation in dag_node_to_annotation.items():
+                dag_node_to_annotation[dag_node] = inspection.scale_operator_annotation(
+                    annotation, dag_node_to_sampling_fraction[dag_node], self.row_sampling.confidence)
+
+    def get_sampling_fractions(self, dag):
+        """
+        The probability that a row of the full data is in the output of an operator. Rows of a join are in the
+        output if the rows of both inputs were sampled. Joins on the sampling key columns keep the smaller fraction
+        of their inputs because both inputs sampled the same keys. Aggregations output groups and not sampled rows.
+        """
+        code_reference_to_sampling_fraction = {}
+        key_sampled_joins = set()
+        for backend in self.backends:
+            code_reference_to_sampling_fraction.update(backend.code_reference_to_sampling_fraction)
+            key_sampled_joins.update(backend.key_sampled_joins)
+        dag_node_to_sampling_fraction = {}
+        for dag_node in networkx.topological_sort(dag):
+            parent_fractions = [dag_node_to_sampling_fraction[parent] for parent in dag.predecessors(dag_node)]
+            if dag_node.operator_type == OperatorType.DATA_SOURCE:
+                sampling_fraction = code_reference_to_sampling_fraction.get(dag_node.code_reference, 1.0)
+            elif dag_node.operator_type == OperatorType.JOIN and dag_node.code_reference in key_sampled_joins:
+                sampling_fraction = min(parent_fractions)
+            elif dag_node.operator_type == OperatorType.JOIN:
+                sampling_fraction = math.prod(parent_fractions)
+            elif dag_node.operator_type == OperatorType.GROUP_BY_AGG or not parent_fractions:
+                sampling_fraction = 1.0
+            else:
+                sampling_fraction = max(parent_fractions)
+            dag_node_to_sampling_fraction[dag_node] = float(sampling_fraction)
+        return dag_node_to_sampling_fraction
+
     @staticmethod
-    def instrument_pipeline(parsed_ast, source_code):
+    def instrument_pipeline(parsed_ast, source_code, prune_irrelevant_calls=False, relevant_calls=frozenset()):
         """
         Instrument the pipeline AST to instrument function calls
         """
-        call_capture_transformer = CallCaptureTransformer(source_code)
+        if prune_irrelevant_calls:
+            pruned_nodes, guarded_nodes = CallRelevanceAnalysis(parsed_ast, relevant_calls).analyse()
+        else:
+            pruned_nodes, guarded_nodes = frozenset(), frozenset()
+        call_capture_transformer = CallCaptureTransformer(source_code, pruned_nodes, guarded_nodes)
         parsed_modified_ast = call_capture_transformer.visit(parsed_ast)
         parsed_modified_ast = ast.fix_missing_locations(parsed_modified_ast)
         func_import_node = ast.ImportFrom(module='mlinspect.instrumentation._pipeline_executor',
                                           names=[ast.alias(name='before_call_used_value', asname=None),
                                                  ast.alias(name='before_call_used_args', asname=None),
                                                  ast.alias(name='before_call_used_kwargs', asname=None),
-                                                 ast.alias(name='after_call_used', asname=None)],
+                                                 ast.alias(name='after_call_used', asname=None),
+                                                 ast.alias(name='after_pruned_call_used', asname=None)],
                                           level=0)
         parsed_modified_ast.body.insert(0, func_import_node)
         inspect_import_node = ast.Import(names=[ast.alias(name='inspect', asname=None)])
@@ -139,22 +347,21 @@ class PipelineExecutor:
         parsed_modified_ast = ast.fix_missing_locations(parsed_modified_ast)
         return parsed_modified_ast
 
-    @staticmethod
-    def load_source_code(notebook_path, python_path, python_code):
+    def load_source_code(self, notebook_path, python_path, python_code):
         """
-        Load the pipeline source code from the specified source
+        Load the pipeline source code from the specified source. For notebooks, we keep the NotebookSource for the
+        InspectorResult.
         """
         source_code = ""
         sources = [notebook_path, python_path, python_code]
         assert sum(source is not None for source in sources) == 1
+        self.notebook_source = None
         if python_path is not None:
             with open(python_path) as file:
                 source_code = file.read()
         elif notebook_path is not None:
-            with open(notebook_path) as file:
-                notebook = nbformat.reads(file.read(), nbformat.NO_CONVERT)
-                exporter = PythonExporter()
-                source_code, _ = exporter.from_notebook_node(notebook)
+            self.notebook_source = NotebookLoader.load(notebook_path)
+            source_code = self.notebook_source.source_code
         elif python_code is not None:
             source_code = python_code
         return source_code
@@ -164,13 +371,19 @@ class PipelineExecutor:
         This is the method we want to insert into the DAG
         """
         # pylint: disable=too-many-arguments
-        function_info, function_prefix = self.get_function_info_and_prefix(call_code, subscript)
-        for backend in self.backends:
-            if backend.is_responsible_for_call(function_info, function_prefix, value_value):
-                backend.before_call_used_value(function_info, subscript, call_code, value_code,
-                                               value_value, code_reference)
-                return value_value
-
+        if not self.use_call_site_cache:
+            function_info, function_prefix = self.get_function_info_and_prefix(call_code, subscript)
+            responsible_backend = self.get_responsible_backend(function_info, function_prefix, value_value)
+        else:
+            call_site = self.get_call_site(call_code, subscript, code_reference)
+            call_site.capture_receiver(value_value)
+            self.resolve_call_site(call_site, call_code, subscript)
+            function_info = call_site.function_info
+            responsible_backend = call_site.get_responsible_backend(self.backends, "value", value_value)
+
+        if responsible_backend is not None:
+            responsible_backend.before_call_used_value(function_info, subscript, call_code, value_code,
+                                                       value_value, code_reference)
         return value_value
 
     def before_call_used_args(self, subscript, call_code, args_code, code_reference, store, args_values):
@@ -178,14 +391,18 @@ class PipelineExecutor:
         This is the method we want to insert into the DAG
         """
         # pylint: disable=too-many-arguments
-        function_info, function_prefix = self.get_function_info_and_prefix(call_code, subscript, store=store)
-
-        for backend in self.backends:
-            if backend.is_responsible_for_call(function_info, function_prefix):
-                backend.before_call_used_args(function_info, subscript, call_code, args_code, code_reference, store,
-                                              args_values)
-                return args_values
-
+        if not self.use_call_site_cache:
+            function_info, function_prefix = self.get_function_info_and_prefix(call_code, subscript, store=store)
+            responsible_backend = self.get_responsible_backend(function_info, function_prefix)
+        else:
+            call_site = self.get_call_site(call_code, subscript, code_reference, store)
+            self.resolve_call_site(call_site, call_code, subscript, store)
+            function_info = call_site.function_info
+            responsible_backend = call_site.get_responsible_backend(self.backends, "args")
+
+        if responsible_backend is not None:
+            responsible_backend.before_call_used_args(function_info, subscript, call_code, args_code,
+                                                      code_reference, store, args_values)
         return args_values
 
     def before_call_used_kwargs(self, subscript, call_code, kwargs_code, code_reference, kwargs_values):
@@ -194,13 +411,18 @@ class PipelineExecutor:
         """
         # pylint: disable=too-many-arguments
         assert not subscript  # we currently only consider __getitem__ subscripts, these do not take kwargs
-        function_info, function_prefix = self.get_function_info_and_prefix(call_code, subscript)
-        for backend in self.backends:
-            if backend.is_responsible_for_call(function_info, function_prefix):
-                backend.before_call_used_kwargs(function_info, subscript, call_code, kwargs_code,
-                                                code_reference, kwargs_values)
-                return kwargs_values
-
+        if not self.use_call_site_cache:
+            function_info, function_prefix = self.get_function_info_and_prefix(call_code, subscript)
+            responsible_backend = self.get_responsible_backend(function_info, function_prefix)
+        else:
+            call_site = self.get_call_site(call_code, subscript, code_reference)
+            self.resolve_call_site(call_site, call_code, subscript)
+            function_info = call_site.function_info
+            responsible_backend = call_site.get_responsible_backend(self.backends, "kwargs")
+
+        if responsible_backend is not None:
+            responsible_backend.before_call_used_kwargs(function_info, subscript, call_code, kwargs_code,
+                                                        code_reference, kwargs_values)
         return kwargs_values
 
     def after_call_used(self, subscript, call_code, return_value, code_reference):
@@ -208,22 +430,77 @@ class PipelineExecutor:
         This is the method we want to insert into the DAG
         """
         # pylint: disable=too-many-arguments
-        function_info, function_prefix = self.get_function_info_and_prefix(call_code, subscript)
+        if not self.use_call_site_cache:
+            function_info, function_prefix = self.get_function_info_and_prefix(call_code, subscript)
+            responsible_backend = self.get_responsible_backend(function_info, function_prefix, return_value)
+        else:
+            call_site = self.get_call_site(call_code, subscript, code_reference)
+            self.resolve_call_site(call_site, call_code, subscript)
+            function_info = call_site.function_info
+            responsible_backend = call_site.get_responsible_backend(self.backends, "after", return_value)
+
+        if responsible_backend is not None:
+            return responsible_backend.after_call_used(function_info, subscript, call_code, return_value,
+                                                       code_reference)
+        return return_value
 
+    def after_pruned_call_used(self, return_value, code_reference):
+        """
+        Runtime guard for the calls the CallRelevanceAnalysis left uninstrumented. If the call returned a relevant
+        object anyway, the run stops and the call site gets instrumented in the next run.
+        """
+        value_type = type(return_value)
+        is_relevant = self.pruned_call_value_type_is_relevant.get(value_type)
+        if is_relevant is None:
+            is_relevant = any(backend.is_responsible_for_value(return_value) for backend in self.backends)
+            self.pruned_call_value_type_is_relevant[value_type] = is_relevant
+        if is_relevant:
+            self.relevant_pruned_calls.add(code_reference)
+            self.relevant_pruned_call_found = True
+            raise RelevantPrunedCallFound()
+        return return_value
+
+    def get_responsible_backend(self, function_info, function_prefix, value=None):
+        """
+        Find out which backend is responsible for a call without using the call site cache
+        """
         for backend in self.backends:
-            if backend.is_responsible_for_call(function_info, function_prefix, return_value):
-                return backend.after_call_used(function_info, subscript, call_code, return_value, code_reference)
+            if backend.is_responsible_for_call(function_info, function_prefix, value):
+                return backend
+        return None
 
-        return return_value
+    def get_call_site(self, call_code, subscript, code_reference, store=False):
+        """
+        Get the cached resolution state for a call site. The call code is part of the key because
+        reset_state=False runs may execute different code with the same code references.
+        """
+        call_site_key = (code_reference, call_code, store)
+        call_site = self.call_sites.get(call_site_key)
+        if call_site is None:
+            if not subscript:
+                function_string = PipelineExecutor.split_on_bracket(call_code)
+            else:
+                function_string = str(call_code.split("[", 1)[0])
+            call_site = CallSiteResolution(function_string)
+            self.call_sites[call_site_key] = call_site
+        return call_site
 
-    @staticmethod
-    def get_function_info_and_prefix(call_code, subscript, store=False):
+    def resolve_call_site(self, call_site, call_code, subscript, store=False):
+        """
+        Only resolve the function info again if the receiver of the call changed
+        """
+        receiver_key = call_site.get_receiver_key(self.script_scope, subscript, store)
+        if not call_site.is_resolved_for(receiver_key):
+            function_info, function_prefix = self.get_function_info_and_prefix(call_code, subscript, store)
+            call_site.update(receiver_key, function_info, function_prefix)
+
+    def get_function_info_and_prefix(self, call_code, subscript, store=False):
         """
         Get the function info and find out which backend to call
         """
         if not subscript:
             function_string = PipelineExecutor.split_on_bracket(call_code)
-            module_info = eval("inspect.getmodule(" + function_string + ")", PipelineExecutor.script_scope)
+            module_info = eval("inspect.getmodule(" + function_string + ")", self.script_scope)
             function_name = PipelineExecutor.split_on_dot(function_string)
             if module_info is not None:
                 function_info = (module_info.__name__, function_name)
@@ -232,7 +509,7 @@ class PipelineExecutor:
                 function_info = (module_info, function_name)
         else:
             function_string = str(call_code.split("[", 1)[0])
-            module_info = eval("inspect.getmodule(" + function_string + ")", PipelineExecutor.script_scope)
+            module_info = eval("inspect.getmodule(" + function_string + ")", self.script_scope)
 
             if not store:
                 function_info = (module_info.__name__, "__getitem__")
@@ -287,9 +564,8 @@ class PipelineExecutor:
 
 # How we instrument the calls
 
-# This instance works as our singleton: we avoid to pass the class instance to the instrumented
-# pipeline. This keeps the DAG nodes to be inserted very simple.
-singleton = PipelineExecutor()
+# We avoid to pass the executor to the instrumented pipeline, the injected functions look up the current
+# one instead. This keeps the DAG nodes to be inserted very simple.
 
 
 def before_call_used_value(subscript, call_code, value_code, value_value, ast_lineno, ast_col_offset,
@@ -298,9 +574,9 @@ def before_call_used_value(subscript, call_code, value_code, value_value, ast_li
     Method that gets injected into the pipeline code
     """
     # pylint: disable=too-many-arguments
-    return singleton.before_call_used_value(subscript, call_code, value_code, value_value,
-                                            CodeReference(ast_lineno, ast_col_offset, ast_end_lineno,
-                                                          ast_end_col_offset))
+    return current_executor.get().before_call_used_value(subscript, call_code, value_code, value_value,
+                                                         CodeReference(ast_lineno, ast_col_offset, ast_end_lineno,
+                                                                       ast_end_col_offset))
 
 
 def before_call_used_args(subscript, call_code, args_code, ast_lineno, ast_col_offset,
@@ -309,11 +585,11 @@ def before_call_used_args(subscript, call_code, args_code, ast_lineno, ast_col_o
     Method that gets injected into the pipeline code
     """
     # pylint: disable=too-many-arguments
-    return singleton.before_call_used_args(subscript, call_code, args_code,
-                                           CodeReference(ast_lineno, ast_col_offset, ast_end_lineno,
-                                                         ast_end_col_offset),
-                                           store,
-                                           args_values)
+    return current_executor.get().before_call_used_args(subscript, call_code, args_code,
+                                                        CodeReference(ast_lineno, ast_col_offset, ast_end_lineno,
+                                                                      ast_end_col_offset),
+                                                        store,
+                                                        args_values)
 
 
 def before_call_used_kwargs(subscript, call_code, kwargs_code, ast_lineno, ast_col_offset,
@@ -322,10 +598,10 @@ def before_call_used_kwargs(subscript, call_code, kwargs_code, ast_lineno, ast_c
     Method that gets injected into the pipeline code
     """
     # pylint: disable=too-many-arguments
-    return singleton.before_call_used_kwargs(subscript, call_code, kwargs_code,
-                                             CodeReference(ast_lineno, ast_col_offset, ast_end_lineno,
-                                                           ast_end_col_offset),
-                                             kwarg_values)
+    return current_executor.get().before_call_used_kwargs(subscript, call_code, kwargs_code,
+                                                          CodeReference(ast_lineno, ast_col_offset, ast_end_lineno,
+                                                                        ast_end_col_offset),
+                                                          kwarg_values)
 
 
 def after_call_used(subscript, call_code, return_value, ast_lineno, ast_col_offset, ast_end_lineno, ast_end_col_offset):
@@ -333,5 +609,15 @@ def after_call_used(subscript, call_code, return_value, ast_lineno, ast_col_offs
     Method that gets injected into the pipeline code
     """
     # pylint: disable=too-many-arguments
-    return singleton.after_call_used(subscript, call_code, return_value,
-                                     CodeReference(ast_lineno, ast_col_offset, ast_end_lineno, ast_end_col_offset))
+    return current_executor.get().after_call_used(subscript, call_code, return_value,
+                                                  CodeReference(ast_lineno, ast_col_offset, ast_end_lineno,
+                                                                ast_end_col_offset))
+
+
+def after_pruned_call_used(return_value, ast_lineno, ast_col_offset, ast_end_lineno, ast_end_col_offset):
+    """
+    Method that gets injected into the pipeline code
+    """
+    return current_executor.get().after_pruned_call_used(return_value,
+                                                         CodeReference(ast_lineno, ast_col_offset, ast_end_lineno,
+                                                                       ast_end_col_offset))
@@ -0,0 +1,232 @@
+"""
+A pool of pre-warmed worker processes to inspect many pipelines, with per-pipeline timeouts and crash isolation
+"""
+import collections
+import dataclasses
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import traceback
+from multiprocessing.connection import wait
+from typing import Callable, Iterable, Iterator
+
+WORKER_READY = b"ready"
+# How often concurrent batches check their result queues, other batches may have collected their results
+CONCURRENT_BATCHES_POLL_INTERVAL = 0.05
+
+
+@dataclasses.dataclass
+class WorkerPoolResult:
+    """
+    The result of one task, exactly one of result and error is set
+    """
+    task_index: int
+    result: any = None
+    error: str or None = None
+
+
+class PipelineWorker:
+    """
+    A worker process and the connection to it
+    """
+
+    def __init__(self, context, task_function):
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(target=run_worker, args=(worker_connection, task_function), daemon=True)
+        self.process.start()
+        worker_connection.close()
+        self.is_ready = False
+        self.batch_results = None
+        self.task_index = None
+        self.timeout = None
+        self.deadline = None
+
+    def assign(self, batch_results, task_index, task, timeout):
+        """
+        Send a task to the worker, its result goes to batch_results. The timeout starts now.
+        """
+        self.batch_results = batch_results
+        self.task_index = task_index
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.connection.send_bytes(pickle.dumps(task, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def finish_task(self):
+        """
+        Mark the worker as idle again, returns the index of the finished task
+        """
+        task_index = self.task_index
+        self.batch_results = None
+        self.task_index = None
+        self.timeout = None
+        self.deadline = None
+        return task_index
+
+    def stop(self, kill=False):
+        """
+        Ask the worker to exit, or kill it if it is stuck or not needed anymore
+        """
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.connection.send_bytes(b"")
+            except (BrokenPipeError, OSError):
+                pass
+        self.process.join(None if kill else 5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+class PipelineWorkerPool:
+    """
+    Runs tasks on worker processes that import mlinspect and its backends once, when the pool starts. The workers
+    keep running between imap_unordered calls until the pool gets closed. Results stream back in the order the
+    tasks finish. If a task times out or its worker crashes, only this task fails and the worker gets replaced.
+    """
+
+    def __init__(self, task_function: Callable, worker_count: int or None = None):
+        self.task_function = task_function
+        self.worker_count = worker_count or os.cpu_count() or 1
+        # Forking a process that already imported TensorFlow can deadlock, so we always start fresh interpreters
+        self.context = multiprocessing.get_context("spawn")
+        self.lock = threading.Lock()
+        self.active_batch_count = 0
+        self.workers = [PipelineWorker(self.context, self.task_function) for _ in range(self.worker_count)]
+
+    def imap_unordered(self, tasks: Iterable[any], timeout: float or None = None) -> Iterator[WorkerPoolResult]:
+        """
+        Execute the tasks, task functions and results must be picklable. Concurrent calls share the workers. Each
+        call has its own result queue and collects the results of all workers into the queues of the calls that
+        dispatched their tasks, so the lock is only held while dispatching and collecting, not while the caller
+        consumes the results.
+        """
+        batch_results = collections.deque()
+        pending_tasks = collections.deque(enumerate(tasks))
+        with self.lock:
+            self.active_batch_count += 1
+        try:
+            while True:
+                with self.lock:
+                    if self.workers is None:
+                        raise RuntimeError("The worker pool is closed")
+                    self.collect_results()
+                    for worker in self.workers:
+                        if worker.is_ready and worker.task_index is None and pending_tasks:
+                            worker.assign(batch_results, *pending_tasks.popleft(), timeout)
+                    results = list(batch_results)
+                    batch_results.clear()
+                    is_running = any(worker.batch_results is batch_results for worker in self.workers)
+                    wait_objects = [wait_object for worker in self.workers
+                                    for wait_object in (worker.connection, worker.process.sentinel)]
+                    wait_timeout = self.get_wait_timeout(self.workers)
+                    if self.active_batch_count > 1:
+                        wait_timeout = min(wait_timeout, CONCURRENT_BATCHES_POLL_INTERVAL) \
+                            if wait_timeout is not None else CONCURRENT_BATCHES_POLL_INTERVAL
+                yield from results
+                if not pending_tasks and not is_running:
+                    return
+                if not results:
+                    wait(wait_objects, wait_timeout)
+        finally:
+            # If the caller stops early, the workers that still run a task of this call get replaced
+            with self.lock:
+                self.active_batch_count -= 1
+                for index, worker in enumerate(self.workers or []):
+                    if worker.batch_results is batch_results:
+                        worker.stop(kill=True)
+                        self.workers[index] = PipelineWorker(self.context, self.task_function)
+
+    def collect_results(self):
+        """
+        Receive the results and ready messages of all workers and put the results into the queues of their calls.
+        Workers that crashed or timed out get replaced. The lock must be held.
+        """
+        for index, worker in enumerate(self.workers):
+            try:
+                has_message = worker.connection.poll()
+            except (EOFError, OSError):
+                has_message = True
+            if has_message:
+                try:
+                    message = worker.connection.recv_bytes()
+                except (EOFError, OSError):
+                    message = None
+                if message == WORKER_READY:
+                    worker.is_ready = True
+                    continue
+                if message is not None:
+                    batch_results = worker.batch_results
+                    batch_results.append(WorkerPoolResult(worker.finish_task(), *pickle.loads(message)))
+                    continue
+            if has_message or not worker.process.is_alive():
+                worker.process.join()
+                error = "The worker process crashed with exit code {}".format(worker.process.exitcode)
+            elif worker.deadline is not None and time.monotonic() >= worker.deadline:
+                error = "The pipeline did not finish within {} seconds".format(worker.timeout)
+            else:
+                continue
+            if not worker.is_ready:
+                raise RuntimeError("Could not start the worker processes: {}".format(error))
+            batch_results = worker.batch_results
+            task_index = worker.finish_task()
+            worker.stop(kill=True)
+            self.workers[index] = PipelineWorker(self.context, self.task_function)
+            if task_index is not None:
+                batch_results.append(WorkerPoolResult(task_index, error=error))
+
+    def close(self):
+        """
+        Stop the worker processes
+        """
+        with self.lock:
+            for worker in self.workers or []:
+                worker.stop()
+            self.workers = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    @staticmethod
+    def get_wait_timeout(workers):
+        """
+        Wake up when the next running task times out
+        """
+        deadlines = [worker.deadline for worker in workers if worker.deadline is not None]
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.monotonic(), 0)
+
+
+def run_worker(connection, task_function):
+    """
+    The main loop of a worker process. The worker imports the backends before it reports that it is ready.
+    """
+    # pylint: disable=import-outside-toplevel,unused-import
+    from ..backends import _all_backends
+    from . import _monkey_patching_executor
+    connection.send_bytes(WORKER_READY)
+    while True:
+        try:
+            message = connection.recv_bytes()
+        except EOFError:
+            break
+        if not message:
+            break
+        task = pickle.loads(message)
+        try:
+            response = (task_function(task), None)
+        except (Exception, SystemExit):  # pylint: disable=broad-except
+            response = (None, traceback.format_exc())
+        try:
+            connection.send_bytes(pickle.dumps(response, protocol=pickle.HIGHEST_PROTOCOL))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            connection.send_bytes(pickle.dumps((None, traceback.format_exc()), protocol=pickle.HIGHEST_PROTOCOL))
+    connection.close()
@@ -0,0 +1,103 @@
+"""
+Inspect pipelines on a sample of the rows of their data sources
+"""
+import dataclasses
+import hashlib
+from typing import Tuple
+
+import numpy
+from pandas import DataFrame
+from pandas.util import hash_pandas_object
+
+from ._dag_node import CodeReference
+
+
+@dataclasses.dataclass(frozen=True)
+class RowSampling:
+    """
+    Sample either a fraction or at most n_rows rows of each data source. The samples are deterministic for the
+    same seed and pipeline code. Data sources with all key_columns get sampled by a hash of their key values, so
+    the sampled rows of different sources still join on these keys.
+    """
+    fraction: float or None = None
+    n_rows: int or None = None
+    seed: int = 0
+    confidence: float = 0.95
+    key_columns: Tuple[str, ...] = ()
+
+    def __post_init__(self):
+        if (self.fraction is None) == (self.n_rows is None):
+            raise ValueError("Either a sampling fraction or a number of rows is required!")
+        if self.fraction is not None and not 0 < self.fraction <= 1:
+            raise ValueError("The sampling fraction must be in (0, 1], got {}!".format(self.fraction))
+        if self.n_rows is not None and self.n_rows < 1:
+            raise ValueError("The number of sampled rows must be positive, got {}!".format(self.n_rows))
+        if not 0 < self.confidence < 1:
+            raise ValueError("The confidence must be in (0, 1), got {}!".format(self.confidence))
+
+    def sample(self, data_frame: DataFrame, code_reference: CodeReference) -> Tuple[DataFrame, float]:
+        """
+        Sample the rows of a data source and return the sample with the actual sampling fraction. Each data
+        source draws its sample with its own random state derived from the seed and its code location, the sampled
+        rows keep their order and index. Data sources with the key columns get sampled by their keys instead.
+        """
+        if self.samples_by_key(data_frame):
+            return self.sample_by_key(data_frame)
+        row_count = len(data_frame)
+        if self.fraction is not None:
+            sample_size = max(round(row_count * self.fraction), 1)
+        else:
+            sample_size = self.n_rows
+        if sample_size >= row_count:
+            return data_frame, 1.0
+        random_state = numpy.random.default_rng([self.seed, code_reference.lineno, code_reference.col_offset])
+        positions = numpy.sort(random_state.choice(row_count, sample_size, replace=False))
+        return data_frame.iloc[positions], sample_size / row_count
+
+    def samples_by_key(self, data_frame: DataFrame) -> bool:
+        """
+        Whether the rows of a data source get sampled by the hash of their key columns
+        """
+        return bool(self.key_columns) and all(column in data_frame.columns for column in self.key_columns)
+
+    def sample_by_key(self, data_frame: DataFrame) -> Tuple[DataFrame, float]:
+        """
+        Keep the rows whose seeded key hash is below the sampling fraction. All rows with some key values are either
+        sampled in every data source or in none, so a join on the keys keeps the sampling fraction. With n_rows,
+        the sample only has about n_rows rows.
+        """
+        row_count = len(data_frame)
+        if self.fraction is not None:
+            sampling_fraction = self.fraction
+        else:
+            sampling_fraction = min(self.n_rows / max(row_count, 1), 1.0)
+        if sampling_fraction == 1.0:
+            return data_frame, 1.0
+        seed_hash = numpy.uint64(int(hashlib.md5(str(self.seed).encode()).hexdigest()[:16], 16))
+        key_hashes = hash_pandas_object(data_frame[list(self.key_columns)], index=False).to_numpy()
+        key_hashes = mix_hashes(key_hashes ^ seed_hash)
+        threshold = numpy.uint64(min(int(sampling_fraction * 2 ** 64), 2 ** 64 - 1))
+        return data_frame[key_hashes < threshold], sampling_fraction
+
+    def is_key_join(self, left_keys, right_keys) -> bool:
+        """
+        Whether a merge joins the sampled rows of both inputs on exactly the key columns
+        """
+        def as_set(keys):
+            if keys is None:
+                return set()
+            if not isinstance(keys, list):
+                keys = [keys]
+            return set(keys)
+        return bool(self.key_columns) and as_set(left_keys) == as_set(right_keys) == set(self.key_columns)
+
+
+def mix_hashes(hashes: numpy.ndarray) -> numpy.ndarray:
+    """
+    The splitmix64 finalizer, pandas does not use its hash key for numeric columns, so we mix in the seed ourselves
+    """
+    hashes = hashes ^ (hashes >> numpy.uint64(30))
+    hashes = hashes * numpy.uint64(0xbf58476d1ce4e5b9)
+    hashes = hashes ^ (hashes >> numpy.uint64(27))
+    hashes = hashes * numpy.uint64(0x94d049bb133111eb)
+    return hashes ^ (hashes >> numpy.uint64(31))
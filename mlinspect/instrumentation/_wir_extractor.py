@@ -266,7 +266,16 @@ class WirExtractor:
         """
         After executing the pipeline, annotate call nodes with the captured module info
         """
-        for node in self.graph.nodes:
+        return self.add_runtime_info_to_wir(self.graph, code_reference_to_module, code_reference_to_description,
+                                            code_reference_to_code)
+
+    @staticmethod
+    def add_runtime_info_to_wir(graph, code_reference_to_module, code_reference_to_description,
+                                code_reference_to_code):
+        """
+        Annotate the call nodes of an already extracted WIR, e.g., one loaded from the PipelineCodeCache
+        """
+        for node in graph.nodes:
             if (node.operation == "Call" or node.operation == "Subscript"
                     or node.operation == "Subscript-Assign") and \
                     node.code_reference in code_reference_to_module:
@@ -275,7 +284,7 @@ class WirExtractor:
                     node.source_code = code_reference_to_code[node.code_reference]
                 if node.code_reference in code_reference_to_description:
                     node.dag_operator_description = code_reference_to_description[node.code_reference]
-        return self.graph
+        return graph
 
     def extract_wir_name(self, ast_node):
         """
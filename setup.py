@@ -15,9 +15,13 @@ with open(os.path.join(ROOT, "requirements", "requirements.dev.txt")) as f:
 with open("README.md", "r") as fh:
     long_description = fh.read()
 
+version = {}
+with open(os.path.join(ROOT, "mlinspect", "_version.py")) as f:
+    exec(f.read(), version)
+
 setup(
     name="mlinspect",
-    version="0.0.1.dev0",
+    version=version["__version__"],
     description="Inspect ML Pipelines in the form of a DAG",
     author='Stefan Grafberger',
     author_email='stefangrafberger@gmail.com',
@@ -0,0 +1,54 @@
+"""
+Tests whether the AnnotationRegistry works
+"""
+import gc
+import pickle
+
+import numpy
+import pandas
+
+from mlinspect.backends._annotation_registry import AnnotationRegistry
+from mlinspect.backends._annotation_store import AnnotationStore
+from mlinspect.inspections import RowLineage
+
+
+def test_annotation_registry_views():
+    """
+    Tests whether the values stay plain objects and numpy views with the same rows share the annotations
+    """
+    registry = AnnotationRegistry()
+    annotations = AnnotationStore.from_iters([RowLineage(1)], [iter([0, 1, 2])])
+    array = numpy.arange(6).reshape(3, 2)
+    column = numpy.arange(3).reshape(3, 1)
+    series = pandas.Series([1, 2, 3])
+
+    assert registry.set_annotations(array, annotations) is array
+    registry.set_annotations(column, annotations)
+    registry.set_annotations(series, annotations)
+
+    assert type(array) is numpy.ndarray  # pylint: disable=unidiomatic-typecheck
+    assert registry.get_annotations(series) is annotations
+    assert registry.get_annotations(array) is annotations
+    assert registry.get_annotations(array[:, 1:]) is annotations
+    assert registry.get_annotations(column.ravel()) is annotations
+    assert registry.get_annotations(array[::-1]) is None
+    assert registry.get_annotations(array[:2]) is None
+    assert registry.get_annotations(series.copy()) is None
+    assert list(registry.get_row_annotations(series.copy(), [RowLineage(1)]).get_rows(0)) == [None, None, None]
+
+
+def test_annotation_registry_weak_entries_and_pickling():
+    """
+    Tests whether the entries get removed with their values and survive pickling together with their values
+    """
+    registry = AnnotationRegistry()
+    annotations = AnnotationStore.from_iters([RowLineage(1)], [iter([0, 1])])
+    kept_array = numpy.array([1, 2])
+    registry.set_annotations(kept_array, annotations)
+    registry.set_annotations(numpy.array([3, 4]), annotations)
+    gc.collect()
+
+    assert len(registry) == 1
+
+    restored_array, restored_registry = pickle.loads(pickle.dumps((kept_array, registry)))
+    assert list(restored_registry.get_annotations(restored_array).get_rows(0)) == [0, 1]
@@ -0,0 +1,44 @@
+"""
+Tests whether the AnnotationStore works
+"""
+import numpy
+
+from mlinspect.backends._annotation_store import AnnotationStore, ScalarAnnotations, OffsetAnnotations, \
+    ObjectAnnotations
+from mlinspect.inspections import MaterializeFirstOutputRows, RowLineage
+
+
+def test_annotation_store_typed_buffers():
+    """
+    Tests whether the annotations get stored in typed buffers and come back unchanged
+    """
+    scalar_annotations = [3, 1, 2]
+    set_annotations = [{1, 2}, set(), {3}]
+    object_annotations = [None, "a", 1]
+    store = AnnotationStore.from_iters([RowLineage(1), RowLineage(2), MaterializeFirstOutputRows(1)],
+                                       [iter(scalar_annotations), iter(set_annotations), iter(object_annotations)])
+
+    assert len(store) == 3
+    assert isinstance(store.buffers[0], ScalarAnnotations)
+    assert store.buffers[0].values.dtype == numpy.int64
+    assert isinstance(store.buffers[1], OffsetAnnotations)
+    assert store.buffers[1].values.dtype == numpy.int64
+    assert isinstance(store.buffers[2], ObjectAnnotations)
+    assert list(store.get_rows(0)) == scalar_annotations
+    assert list(store.get_rows(1)) == set_annotations
+    assert list(store.get_rows(2)) == object_annotations
+
+
+def test_annotation_store_take():
+    """
+    Tests whether gathering rows works for all buffers
+    """
+    store = AnnotationStore.from_iters([RowLineage(1), RowLineage(2), MaterializeFirstOutputRows(1)],
+                                       [iter([3, 1, 2]), iter([[1, 2], [], [3, 4, 5]]), iter([None, "a", 1])])
+    positions = numpy.array([2, 0, 2])
+    gathered_store = store.take(positions)
+
+    assert list(gathered_store.get_rows(0)) == [2, 3, 2]
+    assert list(gathered_store.get_rows(1)) == [[3, 4, 5], [1, 2], [3, 4, 5]]
+    assert list(gathered_store.get_rows(2)) == [1, None, 1]
+    assert list(gathered_store.get_array(1)) == [[3, 4, 5], [1, 2], [3, 4, 5]]
@@ -0,0 +1,35 @@
+"""
+Tests whether the backend utils work
+"""
+import numpy
+from scipy.sparse import random
+
+from mlinspect.backends._backend_utils import get_csr_row_iterator, get_column_slices
+
+
+def test_csr_row_iterator_chunks():
+    """
+    Tests whether the csr rows get densified in chunks and the column info marks them as sparse
+    """
+    matrix = random(10, 4, density=0.3, format='csr', random_state=0)
+    column_info, row_iterator = get_csr_row_iterator(matrix, ["a"], rows_per_chunk=3)
+
+    assert column_info.fields == ["a"]
+    assert column_info.is_sparse
+    rows = [row[0] for row in row_iterator]
+    numpy.testing.assert_array_equal(numpy.array(rows), matrix.toarray())
+
+
+def test_column_slices():
+    """
+    Tests whether sparse and dense outputs get split into the same column slices
+    """
+    matrix = random(10, 6, density=0.3, format='csr', random_state=0)
+    sparse_slices = get_column_slices(matrix, [0, 1, 4, 6])
+    dense_slices = get_column_slices(matrix.toarray(), [0, 1, 4, 6])
+
+    assert [column_slice.shape for column_slice in sparse_slices] == [(10, 1), (10, 3), (10, 2)]
+    for sparse_slice, dense_slice, (start, end) in zip(sparse_slices, dense_slices, [(0, 1), (1, 4), (4, 6)]):
+        assert sparse_slice.format == "csr"
+        numpy.testing.assert_array_equal(sparse_slice.toarray(), matrix[:, start:end].toarray())
+        numpy.testing.assert_array_equal(dense_slice, matrix.toarray()[:, start:end])
@@ -0,0 +1,133 @@
+"""
+Tests whether the FitResultCache works
+"""
+import os
+from inspect import cleandoc
+
+import numpy
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from example_pipelines import ADULT_SIMPLE_PY
+from mlinspect import PipelineInspector
+from mlinspect.backends._fit_result_cache import FitResultCache, FitResultCacheStats
+from mlinspect.inspections import HistogramForColumns, MaterializeFirstOutputRows
+
+
+def test_fit_result_cache_keyed_by_params_and_data():
+    """
+    Tests whether changing the parameters or the training data leads to a cache miss and hits get fresh copies
+    """
+    fit_result_cache = FitResultCache()
+    data = numpy.array([[1.], [2.], [3.]])
+    scaler = StandardScaler()
+    key = fit_result_cache.get_key(scaler, data, None)
+    result = scaler.fit_transform(data)
+
+    assert fit_result_cache.load(key) is None
+    fit_result_cache.store(key, scaler, result)
+    cached_scaler, cached_result = fit_result_cache.load(key)
+    assert cached_scaler is not scaler and cached_result is not result
+    numpy.testing.assert_array_equal(cached_scaler.mean_, scaler.mean_)
+    numpy.testing.assert_array_equal(cached_result, result)
+
+    assert fit_result_cache.get_key(StandardScaler(), data, None) == key
+    assert fit_result_cache.get_key(StandardScaler(with_mean=False), data, None) != key
+    assert fit_result_cache.get_key(StandardScaler(), data * 2, None) != key
+    assert fit_result_cache.get_stats() == FitResultCacheStats(1, 1)
+
+
+def test_fit_result_cache_skips_unseeded_estimators():
+    """
+    Tests whether estimators that use shared random number generator states do not get cached
+    """
+    fit_result_cache = FitResultCache()
+    data = numpy.array([[1.], [2.], [3.]])
+    labels = numpy.array([0, 1, 0])
+
+    assert fit_result_cache.get_key(DecisionTreeClassifier(), data, labels) is None
+    random_state = numpy.random.default_rng(0)
+    assert fit_result_cache.get_key(DecisionTreeClassifier(random_state=random_state), data, labels) is None
+    assert fit_result_cache.get_key(Pipeline([('learner', DecisionTreeClassifier())]), data, labels) is None
+    assert fit_result_cache.get_key(DecisionTreeClassifier(random_state=0), data, labels) is not None
+    assert fit_result_cache.get_key(Pipeline([('scaler', StandardScaler())]), data, labels) is not None
+
+
+def test_fit_result_cache_max_memory_entries():
+    """
+    Tests whether only the last entries stay in memory
+    """
+    fit_result_cache = FitResultCache(max_memory_entries=1)
+    data = numpy.array([[1.], [2.], [3.]])
+    first_key = fit_result_cache.get_key(StandardScaler(), data, None)
+    second_key = fit_result_cache.get_key(StandardScaler(), data * 2, None)
+    fit_result_cache.store(first_key, StandardScaler().fit(data))
+    fit_result_cache.store(second_key, StandardScaler().fit(data * 2))
+
+    assert fit_result_cache.load(first_key) is None
+    assert fit_result_cache.load(second_key) is not None
+
+
+def test_fit_result_cache_reinspection(tmpdir):
+    """
+    Tests whether re-inspecting a pipeline with other inspections reuses the fit results and still visits the
+    cached outputs
+    """
+    fit_result_cache = FitResultCache(str(tmpdir))
+    first_result = PipelineInspector\
+        .on_pipeline_from_py_file(ADULT_SIMPLE_PY)\
+        .add_required_inspection(MaterializeFirstOutputRows(5))\
+        .with_fit_result_cache(fit_result_cache)\
+        .execute()
+    first_stats = fit_result_cache.get_stats()
+    assert first_stats.hits == 0 and first_stats.misses != 0
+    # The DecisionTreeClassifier without random_state does not get cached
+    assert len(os.listdir(str(tmpdir))) == first_stats.misses - 1
+
+    inspection = HistogramForColumns(["race"])
+    second_result = PipelineInspector\
+        .on_pipeline_from_py_file(ADULT_SIMPLE_PY)\
+        .add_required_inspection(inspection)\
+        .with_fit_result_cache(fit_result_cache)\
+        .execute()
+    assert fit_result_cache.get_stats() == FitResultCacheStats(first_stats.misses - 1, first_stats.misses + 1)
+
+    uncached_result = PipelineInspector\
+        .on_pipeline_from_py_file(ADULT_SIMPLE_PY)\
+        .add_required_inspection(inspection)\
+        .execute()
+    assert list(second_result.dag.nodes) == list(first_result.dag.nodes)
+    assert second_result.inspection_to_annotations[inspection] == \
+           uncached_result.inspection_to_annotations[inspection]
+
+
+def test_fit_result_cache_pipeline_memory(tmpdir):
+    """
+    Tests whether the steps of a Pipeline(memory=...) store their fit results next to the joblib cache and the
+    inspections still visit all steps on cache hits
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+        from sklearn import preprocessing
+        from sklearn.compose import ColumnTransformer
+        from sklearn.pipeline import Pipeline
+        from sklearn.tree import DecisionTreeClassifier
+
+        df = pd.DataFrame({'A': [1., 2., 3., 4.], 'B': [0, 1, 0, 1]})
+        featurisation = ColumnTransformer(transformers=[('numeric', preprocessing.StandardScaler(), ['A'])])
+        pipeline = Pipeline([('features', featurisation), ('learner', DecisionTreeClassifier())],
+                            memory={})
+        pipeline.fit(df[['A']], df['B'])
+        """).replace("{}", repr(str(tmpdir)))
+    inspection = HistogramForColumns(['B'])
+    first_result = PipelineInspector.on_pipeline_from_string(test_code).add_required_inspection(inspection)\
+        .execute()
+    assert os.listdir(os.path.join(str(tmpdir), "mlinspect"))
+
+    second_result = PipelineInspector.on_pipeline_from_string(test_code).add_required_inspection(inspection)\
+        .execute()
+    assert second_result.inspection_to_annotations[inspection] == \
+           first_result.inspection_to_annotations[inspection]
+    descriptions = {node.description for node in second_result.inspection_to_annotations[inspection]}
+    assert "Numerical Encoder (StandardScaler), Column: 'A'" in descriptions
@@ -1,6 +1,13 @@
 """
 Tests whether the PipelineExecutor works
 """
+from inspect import cleandoc
+
+from mlinspect import PipelineInspector
+from mlinspect.inspections import RowLineage, HistogramForColumns
+from mlinspect.inspections._lineage import LineageId
+from mlinspect.instrumentation._dag_node import OperatorType
+from mlinspect.instrumentation._pipeline_executor import PipelineExecutor
 from ..testing_helper_utils import get_pandas_read_csv_and_dropna_code, run_random_annotation_testing_analyzer, \
     run_row_index_annotation_testing_analyzer, run_multiple_test_analyzers
 
@@ -34,3 +41,93 @@ def test_pandas_backend_annotation_propagation_multiple_analyzers():
     for analyzer in analyzers:
         result = analyzer_results[analyzer]
         assert len(result) == 3
+
+
+def test_pandas_backend_row_positions_without_index_columns():
+    """
+    Tests whether selections and joins find the positions of the input rows for frames with duplicate index
+    labels and without adding columns to the frames of the user
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+
+        df_a = pd.DataFrame({'A': [0, None, 2, 3], 'B': [1, 2, 1, 3]}, index=[5, 5, 6, 5])
+        df_a = df_a.dropna()
+        df_b = pd.DataFrame({'B': [3, 1], 'C': [10, 11]})
+        df_c = df_a.merge(df_b, on='B')
+        df_d = df_c[df_c['C'] > 10]
+        """)
+    inspector_result = PipelineInspector \
+        .on_pipeline_from_string(test_code) \
+        .add_required_inspection(RowLineage(5)) \
+        .execute()
+    lineage_result = inspector_result.inspection_to_annotations[RowLineage(5)]
+    selection_results = [annotation for node, annotation in lineage_result.items()
+                         if node.operator_type == OperatorType.SELECTION]
+    dropna_result = next(result for result in selection_results if "C" not in result.columns)
+    assert list(dropna_result["A"]) == [0, 2, 3]
+    assert list(dropna_result["mlinspect_lineage"]) == [{LineageId(0, 0)}, {LineageId(0, 2)}, {LineageId(0, 3)}]
+    join_result = next(annotation for node, annotation in lineage_result.items()
+                       if node.operator_type == OperatorType.JOIN)
+    assert list(join_result.columns) == ['A', 'B', 'C', 'mlinspect_lineage']
+    assert list(join_result["A"]) == [0, 2, 3]
+    assert list(join_result["mlinspect_lineage"]) == [{LineageId(0, 0), LineageId(2, 1)},
+                                                      {LineageId(0, 2), LineageId(2, 1)},
+                                                      {LineageId(0, 3), LineageId(2, 0)}]
+    select_result = next(result for result in selection_results if "C" in result.columns)
+    assert list(select_result["A"]) == [0, 2]
+    assert list(select_result["mlinspect_lineage"]) == [{LineageId(0, 0), LineageId(2, 1)},
+                                                        {LineageId(0, 2), LineageId(2, 1)}]
+
+
+def test_pandas_backend_set_item_input_columns():
+    """
+    Tests whether the inputs of __setitem__ operators are the columns before the assignment
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+
+        df = pd.DataFrame({'A': [1, 2, 2], 'C': ['x', 'y', 'z']})
+        df['A'] = df['A'] * 10
+        df['B'] = 1
+        """)
+    inspector_result = PipelineInspector \
+        .on_pipeline_from_string(test_code) \
+        .add_required_inspection(HistogramForColumns(['A'])) \
+        .execute()
+    histogram_result = inspector_result.inspection_to_annotations[HistogramForColumns(['A'])]
+    set_item_results = [annotation for node, annotation in histogram_result.items()
+                        if node.operator_type == OperatorType.PROJECTION_MODIFY]
+    assert set_item_results == [{'A': {1: 1, 2: 2}}, {'A': {10: 1, 20: 2}}]
+    set_item_columns = [node.columns for node in histogram_result
+                        if node.operator_type == OperatorType.PROJECTION_MODIFY]
+    assert set_item_columns == [['A', 'C'], ['A', 'C', 'B']]
+
+
+def test_pandas_backend_dag_only_without_inspections():
+    """
+    Tests whether runs without inspections get the DAG with the columns, but no row annotations
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+
+        df = pd.DataFrame({'A': [1, 2, None], 'C': ['x', 'y', 'z']})
+        df = df.dropna()
+        df['B'] = df['A'] * 10
+        df = df[df['B'] > 10]
+        """)
+    executor = PipelineExecutor()
+    inspector_result = executor.run(None, None, test_code, [], [])
+
+    operator_columns = [(node.operator_type, node.columns) for node in inspector_result.dag.nodes]
+    assert sorted(operator_columns, key=str) == sorted([
+        (OperatorType.DATA_SOURCE, ['A', 'C']),
+        (OperatorType.SELECTION, ['A', 'C']),
+        (OperatorType.PROJECTION, ['A']),
+        (OperatorType.PROJECTION_MODIFY, ['A', 'C', 'B']),
+        (OperatorType.PROJECTION, ['B']),
+        (OperatorType.SELECTION, ['A', 'C', 'B'])
+    ], key=str)
+    assert inspector_result.inspection_to_annotations == {}
+    assert len(executor.backends[0].annotation_registry) == 0
+    assert list(executor.script_scope['df']['B']) == [20.]
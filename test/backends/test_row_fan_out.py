@@ -0,0 +1,30 @@
+"""
+Tests whether the RowFanOut works
+"""
+import itertools
+
+from mlinspect.backends._row_fan_out import RowFanOut
+
+
+def test_row_fan_out_lockstep():
+    """
+    Tests whether all row iterators get all rows and the chunks get released in lockstep
+    """
+    # pylint: disable=protected-access
+    row_fan_out = RowFanOut(iter(range(10)), 3, rows_per_chunk=4)
+    row_iterators = [row_fan_out.get_row_iterator() for _ in range(3)]
+    for row_index, rows in enumerate(itertools.zip_longest(*row_iterators)):
+        assert rows == (row_index, row_index, row_index)
+        assert len(row_fan_out._chunks) <= 1
+    assert not row_fan_out._chunks
+
+
+def test_row_fan_out_consumer_runs_ahead():
+    """
+    Tests whether the row iterators still get all rows if one inspection consumes its rows before the others
+    """
+    row_fan_out = RowFanOut(iter(range(10)), 2, rows_per_chunk=3)
+    first_row_iterator = row_fan_out.get_row_iterator()
+    second_row_iterator = row_fan_out.get_row_iterator()
+    assert list(first_row_iterator) == list(range(10))
+    assert list(second_row_iterator) == list(range(10))
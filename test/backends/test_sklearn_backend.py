@@ -1,10 +1,15 @@
 """
 Tests whether the PipelineExecutor works
 """
+from inspect import cleandoc
 
 from test.testing_helper_utils import run_random_annotation_testing_analyzer, \
     run_row_index_annotation_testing_analyzer, run_multiple_test_analyzers
 from example_pipelines import ADULT_SIMPLE_PY
+from mlinspect import PipelineInspector
+from mlinspect.inspections import Inspection, RowLineage, HistogramForColumns, MaterializeFirstOutputRows
+from mlinspect.inspections._lineage import LineageId
+from mlinspect.instrumentation._dag_node import OperatorType
 
 
 def test_sklearn_backend_random_annotation_propagation():
@@ -40,3 +45,189 @@ def test_sklearn_backend_annotation_propagation_multiple_analyzers():
         for analyzer in analyzers:
             result = analyzer_results[analyzer]
             assert len(result) == 16
+
+
+def test_sklearn_backend_train_test_split_row_order():
+    """
+    Tests whether the annotations of the train_test_split output rows follow the shuffled row order
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
+
+        df = pd.DataFrame({'A': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]})
+        train, test = train_test_split(df, random_state=0)
+        """)
+    inspector_result = PipelineInspector \
+        .on_pipeline_from_string(test_code) \
+        .add_required_inspection(RowLineage(10)) \
+        .execute()
+    lineage_result = inspector_result.inspection_to_annotations[RowLineage(10)]
+    split_result = next(annotation for node, annotation in lineage_result.items()
+                        if node.operator_type == OperatorType.TRAIN_TEST_SPLIT)
+    assert list(split_result["A"]) == [9, 1, 6, 7, 3, 0, 5]
+    for value, lineage in zip(split_result["A"], split_result["mlinspect_lineage"]):
+        assert lineage == {LineageId(0, value)}
+
+
+def test_sklearn_backend_train_test_split_test_half():
+    """
+    Tests whether the rows of the test half keep the annotations of their input rows, so operators on the test
+    data get inspected too
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
+
+        df = pd.DataFrame({'A': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]})
+        train, test = train_test_split(df, random_state=0)
+        test_a = test[['A']]
+        """)
+    inspector_result = PipelineInspector \
+        .on_pipeline_from_string(test_code) \
+        .add_required_inspection(RowLineage(10)) \
+        .execute()
+    lineage_result = inspector_result.inspection_to_annotations[RowLineage(10)]
+    projection_result = next(annotation for node, annotation in lineage_result.items()
+                             if node.operator_type == OperatorType.PROJECTION)
+    assert list(projection_result["A"]) == [2, 8, 4]
+    for value, lineage in zip(projection_result["A"], projection_result["mlinspect_lineage"]):
+        assert lineage == {LineageId(0, value)}
+
+
+def test_sklearn_backend_train_test_split_duplicate_labels():
+    """
+    Tests whether the rows of both halves keep the annotations of their own input rows if the index labels of the
+    input rows are not unique
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
+
+        df = pd.DataFrame({'A': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]}, index=[0, 0, 0, 0, 0, 1, 1, 1, 1, 1])
+        train, test = train_test_split(df, random_state=0)
+        test_a = test[['A']]
+        """)
+    inspector_result = PipelineInspector \
+        .on_pipeline_from_string(test_code) \
+        .add_required_inspection(RowLineage(10)) \
+        .execute()
+    lineage_result = inspector_result.inspection_to_annotations[RowLineage(10)]
+    split_and_projection_results = [annotation for node, annotation in lineage_result.items()
+                                    if node.operator_type in {OperatorType.TRAIN_TEST_SPLIT, OperatorType.PROJECTION}]
+    assert sorted(list(result["A"]) for result in split_and_projection_results) == [[2, 8, 4], [9, 1, 6, 7, 3, 0, 5]]
+    for result in split_and_projection_results:
+        for value, lineage in zip(result["A"], result["mlinspect_lineage"]):
+            assert lineage == {LineageId(0, value)}
+
+
+def test_sklearn_backend_column_transformer_visits_per_column():
+    """
+    Tests whether the projections and transformers of a ColumnTransformer, which get visited with one scan of their
+    input, still get the inspection results of their own DAG node
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+        from sklearn.compose import ColumnTransformer
+        from sklearn.pipeline import Pipeline
+        from sklearn import preprocessing
+        from sklearn.tree import DecisionTreeClassifier
+
+        df = pd.DataFrame({'A': ['x', 'y', 'x', 'x'], 'B': [1., 2., 3., 4.], 'C': [0, 1, 0, 1], 'D': [0, 0, 1, 1]})
+        featurisation = ColumnTransformer(transformers=[
+            ('categorical', preprocessing.OneHotEncoder(), ['A']),
+            ('numeric', preprocessing.StandardScaler(), ['B'])])
+        pipeline = Pipeline([('features', featurisation), ('learner', DecisionTreeClassifier())])
+        pipeline.fit(df[['A', 'B', 'D']], df['C'])
+        """)
+    inspection = HistogramForColumns(['A'])
+    inspector_result = PipelineInspector \
+        .on_pipeline_from_string(test_code) \
+        .add_required_inspection(inspection) \
+        .execute()
+    histograms = {node.description: annotation
+                  for node, annotation in inspector_result.inspection_to_annotations[inspection].items()}
+    assert histograms["to ['A'] (ColumnTransformer)"] == {'A': {'x': 3, 'y': 1}}
+    assert histograms["to ['B'] (ColumnTransformer)"] == {'A': {'x': 3, 'y': 1}}
+    assert histograms["Categorical Encoder (OneHotEncoder), Column: 'A'"] == {'A': {'x': 3, 'y': 1}}
+    assert histograms["Numerical Encoder (StandardScaler), Column: 'B'"] == {'A': {'x': 3, 'y': 1}}
+
+
+def test_sklearn_backend_inference_visits():
+    """
+    Tests whether predict and score calls on fitted pipelines get inspected DAG nodes for the test data, the test
+    labels and the call itself, also if only their aggregated statistics get computed
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+        from sklearn.compose import ColumnTransformer
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.tree import DecisionTreeClassifier
+
+        train_df = pd.DataFrame({'A': ['x', 'y', 'x', 'y'], 'B': [1., 2., 3., 4.], 'C': [0, 1, 0, 1]})
+        test_df = pd.DataFrame({'A': ['x', 'x', 'y'], 'B': [1., 3., 4.], 'C': [0, 0, 1]})
+        featurisation = ColumnTransformer(transformers=[('numeric', StandardScaler(), ['B'])])
+        pipeline = Pipeline([('features', featurisation), ('learner', DecisionTreeClassifier())])
+        pipeline.fit(train_df[['A', 'B']], train_df['C'])
+        predictions = pipeline.predict(test_df[['A', 'B']])
+        print(pipeline.score(test_df[['A', 'B']], test_df['C']))
+        """)
+    inspection = HistogramForColumns(['A'])
+    for aggregates_only in [False, True]:
+        builder = PipelineInspector \
+            .on_pipeline_from_string(test_code) \
+            .add_required_inspection(inspection)
+        if aggregates_only:
+            builder = builder.with_inference_aggregates_only()
+        inspector_result = builder.execute()
+        dag = inspector_result.dag
+        histograms = inspector_result.inspection_to_annotations[inspection]
+
+        estimator = next(node for node in dag.nodes if node.operator_type == OperatorType.ESTIMATOR)
+        predict = next(node for node in dag.nodes if node.operator_type == OperatorType.PREDICT)
+        score = next(node for node in dag.nodes if node.operator_type == OperatorType.SCORE)
+        test_labels = next(node for node in dag.nodes if node.operator_type == OperatorType.TEST_LABELS)
+        assert [node.operator_type for node in dag.predecessors(predict)].count(OperatorType.TEST_DATA) == 1
+        assert estimator in dag.predecessors(predict) and estimator in dag.predecessors(score)
+        assert test_labels in dag.predecessors(score)
+        assert predict.columns == ["array"]
+        assert histograms[predict] == {'A': {'x': 2, 'y': 1}}
+        assert histograms[score] is None
+
+
+class RowVisitsMaterializeFirstOutputRows(MaterializeFirstOutputRows):
+    """
+    MaterializeFirstOutputRows that visits all operators row by row
+    """
+    visit_operator_batch = Inspection.visit_operator_batch
+    passes_annotations_through = Inspection.passes_annotations_through
+
+
+def test_sklearn_backend_column_transformer_row_visits_per_column():
+    """
+    Tests whether the row visits of the projections of a ColumnTransformer, which read the rows of one scan of their
+    input in lockstep, get the rows of their own column
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+        from sklearn.compose import ColumnTransformer
+        from sklearn import preprocessing
+
+        df = pd.DataFrame({'A': [1., 2., 3.], 'B': [4., 5., 6.], 'C': [7., 8., 9.]})
+        featurisation = ColumnTransformer(transformers=[
+            ('first', preprocessing.StandardScaler(), ['A', 'C']),
+            ('second', preprocessing.StandardScaler(), ['B'])])
+        featurisation.fit_transform(df)
+        """)
+    inspection = RowVisitsMaterializeFirstOutputRows(2)
+    inspector_result = PipelineInspector \
+        .on_pipeline_from_string(test_code) \
+        .add_required_inspection(inspection) \
+        .execute()
+    first_rows = {node.description: annotation
+                  for node, annotation in inspector_result.inspection_to_annotations[inspection].items()}
+    for column, values in [('A', [1., 2.]), ('B', [4., 5.]), ('C', [7., 8.])]:
+        projection_rows = first_rows["to ['{}'] (ColumnTransformer)".format(column)]
+        assert list(projection_rows.columns) == [column]
+        assert list(projection_rows[column]) == values
@@ -3,7 +3,8 @@ Tests whether the benchmark utils work
 """
 
 from experiments.performance._benchmark_utils import do_op_instrumentation_benchmarks, OperatorBenchmarkType, \
-    do_op_inspections_benchmarks, do_full_pipeline_benchmarks, PipelineBenchmarkType
+    do_op_inspections_benchmarks, do_full_pipeline_benchmarks, PipelineBenchmarkType, do_call_site_hook_benchmarks, \
+    do_instrumentation_engine_benchmarks, do_op_inspection_count_benchmarks
 
 
 def test_instrumentation_benchmarks():
@@ -34,6 +35,17 @@ def test_inspection_benchmarks():
         assert benchmark_results["HistogramForColumns(['group_col_1', 'group_col_2', 'group_col_3'])"]
 
 
+def test_inspection_count_benchmarks():
+    """
+    Tests whether the operator benchmarks work with varying numbers of inspections
+    """
+    for op_type in OperatorBenchmarkType:
+        benchmark_results = do_op_inspection_count_benchmarks(100, op_type, (1, 20))
+
+        assert benchmark_results["1 inspections"]
+        assert benchmark_results["20 inspections"]
+
+
 def test_full_pipeline_benchmarks():
     """
     Tests whether the pipeline works with instrumentation
@@ -46,3 +58,24 @@ def test_full_pipeline_benchmarks():
         assert benchmark_results["one inspection"]
         assert benchmark_results["two inspections"]
         assert benchmark_results["three inspections"]
+
+
+def test_call_site_hook_benchmarks():
+    """
+    Tests whether the hook benchmarks work with and without the call site cache
+    """
+    benchmark_results = do_call_site_hook_benchmarks(100)
+
+    assert benchmark_results["without call site cache"]
+    assert benchmark_results["with call site cache"]
+
+
+def test_instrumentation_engine_benchmarks():
+    """
+    Tests whether the pipeline benchmarks work with both instrumentation engines
+    """
+    benchmark_results = do_instrumentation_engine_benchmarks(PipelineBenchmarkType.ADULT_SIMPLE)
+
+    assert benchmark_results["no mlinspect"]
+    assert benchmark_results["ast rewriting"]
+    assert benchmark_results["monkey patching"]
@@ -0,0 +1,85 @@
+"""
+Tests whether the RowLineage works
+"""
+from inspect import cleandoc
+
+from test.inspections.test_materialize_first_output_rows import assert_df_dicts_equal
+from example_pipelines import ADULT_SIMPLE_PY, ADULT_COMPLEX_PY, COMPAS_PY
+from mlinspect.inspections import Inspection, RowLineage
+from mlinspect._pipeline_inspector import PipelineInspector
+
+
+class RowVisitsRowLineage(RowLineage):
+    """
+    RowLineage without visit_operator_pass_through
+    """
+    passes_annotations_through = Inspection.passes_annotations_through
+
+
+def test_row_lineage_pass_through_visits():
+    """
+    Tests whether passing the lineage through operators that do not change the rows gets the same result as the
+    row visits
+    """
+    for pipeline in [ADULT_SIMPLE_PY, ADULT_COMPLEX_PY, COMPAS_PY]:
+        inspector_result = PipelineInspector \
+            .on_pipeline_from_py_file(pipeline) \
+            .add_required_inspection(RowLineage(5)) \
+            .add_required_inspection(RowVisitsRowLineage(5)) \
+            .execute()
+        pass_through_result = inspector_result.inspection_to_annotations[RowLineage(5)]
+        row_result = inspector_result.inspection_to_annotations[RowVisitsRowLineage(5)]
+        assert_df_dicts_equal(pass_through_result, row_result)
+
+
+def test_row_lineage_row_visits_column_transformer():
+    """
+    Tests whether the row visits of the ColumnTransformer projections count as one operator each, so the lineage
+    of data sources after the ColumnTransformer is the same as with pass through visits
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+        from sklearn.compose import ColumnTransformer
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.tree import DecisionTreeClassifier
+
+        train = pd.DataFrame({'A': [1., 2., 3.], 'B': [4., 5., 6.], 'C': [7., 8., 9.], 'D': [0, 1, 0]})
+        featurisation = ColumnTransformer(transformers=[
+            ('first', StandardScaler(), ['A', 'B']), ('second', StandardScaler(), ['C'])])
+        pipeline = Pipeline([('features', featurisation), ('learner', DecisionTreeClassifier())])
+        pipeline.fit(train[['A', 'B', 'C']], train['D'])
+        test = pd.DataFrame({'A': [1., 2.], 'B': [3., 4.], 'C': [5., 6.]})
+        """)
+    inspector_result = PipelineInspector \
+        .on_pipeline_from_string(test_code) \
+        .add_required_inspection(RowLineage(5)) \
+        .add_required_inspection(RowVisitsRowLineage(5)) \
+        .execute()
+    pass_through_result = inspector_result.inspection_to_annotations[RowLineage(5)]
+    row_result = inspector_result.inspection_to_annotations[RowVisitsRowLineage(5)]
+    assert_df_dicts_equal(pass_through_result, row_result)
+
+
+class SinkRowVisitsRowLineage(RowLineage):
+    """
+    RowLineage that iterates over the training rows of estimators instead of using visit_operator_sink
+    """
+
+    def visits_sink_rows(self, operator_context) -> bool:
+        return True
+
+
+def test_row_lineage_sink_visits():
+    """
+    Tests whether the vectorized estimator visits get the same lineage as iterating over the training rows
+    """
+    for pipeline in [ADULT_SIMPLE_PY, COMPAS_PY]:
+        inspector_result = PipelineInspector \
+            .on_pipeline_from_py_file(pipeline) \
+            .add_required_inspection(RowLineage(5)) \
+            .add_required_inspection(SinkRowVisitsRowLineage(5)) \
+            .execute()
+        sink_result = inspector_result.inspection_to_annotations[RowLineage(5)]
+        row_result = inspector_result.inspection_to_annotations[SinkRowVisitsRowLineage(5)]
+        assert_df_dicts_equal(sink_result, row_result)
@@ -7,7 +7,8 @@ from pandas import DataFrame
 from pandas._testing import assert_frame_equal
 from testfixtures import compare, RangeComparison
 
-from example_pipelines import ADULT_SIMPLE_PY
+from example_pipelines import ADULT_SIMPLE_PY, ADULT_COMPLEX_PY, COMPAS_PY
+from mlinspect.inspections import Inspection, RowLineage
 from mlinspect.inspections._materialize_first_output_rows import MaterializeFirstOutputRows
 from mlinspect.instrumentation._dag_node import DagNode, OperatorType, CodeReference
 from mlinspect._pipeline_inspector import PipelineInspector
@@ -170,3 +171,30 @@ def get_expected_result():
                 description='Decision Tree', source_code='tree.DecisionTreeClassifier()'): None
     }
     return expected_result
+
+
+class RowVisitsMaterializeFirstOutputRows(MaterializeFirstOutputRows):
+    """
+    MaterializeFirstOutputRows without visit_operator_batch and visit_operator_pass_through
+    """
+    visit_operator_batch = Inspection.visit_operator_batch
+    passes_annotations_through = Inspection.passes_annotations_through
+
+
+def test_materialize_first_rows_batch_visits():
+    """
+    Tests whether the batch and pass-through visits of MaterializeFirstOutputRows get the same result as the
+    row visits
+    """
+    for pipeline in [ADULT_SIMPLE_PY, ADULT_COMPLEX_PY, COMPAS_PY]:
+        inspector_result = PipelineInspector \
+            .on_pipeline_from_py_file(pipeline) \
+            .add_required_inspection(MaterializeFirstOutputRows(3)) \
+            .add_required_inspection(RowVisitsMaterializeFirstOutputRows(3)) \
+            .add_required_inspection(RowLineage(3)) \
+            .execute()
+        assert MaterializeFirstOutputRows(3).supports_batch_visits
+        assert not RowVisitsMaterializeFirstOutputRows(3).supports_batch_visits
+        batch_result = inspector_result.inspection_to_annotations[MaterializeFirstOutputRows(3)]
+        row_result = inspector_result.inspection_to_annotations[RowVisitsMaterializeFirstOutputRows(3)]
+        assert_df_dicts_equal(batch_result, row_result)
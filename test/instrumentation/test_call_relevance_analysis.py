@@ -0,0 +1,133 @@
+"""
+Tests whether the CallRelevanceAnalysis works
+"""
+import ast
+from inspect import cleandoc
+
+from mlinspect.instrumentation._call_relevance_analysis import CallRelevanceAnalysis
+from mlinspect.instrumentation._dag_node import CodeReference
+from ..testing_helper_utils import get_pandas_read_csv_and_dropna_code
+
+
+def get_pruned_and_guarded_code(code, relevant_calls=frozenset()):
+    """
+    Run the analysis and get the source code of the pruned and the guarded nodes
+    """
+    pruned_nodes, guarded_nodes = CallRelevanceAnalysis(ast.parse(code), relevant_calls).analyse()
+    pruned_code = {ast.get_source_segment(code, node) for node in pruned_nodes}
+    guarded_code = {ast.get_source_segment(code, node) for node in guarded_nodes}
+    return pruned_code, guarded_code
+
+
+def test_call_relevance_analysis_imports():
+    """
+    Tests whether only calls reachable from stdlib imports and builtins get pruned
+    """
+    code = get_pandas_read_csv_and_dropna_code()
+    pruned_code, guarded_code = get_pruned_and_guarded_code(code)
+
+    expected_join = 'os.path.join(str(get_project_root()), "example_pipelines", "adult_complex", "adult_train.csv")'
+    assert pruned_code == {expected_join, 'str(get_project_root())'}
+    assert guarded_code == {expected_join}
+
+
+def test_call_relevance_analysis_dataflow():
+    """
+    Tests whether names assigned from relevant values are relevant
+    """
+    code = cleandoc("""
+        import math
+        import pandas as pd
+
+        values = [1, 2, 3]
+        values.append(4)
+        squares = [math.pow(value, 2) for value in values]
+        data = pd.DataFrame({'squares': squares})
+        columns = list(data.columns)
+        columns.append('x')
+        for column in data:
+            column.upper()
+        print(len(values), data['squares'])
+        """)
+    pruned_code, guarded_code = get_pruned_and_guarded_code(code)
+
+    assert pruned_code == {"values.append(4)", "math.pow(value, 2)", "list(data.columns)", "len(values)",
+                           "print(len(values), data['squares'])"}
+    assert guarded_code == {"math.pow(value, 2)", "list(data.columns)"}
+
+
+def test_call_relevance_analysis_functions():
+    """
+    Tests whether function parameters and functions returning values computed from them are relevant
+    """
+    code = cleandoc("""
+        import os
+        import pandas as pd
+
+        def load(path):
+            return pd.read_csv(path)
+
+        def get_path(name):
+            return os.path.join('data', name)
+
+        data = load(get_path('test.csv'))
+        """)
+    pruned_code, _ = get_pruned_and_guarded_code(code)
+
+    assert pruned_code == {"os.path.join('data', name)"}
+
+
+def test_call_relevance_analysis_star_import():
+    """
+    Tests whether star imports from non-stdlib modules disable pruning
+    """
+    code = cleandoc("""
+        from pandas import *
+
+        print('start')
+        """)
+    pruned_code, guarded_code = get_pruned_and_guarded_code(code)
+
+    assert pruned_code == set()
+    assert guarded_code == set()
+
+
+def test_call_relevance_analysis_receivers():
+    """
+    Tests whether method calls with relevant arguments make their receivers relevant, except for stdlib modules
+    """
+    code = cleandoc("""
+        import os
+        import pandas as pd
+
+        frames = []
+        names = []
+        frames.append(pd.read_csv(os.path.join('data', 'test.csv')))
+        names.append('test')
+        for frame in frames:
+            frame.dropna()
+        os.path.basename(names[0])
+        """)
+    pruned_code, _ = get_pruned_and_guarded_code(code)
+
+    assert pruned_code == {"os.path.join('data', 'test.csv')", "names.append('test')",
+                           "os.path.basename(names[0])", "names[0]"}
+
+
+def test_call_relevance_analysis_relevant_calls():
+    """
+    Tests whether calls a runtime guard found to return relevant objects and the names bound to their results
+    are relevant
+    """
+    code = cleandoc("""
+        import pickle
+
+        with open('model.pkl', 'rb') as file:
+            model = pickle.load(file)
+        model.predict([[0, 1]])
+        """)
+    pruned_code, _ = get_pruned_and_guarded_code(code)
+    assert pruned_code == {"open('model.pkl', 'rb')", "pickle.load(file)", "model.predict([[0, 1]])"}
+
+    pruned_code, _ = get_pruned_and_guarded_code(code, frozenset({CodeReference(4, 12, 4, 29)}))
+    assert pruned_code == {"open('model.pkl', 'rb')"}
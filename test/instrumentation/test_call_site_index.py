@@ -0,0 +1,57 @@
+"""
+Tests whether the CallSiteIndex works
+"""
+from inspect import cleandoc
+
+from mlinspect.instrumentation._call_site_index import CallSiteIndex
+from mlinspect.instrumentation._dag_node import CodeReference
+
+
+def get_call_sites_by_offset(code, function_name):
+    """
+    Get the call sites for all call opcodes of the module code object that call function_name
+    """
+    call_site_index = CallSiteIndex(code)
+    compiled_code = compile(code, "<test>", "exec")
+    offset_to_call_site = call_site_index.get_offset_to_call_site(compiled_code)
+    return [call_site for _, call_site in sorted(offset_to_call_site.items())
+            if call_site is not None and call_site.function_name == function_name]
+
+
+def test_call_site_index_multiple_calls_per_line():
+    """
+    Tests whether subscripts on the same line get mapped to the bytecode in evaluation order
+    """
+    code = cleandoc("""
+        data['label'] = data['a'] > 1.2 * data['b']
+        data = data[data['a'].isin([1, 2])]
+        """)
+    get_items = get_call_sites_by_offset(code, "__getitem__")
+    set_items = get_call_sites_by_offset(code, "__setitem__")
+
+    assert [call_site.call_code for call_site in get_items] == \
+        ["data['a']", "data['b']", "data['a']", "data[data['a'].isin([1, 2])]"]
+    assert [call_site.call_code for call_site in set_items] == ["data['label']"]
+    assert set_items[0].code_reference == CodeReference(1, 0, 1, 13)
+    assert get_items[1].code_reference == CodeReference(1, 34, 1, 43)
+
+
+def test_call_site_index_fallback_by_name():
+    """
+    Tests whether calls can be found by name and line if the bytecode offset is unknown
+    """
+    code = cleandoc("""
+        import pandas as pd
+        data = pd.read_csv(
+            'test.csv', na_values='?')
+        data = data.dropna()
+        """)
+    call_site_index = CallSiteIndex(code)
+
+    read_csv = call_site_index.get_call_site("read_csv", 3)
+    assert read_csv.code_reference == CodeReference(2, 7, 3, 30)
+    assert read_csv.value_code == "pd"
+    assert read_csv.args_code == ("'test.csv'",)
+    assert read_csv.kwargs_code == ("na_values='?'",)
+    assert call_site_index.get_call_site("dropna", 4).call_code == "data.dropna()"
+    assert call_site_index.get_call_site("dropna", 2) is None
@@ -0,0 +1,35 @@
+"""
+Tests whether the CallSiteResolution works
+"""
+import numpy as np
+import pandas as pd
+
+from mlinspect.instrumentation._call_site_resolution import CallSiteResolution
+
+
+def test_call_site_resolution_receiver_type():
+    """
+    Tests whether the resolution stays valid until the type of the receiver changes
+    """
+    call_site = CallSiteResolution("data.sum")
+    call_site.capture_receiver(pd.DataFrame({'A': [0, 1]}))
+    receiver_key = call_site.get_receiver_key({}, False, False)
+    assert receiver_key is pd.DataFrame
+    assert not call_site.is_resolved_for(receiver_key)
+
+    call_site.update(receiver_key, ('pandas.core.frame', 'sum'), 'pandas')
+    assert call_site.is_resolved_for(receiver_key)
+    call_site.capture_receiver(np.array([0, 1]))
+    assert not call_site.is_resolved_for(call_site.get_receiver_key({}, False, False))
+
+
+def test_call_site_resolution_without_receiver():
+    """
+    Tests whether call sites without a receiver key get resolved on each call
+    """
+    call_site = CallSiteResolution("get_data()[0].sum")
+    receiver_key = call_site.get_receiver_key({}, False, False)
+    assert receiver_key is None
+
+    call_site.update(receiver_key, ('pandas.core.frame', 'sum'), 'pandas')
+    assert not call_site.is_resolved_for(receiver_key)
@@ -0,0 +1,181 @@
+"""
+Tests whether the MonkeyPatchingExecutor works
+"""
+from inspect import cleandoc
+
+import pandas
+import pytest
+from sklearn.base import BaseEstimator
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from example_pipelines import ADULT_SIMPLE_PY, ADULT_COMPLEX_PY, COMPAS_PY, HEALTHCARE_PY
+from mlinspect.inspections import MaterializeFirstOutputRows
+from mlinspect.instrumentation import _call_site_index, _pipeline_executor
+from mlinspect.instrumentation._monkey_patching_executor import MonkeyPatchingExecutor
+
+
+def get_dag_without_node_ids(dag):
+    """
+    The node ids depend on the instrumentation engine, everything else needs to be the same
+    """
+    def get_node_info(node):
+        return (node.operator_type, node.code_reference, node.module, node.description, tuple(node.columns or []),
+                node.source_code)
+
+    nodes = sorted(str(get_node_info(node)) for node in dag.nodes)
+    edges = sorted(str((get_node_info(parent), get_node_info(child))) for parent, child in dag.edges)
+    return nodes, edges
+
+
+def get_annotations_without_node_ids(inspector_result):
+    """
+    The materialized rows for each DAG node, without node ids
+    """
+    annotations = {}
+    for inspection, dag_node_to_annotation in inspector_result.inspection_to_annotations.items():
+        for dag_node, annotation in dag_node_to_annotation.items():
+            annotations[(inspection, dag_node.code_reference, dag_node.description)] = str(annotation)
+    return annotations
+
+
+@pytest.mark.parametrize("pipeline_path", [ADULT_SIMPLE_PY, ADULT_COMPLEX_PY, COMPAS_PY])
+@pytest.mark.parametrize("inspections", [[MaterializeFirstOutputRows(2)], []])
+def test_monkey_patching_executor_same_result_as_ast_rewriting(pipeline_path, inspections):
+    """
+    Tests whether the MonkeyPatchingExecutor extracts the same DAG and annotations as the AST rewriting, also
+    without inspections
+    """
+    ast_result = _pipeline_executor.PipelineExecutor().run(None, pipeline_path, None, inspections, [])
+    monkey_patching_result = MonkeyPatchingExecutor().run(None, pipeline_path, None, inspections, [])
+
+    assert get_dag_without_node_ids(monkey_patching_result.dag) == get_dag_without_node_ids(ast_result.dag)
+    assert get_annotations_without_node_ids(monkey_patching_result) == \
+        get_annotations_without_node_ids(ast_result)
+
+
+def test_monkey_patching_executor_same_dag_as_ast_rewriting_healthcare():
+    """
+    Tests whether the MonkeyPatchingExecutor extracts the same DAG as the AST rewriting for a pipeline with
+    estimators defined in a module the pipeline imports. The pipeline splits its data randomly, so the annotations
+    differ.
+    """
+    monkey_patching_result = MonkeyPatchingExecutor().run(None, HEALTHCARE_PY, None, [], [])
+    ast_result = _pipeline_executor.PipelineExecutor().run(None, HEALTHCARE_PY, None, [], [])
+
+    assert get_dag_without_node_ids(monkey_patching_result.dag) == get_dag_without_node_ids(ast_result.dag)
+
+
+@pytest.mark.parametrize("inspections", [[MaterializeFirstOutputRows(2)], []])
+def test_monkey_patching_executor_data_frame_data_source(inspections):
+    """
+    Tests whether DataFrames created in the pipeline code are data sources like with the AST rewriting
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+
+        df = pd.DataFrame({'A': [0, 2, 4, None], 'B': ['x', 'y', 'z', 'x']})
+        df = df.dropna()
+        df = df[['A']]
+        other_df = pd.DataFrame([[0, 'x'], [None, 'y']], columns=['A', 'B'])
+        other_df = other_df.dropna()
+        """)
+    ast_result = _pipeline_executor.PipelineExecutor().run(None, None, test_code, inspections, [])
+    monkey_patching_result = MonkeyPatchingExecutor().run(None, None, test_code, inspections, [])
+
+    assert len(monkey_patching_result.dag) == 5
+    assert get_dag_without_node_ids(monkey_patching_result.dag) == get_dag_without_node_ids(ast_result.dag)
+    assert get_annotations_without_node_ids(monkey_patching_result) == \
+        get_annotations_without_node_ids(ast_result)
+
+
+def test_monkey_patching_executor_restores_patches():
+    """
+    Tests whether the pipeline code and other code see the original functions after the pipeline ran or failed
+    """
+    read_csv_before = pandas.read_csv
+    data_frame_before = pandas.DataFrame
+    get_item_before = pandas.DataFrame.__getitem__
+    fit_before = Pipeline.fit
+    score_before = Pipeline.__dict__["score"]
+    init_before = StandardScaler.__init__
+
+    MonkeyPatchingExecutor().run(None, ADULT_SIMPLE_PY, None, [], [])
+    assert pandas.read_csv is read_csv_before
+    assert pandas.DataFrame is data_frame_before
+    assert pandas.DataFrame.__getitem__ is get_item_before
+    assert Pipeline.fit is fit_before
+    assert Pipeline.__dict__["score"] is score_before
+    assert StandardScaler.__init__ is init_before
+    assert "__new__" not in BaseEstimator.__dict__ and "__init_subclass__" not in BaseEstimator.__dict__
+    assert MonkeyPatchingExecutor.patched_run_count == 0
+    assert _pipeline_executor.current_executor.get() is None
+
+    failing_code = cleandoc("""
+        import pandas as pd
+
+        raise ValueError("pipeline failed")
+        """)
+    with pytest.raises(ValueError):
+        MonkeyPatchingExecutor().run(None, None, failing_code, [], [])
+    assert pandas.read_csv is read_csv_before
+    assert Pipeline.fit is fit_before
+    assert MonkeyPatchingExecutor.patched_run_count == 0
+    assert _pipeline_executor.current_executor.get() is None
+
+    assert StandardScaler.__init__ is init_before
+
+
+def test_monkey_patching_executor_only_patches_known_estimators():
+    """
+    Tests whether only the constructors of the estimators from the operator maps get wrapped
+    """
+    standard_scaler_init_before = StandardScaler.__init__
+    min_max_scaler_init_before = MinMaxScaler.__init__
+    with MonkeyPatchingExecutor.patched_entry_points():
+        assert StandardScaler.__init__ is not standard_scaler_init_before
+        assert MinMaxScaler.__init__ is min_max_scaler_init_before
+    assert StandardScaler.__init__ is standard_scaler_init_before
+
+
+def test_monkey_patching_executor_unsupported_bytecode(mocker):
+    """
+    Tests whether the executor fails fast on interpreters the call site index does not support
+    """
+    mocker.patch.object(_call_site_index, "SUPPORTED_PYTHON_VERSION", (3, 8))
+    with pytest.raises(RuntimeError, match="only supports the bytecode of CPython 3.8"):
+        MonkeyPatchingExecutor()
+
+
+def test_monkey_patching_executor_functions_in_pipeline_code(tmp_path):
+    """
+    Tests whether calls from functions defined in the pipeline code get inspected and the pipeline code sees the
+    original estimators after fit
+    """
+    csv_path = tmp_path / "data.csv"
+    pandas.DataFrame({'A': [0, 2, 4, 5, None], 'B': [0, 1, 0, 1, 0]}).to_csv(csv_path, index=False)
+    test_code = cleandoc("""
+        import pandas as pd
+        from sklearn.tree import DecisionTreeClassifier
+        from sklearn.compose import ColumnTransformer
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.pipeline import Pipeline
+
+        def load(path):
+            return pd.read_csv(path).dropna()
+
+        df = load(r'{}')
+        assert isinstance(df, pd.DataFrame)
+        features = ColumnTransformer([('numeric', StandardScaler(), ['A'])])
+        pipeline = Pipeline([('features', features), ('learner', DecisionTreeClassifier())])
+        pipeline.fit(df, df['B'])
+        assert isinstance(pipeline.steps[0][1], ColumnTransformer)
+        assert isinstance(pipeline.steps[0][1].transformers_[0][1], StandardScaler)
+        pipeline.predict(df)
+        """.format(csv_path))
+    inspector_result = MonkeyPatchingExecutor().run(None, None, test_code, [MaterializeFirstOutputRows(2)], [])
+
+    operator_types = sorted(node.operator_type.value for node in inspector_result.dag.nodes)
+    assert operator_types == ['Concatenation', 'Data Source', 'Estimator', 'Fit Transformers and Estimators',
+                              'Predict', 'Projection', 'Projection', 'Selection', 'Test Data', 'Train Data',
+                              'Train Labels', 'Transformer']
@@ -0,0 +1,117 @@
+"""
+Tests whether the NotebookLoader works
+"""
+from inspect import cleandoc
+
+import nbformat
+from nbconvert import PythonExporter
+
+from example_pipelines import ADULT_SIMPLE_IPYNB
+from mlinspect.instrumentation._dag_node import CodeReference
+from mlinspect.instrumentation._notebook_loader import NotebookLoader
+
+
+def write_notebook(path, cells):
+    """
+    Write a notebook with the cells to the path
+    """
+    notebook = nbformat.v4.new_notebook()
+    notebook.cells = cells
+    with open(path, "w") as file:
+        nbformat.write(notebook, file)
+    return str(path)
+
+
+def test_notebook_loader_same_code_as_python_exporter():
+    """
+    Tests whether notebooks without magics get the same code and code references as with nbconvert
+    """
+    with open(ADULT_SIMPLE_IPYNB) as file:
+        notebook = nbformat.reads(file.read(), nbformat.NO_CONVERT)
+        expected_source_code, _ = PythonExporter().from_notebook_node(notebook)
+
+    notebook_source = NotebookLoader.load(ADULT_SIMPLE_IPYNB)
+
+    assert notebook_source.source_code == expected_source_code
+    assert notebook_source.source_code.split("\n")[6] == '"""'
+    assert notebook_source.lineno_to_cell_line[7] == (0, 1)
+
+
+def test_notebook_loader_markdown_and_raw_cells(tmp_path):
+    """
+    Tests whether markdown and raw cells get the same lines as with nbconvert, so the code references of the code
+    cells after them do not change
+    """
+    notebook_path = write_notebook(tmp_path / "markdown.ipynb", [
+        nbformat.v4.new_markdown_cell("# A pipeline\nwith *markdown*"),
+        nbformat.v4.new_code_cell("import pandas as pd"),
+        nbformat.v4.new_markdown_cell(""),
+        nbformat.v4.new_raw_cell("data = pd.DataFrame({'A': [1, None]})"),
+        nbformat.v4.new_raw_cell("<b>no python</b>", metadata={"raw_mimetype": "text/html"}),
+        nbformat.v4.new_code_cell("data = data.dropna()"),
+    ])
+    with open(notebook_path) as file:
+        notebook = nbformat.reads(file.read(), nbformat.NO_CONVERT)
+        expected_source_code, _ = PythonExporter().from_notebook_node(notebook)
+
+    notebook_source = NotebookLoader.load(notebook_path)
+
+    assert notebook_source.source_code == expected_source_code
+    dropna_lineno = notebook_source.cell_line_to_lineno[(5, 1)]
+    assert notebook_source.source_code.split("\n")[dropna_lineno - 1] == "data = data.dropna()"
+
+
+def test_notebook_loader_magics(tmp_path):
+    """
+    Tests whether magics and shell commands get replaced without changing the line numbers
+    """
+    notebook_path = write_notebook(tmp_path / "magics.ipynb", [
+        nbformat.v4.new_markdown_cell("# A pipeline with magics"),
+        nbformat.v4.new_code_cell(cleandoc("""
+            %matplotlib inline
+            !pip install pandas
+            files = !ls
+            import pandas as pd
+            """)),
+        nbformat.v4.new_code_cell(cleandoc("""
+            %%time
+            data = pd.DataFrame({'A': [1, 2]})
+            for _ in range(2):
+                %time data = data.dropna()
+            data?
+            """)),
+        nbformat.v4.new_code_cell(cleandoc("""
+            %%bash
+            echo 'no python'
+            """)),
+    ])
+
+    notebook_source = NotebookLoader.load(notebook_path)
+    script_scope = {}
+    exec(compile(notebook_source.source_code, filename="<notebook>", mode="exec"), script_scope)
+
+    assert list(script_scope["data"]["A"]) == [1, 2]
+    assert script_scope["files"] is None
+    dropna_lineno = notebook_source.cell_line_to_lineno[(2, 4)]
+    assert notebook_source.source_code.split("\n")[dropna_lineno - 1] == "    data = data.dropna()"
+    assert notebook_source.get_cell_code_reference(CodeReference(dropna_lineno, 4, dropna_lineno, 17)) == \
+        (2, CodeReference(4, 4, 4, 17))
+    assert notebook_source.get_code_reference(2, CodeReference(4, 4, 4, 17)) == \
+        CodeReference(dropna_lineno, 4, dropna_lineno, 17)
+
+
+def test_notebook_loader_cache(tmp_path):
+    """
+    Tests whether conversions are cached by the notebook hash
+    """
+    notebook_path = write_notebook(tmp_path / "cached.ipynb", [nbformat.v4.new_code_cell("a = 1")])
+    other_notebook_path = write_notebook(tmp_path / "copy.ipynb", [nbformat.v4.new_code_cell("a = 1")])
+
+    notebook_source = NotebookLoader.load(notebook_path)
+    assert NotebookLoader.load(notebook_path) is notebook_source
+    assert NotebookLoader.load(other_notebook_path) is notebook_source
+
+    write_notebook(notebook_path, [nbformat.v4.new_code_cell("a = 2")])
+    changed_notebook_source = NotebookLoader.load(notebook_path)
+    assert changed_notebook_source is not notebook_source
+    assert "a = 2" in changed_notebook_source.source_code
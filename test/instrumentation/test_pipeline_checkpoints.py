@@ -0,0 +1,208 @@
+"""
+Tests whether the PipelineCheckpoints work
+"""
+import ast
+from inspect import cleandoc
+
+import networkx
+from testfixtures import compare
+
+from example_pipelines import ADULT_SIMPLE_PY
+from mlinspect import PipelineInspector
+from mlinspect.inspections import MaterializeFirstOutputRows
+from mlinspect.instrumentation._pipeline_checkpoints import PipelineCheckpointStore, PipelineCheckpoints, \
+    get_statement_key
+from mlinspect.instrumentation._pipeline_executor import PipelineExecutor
+
+
+def test_checkpoints_resume_from_first_changed_statement(tmp_path, capsys):
+    """
+    Tests whether only the changed statements get executed again and the result is the same as without checkpoints
+    """
+    with open(ADULT_SIMPLE_PY) as file:
+        pipeline_code = file.read()
+    pipeline_path = tmp_path / "adult_simple.py"
+    pipeline_path.write_text(pipeline_code)
+    checkpoint_store = PipelineCheckpointStore()
+    builder = PipelineInspector\
+        .on_pipeline_from_py_file(str(pipeline_path))\
+        .add_required_inspection(MaterializeFirstOutputRows(5))\
+        .with_incremental_execution(checkpoint_store)
+    builder.execute()
+    assert "pipeline start" in capsys.readouterr().out
+
+    changed_pipeline_code = pipeline_code.replace("tree.DecisionTreeClassifier()", "tree.DecisionTreeClassifier(max_depth=3)")
+    pipeline_path.write_text(changed_pipeline_code)
+    incremental_result = builder.execute()
+    output = capsys.readouterr().out
+    assert "pipeline start" not in output
+    assert "pipeline finished" in output
+    checkpoints = checkpoint_store.get_checkpoints(str(pipeline_path))
+    assert checkpoints.reused_statement_count == 11
+
+    expected_result = PipelineInspector\
+        .on_pipeline_from_string(changed_pipeline_code)\
+        .add_required_inspection(MaterializeFirstOutputRows(5))\
+        .execute()
+    compare(networkx.to_dict_of_dicts(incremental_result.dag), networkx.to_dict_of_dicts(expected_result.dag))
+    incremental_annotations = incremental_result.inspection_to_annotations[MaterializeFirstOutputRows(5)]
+    expected_annotations = expected_result.inspection_to_annotations[MaterializeFirstOutputRows(5)]
+    assert {node: str(annotation) for node, annotation in incremental_annotations.items()} == \
+        {node: str(annotation) for node, annotation in expected_annotations.items()}
+
+
+def test_checkpoints_restore_scope():
+    """
+    Tests whether restored objects are independent from the objects later statements changed
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+
+        data = pd.DataFrame({'A': [1, 2]})
+        data['A'] = data['A'] + 1
+        data['A'] = data['A'] * 10
+        """)
+    checkpoint_store = PipelineCheckpointStore()
+    PipelineExecutor().run(None, None, test_code, [], [], checkpoint_store=checkpoint_store)
+
+    changed_test_code = test_code.replace("* 10", "* 100")
+    executor = PipelineExecutor()
+    executor.run(None, None, changed_test_code, [], [], checkpoint_store=checkpoint_store)
+
+    assert checkpoint_store.get_checkpoints("<string>").reused_statement_count == 3
+    assert list(executor.script_scope["data"]["A"]) == [200, 300]
+
+
+def test_checkpoints_discarded_for_other_inspections():
+    """
+    Tests whether the checkpoints only get reused with the same inspections
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+
+        data = pd.DataFrame({'A': [1, 2]})
+        data = data.dropna()
+        """)
+    checkpoint_store = PipelineCheckpointStore()
+    PipelineExecutor().run(None, None, test_code, [], [], checkpoint_store=checkpoint_store)
+    PipelineExecutor().run(None, None, test_code, [], [], checkpoint_store=checkpoint_store)
+    assert checkpoint_store.get_checkpoints("<string>").reused_statement_count == 3
+
+    PipelineExecutor().run(None, None, test_code, [MaterializeFirstOutputRows(1)], [],
+                           checkpoint_store=checkpoint_store)
+    assert checkpoint_store.get_checkpoints("<string>").reused_statement_count == 0
+
+
+def test_checkpoints_discarded_for_changed_input_files(tmp_path):
+    """
+    Tests whether snapshots after reading a file only get reused while the file is unchanged
+    """
+    data_path = tmp_path / "data.csv"
+    data_path.write_text("A\n1\n2\n")
+    test_code = cleandoc("""
+        import pandas as pd
+
+        data = pd.DataFrame({{'B': [1, 2]}})
+        data = pd.read_csv({!r})
+        data = data.dropna()
+        """.format(str(data_path)))
+    checkpoint_store = PipelineCheckpointStore()
+    PipelineExecutor().run(None, None, test_code, [], [], checkpoint_store=checkpoint_store)
+    PipelineExecutor().run(None, None, test_code, [], [], checkpoint_store=checkpoint_store)
+    assert checkpoint_store.get_checkpoints("<string>").reused_statement_count == 4
+
+    data_path.write_text("A\n1\n2\n3\n")
+    executor = PipelineExecutor()
+    executor.run(None, None, test_code, [], [], checkpoint_store=checkpoint_store)
+    assert checkpoint_store.get_checkpoints("<string>").reused_statement_count == 2
+    assert list(executor.script_scope["data"]["A"]) == [1, 2, 3]
+
+
+def test_checkpoints_resume_after_shifted_lines():
+    """
+    Tests whether inserting lines above unchanged statements keeps their snapshots and shifts the code references
+    """
+    with open(ADULT_SIMPLE_PY) as file:
+        pipeline_code = file.read()
+    checkpoint_store = PipelineCheckpointStore()
+    PipelineInspector\
+        .on_pipeline_from_string(pipeline_code)\
+        .add_required_inspection(MaterializeFirstOutputRows(5))\
+        .with_incremental_execution(checkpoint_store)\
+        .execute()
+
+    changed_pipeline_code = "# The adult pipeline\n\n" + \
+        pipeline_code.replace("tree.DecisionTreeClassifier()", "tree.DecisionTreeClassifier(max_depth=3)")
+    incremental_result = PipelineInspector\
+        .on_pipeline_from_string(changed_pipeline_code)\
+        .add_required_inspection(MaterializeFirstOutputRows(5))\
+        .with_incremental_execution(checkpoint_store)\
+        .execute()
+    assert checkpoint_store.get_checkpoints("<string>").reused_statement_count == 11
+
+    expected_result = PipelineInspector\
+        .on_pipeline_from_string(changed_pipeline_code)\
+        .add_required_inspection(MaterializeFirstOutputRows(5))\
+        .execute()
+    compare(networkx.to_dict_of_dicts(incremental_result.dag), networkx.to_dict_of_dicts(expected_result.dag))
+
+
+def test_checkpoints_restore_random_state():
+    """
+    Tests whether the random number generators continue from the snapshot and only the statements that called
+    operators get snapshots
+    """
+    test_code = cleandoc("""
+        import random
+        import numpy as np
+        import pandas as pd
+
+        random.seed(0)
+        np.random.seed(0)
+        data = pd.DataFrame({'A': [1, 2]})
+        samples = [random.random(), np.random.rand()]
+        data['B'] = data['A'] + 1
+        """)
+    checkpoint_store = PipelineCheckpointStore()
+    first_executor = PipelineExecutor()
+    first_executor.run(None, None, test_code, [], [], checkpoint_store=checkpoint_store)
+    checkpoints = checkpoint_store.get_checkpoints("<string>")
+    assert sorted(checkpoints.statement_count_to_snapshot) == [6, 8]
+
+    changed_test_code = test_code.replace("+ 1", "+ 2")
+    executor = PipelineExecutor()
+    executor.run(None, None, changed_test_code, [], [], checkpoint_store=checkpoint_store)
+
+    assert checkpoints.reused_statement_count == 6
+    assert executor.script_scope["samples"] == first_executor.script_scope["samples"]
+    assert list(executor.script_scope["data"]["B"]) == [3, 4]
+
+
+def test_checkpoints_rebind_functions():
+    """
+    Tests whether restored functions use the new script scope and the code compiled for their shifted lines
+    """
+    test_code = cleandoc("""
+        offset = 1
+        def get_offset():
+            return offset
+        """)
+    parsed_ast = ast.parse(test_code)
+    statement_keys = [get_statement_key(statement) for statement in parsed_ast.body]
+    script_scope = {}
+    exec(compile(parsed_ast, filename="<ast>", mode="exec"), script_scope)
+    checkpoints = PipelineCheckpoints()
+    checkpoints.get_resume_index(None, statement_keys, [(1, 1), (2, 3)])
+    checkpoints.store(2, script_scope, [])
+
+    shifted_ast = ast.parse("\n" + test_code)
+    assert [get_statement_key(statement) for statement in shifted_ast.body] == statement_keys
+    statement_codes = [compile(ast.Module(body=[statement], type_ignores=[]), filename="<ast>", mode="exec")
+                       for statement in shifted_ast.body]
+    assert checkpoints.get_resume_index(None, statement_keys, [(2, 2), (3, 4)]) == 2
+    restored_scope, _ = checkpoints.restore(2, statement_codes)
+    restored_scope["offset"] = 2
+
+    assert restored_scope["get_offset"]() == 2
+    assert restored_scope["get_offset"].__code__.co_firstlineno == 3
+    assert script_scope["get_offset"]() == 1
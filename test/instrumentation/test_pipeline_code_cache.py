@@ -0,0 +1,79 @@
+"""
+Tests whether the PipelineCodeCache works
+"""
+import os
+
+import networkx
+from testfixtures import compare
+
+from example_pipelines import ADULT_SIMPLE_PY
+from mlinspect import PipelineInspector
+from mlinspect.inspections import MaterializeFirstOutputRows
+from mlinspect.instrumentation._pipeline_code_cache import PipelineCodeCache, PipelineCodeCacheStats
+from ..testing_helper_utils import get_expected_dag_adult_easy_py, get_pandas_read_csv_and_dropna_code
+
+
+def test_code_cache_hit_and_miss(tmpdir):
+    """
+    Tests whether the second run of the same pipeline is a cache hit and produces the same DAG
+    """
+    builder = PipelineInspector\
+        .on_pipeline_from_py_file(ADULT_SIMPLE_PY)\
+        .add_required_inspection(MaterializeFirstOutputRows(5))\
+        .with_code_cache(str(tmpdir))
+
+    first_result = builder.execute()
+    assert first_result.code_cache_stats == PipelineCodeCacheStats(0, 1)
+    assert len(os.listdir(str(tmpdir))) == 1
+
+    second_result = builder.execute()
+    assert second_result.code_cache_stats == PipelineCodeCacheStats(1, 1)
+
+    expected_dag = get_expected_dag_adult_easy_py()
+    compare(networkx.to_dict_of_dicts(first_result.dag), networkx.to_dict_of_dicts(expected_dag))
+    compare(networkx.to_dict_of_dicts(second_result.dag), networkx.to_dict_of_dicts(expected_dag))
+    assert len(second_result.inspection_to_annotations[MaterializeFirstOutputRows(5)]) == \
+           len(first_result.inspection_to_annotations[MaterializeFirstOutputRows(5)])
+
+
+def test_code_cache_keyed_by_source(tmpdir):
+    """
+    Tests whether changing the source code leads to a cache miss
+    """
+    code_cache = PipelineCodeCache(str(tmpdir))
+    backend_names = ("PandasBackend", "SklearnBackend")
+    code = get_pandas_read_csv_and_dropna_code()
+
+    assert code_cache.load(code, backend_names) is None
+    code_cache.store(code, backend_names, compile(code, filename="<ast>", mode="exec"), networkx.DiGraph())
+    assert code_cache.load(code, backend_names) is not None
+    assert code_cache.load(code + "\nprint('changed')", backend_names) is None
+    assert code_cache.load(code, ("PandasBackend",)) is None
+    assert code_cache.get_stats() == PipelineCodeCacheStats(1, 3)
+
+
+def test_code_cache_corrupt_entry(tmpdir):
+    """
+    Tests whether corrupt cache entries are treated as misses
+    """
+    code_cache = PipelineCodeCache(str(tmpdir))
+    code = get_pandas_read_csv_and_dropna_code()
+    with open(code_cache.get_cache_file_path(code, ()), "wb") as file:
+        file.write(b"not a cache entry")
+
+    assert code_cache.load(code, ()) is None
+    assert code_cache.get_stats() == PipelineCodeCacheStats(0, 1)
+
+
+def test_code_cache_failed_store(tmpdir):
+    """
+    Tests whether entries that can not be stored are cache misses and leave no temporary files behind
+    """
+    code_cache = PipelineCodeCache(str(tmpdir))
+    code = get_pandas_read_csv_and_dropna_code()
+    wir = networkx.DiGraph()
+    wir.add_node(lambda: None)
+
+    code_cache.store(code, (), compile(code, filename="<ast>", mode="exec"), wir)
+    assert code_cache.load(code, ()) is None
+    assert not os.listdir(str(tmpdir))
@@ -4,12 +4,14 @@ Tests whether the PipelineExecutor works
 from inspect import cleandoc
 
 import networkx
+import numpy as np
 from testfixtures import compare
 
 from example_pipelines import ADULT_SIMPLE_PY, ADULT_SIMPLE_IPYNB
 from mlinspect.backends._pandas_backend import PandasBackend
 from mlinspect.instrumentation import _pipeline_executor
 from mlinspect.instrumentation._dag_node import CodeReference
+from mlinspect.instrumentation._notebook_loader import NotebookLoader
 from ..testing_helper_utils import get_pandas_read_csv_and_dropna_code, get_expected_dag_adult_easy_py, \
     get_expected_dag_adult_easy_ipynb
 
@@ -18,14 +20,14 @@ def test_pipeline_executor_py_file(mocker):
     """
     Tests whether the PipelineExecutor works for .py files
     """
-    _pipeline_executor.singleton = _pipeline_executor.PipelineExecutor()
+    executor = _pipeline_executor.PipelineExecutor(prune_irrelevant_calls=False)
 
     before_call_used_value_spy = mocker.spy(_pipeline_executor, 'before_call_used_value')
     before_call_used_args_spy = mocker.spy(_pipeline_executor, 'before_call_used_args')
     before_call_used_kwargs_spy = mocker.spy(_pipeline_executor, 'before_call_used_kwargs')
     after_call_used_spy = mocker.spy(_pipeline_executor, 'after_call_used')
 
-    extracted_dag = _pipeline_executor.singleton.run(None, ADULT_SIMPLE_PY, None, [], []).dag
+    extracted_dag = executor.run(None, ADULT_SIMPLE_PY, None, [], []).dag
     expected_dag = get_expected_dag_adult_easy_py()
     assert networkx.to_dict_of_dicts(extracted_dag) == networkx.to_dict_of_dicts(expected_dag)
 
@@ -35,18 +37,78 @@ def test_pipeline_executor_py_file(mocker):
     assert after_call_used_spy.call_count == 15
 
 
+def test_pipeline_executor_py_file_with_pruning(mocker):
+    """
+    Tests whether the PipelineExecutor leaves the calls the call relevance analysis prunes uninstrumented
+    """
+    executor = _pipeline_executor.PipelineExecutor(prune_irrelevant_calls=True)
+
+    after_call_used_spy = mocker.spy(_pipeline_executor, 'after_call_used')
+    after_pruned_call_used_spy = mocker.spy(_pipeline_executor, 'after_pruned_call_used')
+
+    extracted_dag = executor.run(None, ADULT_SIMPLE_PY, None, [], []).dag
+    expected_dag = get_expected_dag_adult_easy_py()
+    assert networkx.to_dict_of_dicts(extracted_dag) == networkx.to_dict_of_dicts(expected_dag)
+
+    assert after_call_used_spy.call_count == 11
+    assert after_pruned_call_used_spy.call_count == 1
+
+
+def test_pipeline_executor_pruned_call_receiver():
+    """
+    Tests whether method calls with relevant arguments make their receivers relevant
+    """
+    test_code = cleandoc("""
+            import os
+            import pandas as pd
+            from mlinspect.utils import get_project_root
+
+            train_file = os.path.join(str(get_project_root()), "example_pipelines", "adult_complex", "adult_train.csv")
+            frames = []
+            frames.append(pd.read_csv(train_file, na_values='?', index_col=0))
+            for frame in frames:
+                data = frame.dropna()
+            """)
+
+    expected_dag = _pipeline_executor.PipelineExecutor(prune_irrelevant_calls=False).run(None, None, test_code, [],
+                                                                                         []).dag
+    executor = _pipeline_executor.PipelineExecutor(prune_irrelevant_calls=True)
+    extracted_dag = executor.run(None, None, test_code, [], []).dag
+    assert len(extracted_dag) == 2
+    compare(networkx.to_dict_of_dicts(extracted_dag), networkx.to_dict_of_dicts(expected_dag))
+
+
+def test_pipeline_executor_pruned_call_guard(mocker):
+    """
+    Tests whether the pipeline runs again with the call instrumented if a pruned call returns a pandas object
+    """
+    test_code = get_pandas_read_csv_and_dropna_code().replace("data = raw_data.dropna()",
+                                                              "data = eval('raw_data').dropna()")
+    expected_dag = _pipeline_executor.PipelineExecutor(prune_irrelevant_calls=False).run(None, None, test_code, [],
+                                                                                         []).dag
+    after_pruned_call_used_spy = mocker.spy(_pipeline_executor, 'after_pruned_call_used')
+
+    executor = _pipeline_executor.PipelineExecutor(prune_irrelevant_calls=True)
+    extracted_dag = executor.run(None, None, test_code, [], []).dag
+    compare(networkx.to_dict_of_dicts(extracted_dag), networkx.to_dict_of_dicts(expected_dag))
+    assert executor.relevant_pruned_calls == {CodeReference(7, 7, 7, 23)}
+    assert after_pruned_call_used_spy.call_count == 3  # os.path.join in both runs and eval in the first one
+
+
 def test_pipeline_executor_nb_file(mocker):
     """
     Tests whether the PipelineExecutor works for .ipynb files
     """
-    _pipeline_executor.singleton = _pipeline_executor.PipelineExecutor()
+    executor = _pipeline_executor.PipelineExecutor(prune_irrelevant_calls=False)
 
     before_call_used_value_spy = mocker.spy(_pipeline_executor, 'before_call_used_value')
     before_call_used_args_spy = mocker.spy(_pipeline_executor, 'before_call_used_args')
     before_call_used_kwargs_spy = mocker.spy(_pipeline_executor, 'before_call_used_kwargs')
     after_call_used_spy = mocker.spy(_pipeline_executor, 'after_call_used')
+    notebook_load_spy = mocker.spy(NotebookLoader, 'load')
 
-    extracted_dag = _pipeline_executor.singleton.run(ADULT_SIMPLE_IPYNB, None, None, [], []).dag
+    inspector_result = executor.run(ADULT_SIMPLE_IPYNB, None, None, [], [])
+    extracted_dag = inspector_result.dag
     expected_dag = get_expected_dag_adult_easy_ipynb()
     compare(networkx.to_dict_of_dicts(extracted_dag), networkx.to_dict_of_dicts(expected_dag))
 
@@ -54,6 +116,8 @@ def test_pipeline_executor_nb_file(mocker):
     assert before_call_used_args_spy.call_count == 15
     assert before_call_used_kwargs_spy.call_count == 14
     assert after_call_used_spy.call_count == 15
+    assert notebook_load_spy.call_count == 1
+    assert inspector_result.notebook_source.source_code.startswith("#!/usr/bin/env python")
 
 
 def test_pipeline_executor_function_call_info_extraction():
@@ -62,13 +126,13 @@ def test_pipeline_executor_function_call_info_extraction():
     """
     test_code = get_pandas_read_csv_and_dropna_code()
 
-    _pipeline_executor.singleton = _pipeline_executor.PipelineExecutor()
-    _pipeline_executor.singleton.run(None, None, test_code, [], [])
+    executor = _pipeline_executor.PipelineExecutor()
+    executor.run(None, None, test_code, [], [])
     expected_module_info = {CodeReference(6, 11, 6, 34): ('pandas.io.parsers', 'read_csv'),
                             CodeReference(7, 7, 7, 24): ('pandas.core.frame', 'dropna'),
                             CodeReference(8, 16, 8, 55): ('pandas.core.frame', '__getitem__')}
 
-    pandas_backend = [backend for backend in _pipeline_executor.singleton.backends
+    pandas_backend = [backend for backend in executor.backends
                       if isinstance(backend, PandasBackend)][0]
     compare(pandas_backend.code_reference_to_module, expected_module_info)
 
@@ -88,12 +152,42 @@ def test_pipeline_executor_function_subscript_index_info_extraction():
             data['income-per-year']
             """)
 
-    _pipeline_executor.singleton = _pipeline_executor.PipelineExecutor()
-    _pipeline_executor.singleton.run(None, None, test_code, [], [])
+    executor = _pipeline_executor.PipelineExecutor()
+    executor.run(None, None, test_code, [], [])
     expected_module_info = {CodeReference(6, 11, 6, 62): ('pandas.io.parsers', 'read_csv'),
                             CodeReference(7, 7, 7, 24): ('pandas.core.frame', 'dropna'),
                             CodeReference(8, 0, 8, 23): ('pandas.core.frame', '__getitem__')}
 
-    pandas_backend = [backend for backend in _pipeline_executor.singleton.backends
+    pandas_backend = [backend for backend in executor.backends
                       if isinstance(backend, PandasBackend)][0]
     compare(pandas_backend.code_reference_to_module, expected_module_info)
+
+
+def test_pipeline_executor_call_site_cache():
+    """
+    Tests whether the call site cache resolves call sites once and produces the same module info
+    """
+    test_code = cleandoc("""
+            import pandas as pd
+            import numpy as np
+
+            for data in [pd.DataFrame({'A': [0, 1]}), pd.DataFrame({'A': [2, 3]}), np.array([[0, 1]])]:
+                data.sum()
+            """)
+
+    executor = _pipeline_executor.PipelineExecutor(use_call_site_cache=False)
+    executor.run(None, None, test_code, [], [])
+    pandas_backend = [backend for backend in executor.backends
+                      if isinstance(backend, PandasBackend)][0]
+    expected_module_info = pandas_backend.code_reference_to_module
+
+    executor = _pipeline_executor.PipelineExecutor(use_call_site_cache=True)
+    executor.run(None, None, test_code, [], [])
+    pandas_backend = [backend for backend in executor.backends
+                      if isinstance(backend, PandasBackend)][0]
+    compare(pandas_backend.code_reference_to_module, expected_module_info)
+
+    sum_call_site = [call_site for (_, call_code, _), call_site in executor.call_sites.items()
+                     if call_code == "data.sum()"][0]
+    assert sum_call_site.function_info == ('builtin_function_or_method', 'sum')
+    assert sum_call_site.receiver_key is np.ndarray
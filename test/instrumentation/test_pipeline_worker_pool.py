@@ -0,0 +1,20 @@
+"""
+Tests whether the PipelineWorkerPool works
+"""
+from mlinspect.instrumentation._pipeline_worker_pool import PipelineWorkerPool
+
+
+def test_worker_pool_interleaved_batches():
+    """
+    Tests whether batches can be consumed interleaved and each batch only gets the results of its own tasks. While
+    the first batch is suspended, its remaining tasks keep all workers busy.
+    """
+    with PipelineWorkerPool(abs, 2) as worker_pool:
+        first_batch = worker_pool.imap_unordered([-1, -2, -3, -4, -5])
+        first_results = [next(first_batch)]
+        second_results = list(worker_pool.imap_unordered([-10, -20]))
+        first_results.extend(first_batch)
+
+    assert sorted((result.task_index, result.result) for result in first_results) == [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5)]
+    assert sorted((result.task_index, result.result) for result in second_results) == [(0, 10), (1, 20)]
+    assert all(result.error is None for result in first_results + second_results)
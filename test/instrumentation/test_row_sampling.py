@@ -0,0 +1,127 @@
+"""
+Tests whether the RowSampling works
+"""
+from inspect import cleandoc
+
+import pandas
+import pytest
+
+from mlinspect import OperatorType
+from mlinspect.inspections import HistogramForColumns, SampledCount
+from mlinspect.instrumentation._dag_node import CodeReference
+from mlinspect.instrumentation._pipeline_executor import PipelineExecutor
+from mlinspect.instrumentation._row_sampling import RowSampling
+
+
+def test_row_sampling_deterministic():
+    """
+    Tests whether samples are deterministic, keep the row order, and depend on the code location
+    """
+    data_frame = pandas.DataFrame({'A': range(100)})
+    row_sampling = RowSampling(fraction=0.1, seed=1)
+
+    sample, sampling_fraction = row_sampling.sample(data_frame, CodeReference(3, 7, 3, 30))
+    same_sample, _ = row_sampling.sample(data_frame, CodeReference(3, 7, 3, 30))
+    other_sample, _ = row_sampling.sample(data_frame, CodeReference(4, 7, 4, 30))
+
+    assert sampling_fraction == 0.1
+    assert len(sample) == 10
+    assert list(sample['A']) == sorted(sample['A'])
+    assert list(sample.index) == list(same_sample.index)
+    assert list(sample.index) != list(other_sample.index)
+
+
+def test_row_sampling_n_rows():
+    """
+    Tests whether data sources with at most n_rows rows are not sampled
+    """
+    data_frame = pandas.DataFrame({'A': range(100)})
+
+    sample, sampling_fraction = RowSampling(n_rows=25).sample(data_frame, CodeReference(3, 7, 3, 30))
+    assert len(sample) == 25
+    assert sampling_fraction == 0.25
+
+    sample, sampling_fraction = RowSampling(n_rows=200).sample(data_frame, CodeReference(3, 7, 3, 30))
+    assert sample is data_frame
+    assert sampling_fraction == 1.0
+
+    with pytest.raises(ValueError):
+        RowSampling(fraction=0.5, n_rows=10)
+    with pytest.raises(ValueError):
+        RowSampling(fraction=1.5)
+
+
+def test_row_sampling_join():
+    """
+    Tests whether the counts after a join get scaled with the sampling fractions of both inputs
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+
+        a = pd.DataFrame({'id': list(range(1000)), 'group': ['x', 'y'] * 500})
+        b = pd.DataFrame({'id': list(range(1000)), 'value': [1] * 1000})
+        c = a.merge(b, on='id')
+        """)
+    inspector_result = PipelineExecutor().run(None, None, test_code, [HistogramForColumns(['group'])], [],
+                                              row_sampling=RowSampling(fraction=0.5))
+    dag_node_to_histogram = inspector_result.inspection_to_annotations[HistogramForColumns(['group'])]
+    join_node = [node for node in dag_node_to_histogram if node.operator_type == OperatorType.JOIN][0]
+
+    join_histogram = dag_node_to_histogram[join_node]['group']
+    assert len(inspector_result.dag.nodes) == 3
+    for count in join_histogram.values():
+        assert count == SampledCount.from_sample(count.sample_count, 0.25, 0.95)
+        assert count.lower_bound <= 500 <= count.upper_bound
+
+
+def test_row_sampling_by_key():
+    """
+    Tests whether data sources with the key columns sample the same keys independent of their code location
+    """
+    data_frame = pandas.DataFrame({'id': range(1000), 'A': range(1000)})
+    other_data_frame = pandas.DataFrame({'id': range(999, -1, -1), 'B': 'x'})
+    row_sampling = RowSampling(fraction=0.1, seed=1, key_columns=('id',))
+
+    sample, sampling_fraction = row_sampling.sample(data_frame, CodeReference(3, 7, 3, 30))
+    other_sample, other_sampling_fraction = row_sampling.sample(other_data_frame, CodeReference(4, 7, 4, 30))
+    other_seed_sample, _ = RowSampling(fraction=0.1, seed=2, key_columns=('id',)) \
+        .sample(data_frame, CodeReference(3, 7, 3, 30))
+
+    assert sampling_fraction == other_sampling_fraction == 0.1
+    assert 50 < len(sample) < 150
+    assert list(sample['id']) == sorted(sample['id'])
+    assert set(sample['id']) == set(other_sample['id'])
+    assert set(sample['id']) != set(other_seed_sample['id'])
+
+    sample, sampling_fraction = RowSampling(n_rows=250, key_columns=('id',)) \
+        .sample(data_frame, CodeReference(3, 7, 3, 30))
+    assert sampling_fraction == 0.25
+    assert 150 < len(sample) < 350
+
+    without_keys = pandas.DataFrame({'A': range(100)})
+    sample, sampling_fraction = row_sampling.sample(without_keys, CodeReference(3, 7, 3, 30))
+    assert len(sample) == 10
+    assert sampling_fraction == 0.1
+
+
+def test_row_sampling_key_join():
+    """
+    Tests whether joins on the sampling key columns keep the sampling fraction of their inputs
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+
+        a = pd.DataFrame({'id': list(range(1000)), 'group': ['x', 'y'] * 500})
+        b = pd.DataFrame({'id': list(range(1000)), 'value': [1] * 1000})
+        c = a.merge(b, on='id')
+        """)
+    inspector_result = PipelineExecutor().run(None, None, test_code, [HistogramForColumns(['group'])], [],
+                                              row_sampling=RowSampling(fraction=0.5, key_columns=('id',)))
+    dag_node_to_histogram = inspector_result.inspection_to_annotations[HistogramForColumns(['group'])]
+    join_node = [node for node in dag_node_to_histogram if node.operator_type == OperatorType.JOIN][0]
+
+    join_histogram = dag_node_to_histogram[join_node]['group']
+    assert 400 < sum(count.sample_count for count in join_histogram.values()) < 600
+    for count in join_histogram.values():
+        assert count == SampledCount.from_sample(count.sample_count, 0.5, 0.95)
+        assert count.lower_bound <= 500 <= count.upper_bound
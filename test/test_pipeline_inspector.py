@@ -1,14 +1,19 @@
 """
 Tests whether the fluent API works
 """
+from concurrent.futures import ThreadPoolExecutor
+from inspect import cleandoc
 
 import networkx
+import pytest
 from testfixtures import compare
 
 from mlinspect import PipelineInspector
 from mlinspect.checks import CheckStatus, NoBiasIntroducedFor, NoIllegalFeatures
-from mlinspect.inspections import HistogramForColumns, MaterializeFirstOutputRows
-from example_pipelines import ADULT_SIMPLE_PY, ADULT_SIMPLE_IPYNB
+from mlinspect.inspections import HistogramForColumns, MaterializeFirstOutputRows, SampledCount, RowLineage
+from mlinspect.instrumentation._dag_node import OperatorType
+from mlinspect.instrumentation._pipeline_checkpoints import PipelineCheckpointStore
+from example_pipelines import ADULT_SIMPLE_PY, ADULT_SIMPLE_IPYNB, HEALTHCARE_PY, COMPAS_PY
 from .testing_helper_utils import get_expected_dag_adult_easy_ipynb, get_expected_dag_adult_easy_py
 
 
@@ -57,6 +62,9 @@ def test_inspector_adult_easy_ipynb_pipeline():
     extracted_dag = inspector_result.dag
     expected_dag = get_expected_dag_adult_easy_ipynb()
     compare(networkx.to_dict_of_dicts(extracted_dag), networkx.to_dict_of_dicts(expected_dag))
+    read_csv_node = [node for node in extracted_dag.nodes if node.operator_type == OperatorType.DATA_SOURCE][0]
+    cell_index, _ = inspector_result.notebook_source.get_cell_code_reference(read_csv_node.code_reference)
+    assert cell_index == 0
 
     assert HistogramForColumns(['race']) in inspector_result.inspection_to_annotations
     check_to_check_results = inspector_result.check_to_check_results
@@ -85,3 +93,230 @@ def test_inspector_adult_easy_str_pipeline():
         check_to_check_results = inspector_result.check_to_check_results
         assert check_to_check_results[NoBiasIntroducedFor(['race'])].status == CheckStatus.SUCCESS
         assert check_to_check_results[NoIllegalFeatures()].status == CheckStatus.FAILURE
+
+
+def test_inspector_call_pruning():
+    """
+    Tests whether the inspector results stay the same if the calls that can not reach pandas or sklearn objects
+    are left uninstrumented
+    """
+    builder = PipelineInspector.on_pipeline_from_py_file(HEALTHCARE_PY)\
+        .add_required_inspection(HistogramForColumns(['age_group', 'race']))
+    expected_result = builder.with_call_pruning(False).execute()
+    pruned_result = builder.with_call_pruning().execute()
+
+    compare(networkx.to_dict_of_dicts(pruned_result.dag), networkx.to_dict_of_dicts(expected_result.dag))
+    inspection = HistogramForColumns(['age_group', 'race'])
+    compare(pruned_result.inspection_to_annotations[inspection].keys(),
+            expected_result.inspection_to_annotations[inspection].keys())
+
+
+def test_inspector_sampling():
+    """
+    Tests whether inspections with sampling get the same DAG and report scaled histograms with confidence bounds
+    """
+    full_result = PipelineInspector\
+        .on_pipeline_from_py_file(COMPAS_PY)\
+        .add_check(NoBiasIntroducedFor(['race']))\
+        .execute()
+    sampled_result = PipelineInspector\
+        .on_pipeline_from_py_file(COMPAS_PY)\
+        .add_check(NoBiasIntroducedFor(['race']))\
+        .with_sampling(fraction=0.5, seed=42)\
+        .execute()
+    compare(networkx.to_dict_of_dicts(sampled_result.dag), networkx.to_dict_of_dicts(full_result.dag))
+
+    data_source = [node for node in sampled_result.dag.nodes if node.operator_type == OperatorType.DATA_SOURCE][0]
+    full_histogram = full_result.inspection_to_annotations[HistogramForColumns(['race'])][data_source]['race']
+    sampled_histogram = sampled_result.inspection_to_annotations[HistogramForColumns(['race'])][data_source]['race']
+    assert set(sampled_histogram) == set(full_histogram)
+    for race, count in full_histogram.items():
+        sampled_count = sampled_histogram[race]
+        assert isinstance(sampled_count, SampledCount)
+        assert sampled_count.estimate == pytest.approx(sampled_count.sample_count * 2, rel=0.01)
+        assert sampled_count.lower_bound <= count <= sampled_count.upper_bound
+
+    bias_changes = sampled_result.check_to_check_results[NoBiasIntroducedFor(['race'])].bias_distribution_change
+    before_and_after_df = list(bias_changes.values())[0]['race'].before_and_after_df
+    assert {"count_before_lower_bound", "count_before_upper_bound", "count_after_lower_bound",
+            "count_after_upper_bound"}.issubset(before_and_after_df.columns)
+
+
+def test_inspector_only_for():
+    """
+    Tests whether operators outside of the operator scope get skipped without changing the annotations of the
+    operators in the scope
+    """
+    inspections = [HistogramForColumns(['race']), RowLineage(5)]
+    full_result = PipelineInspector\
+        .on_pipeline_from_py_file(COMPAS_PY)\
+        .add_required_inspections(inspections)\
+        .execute()
+    selection = [node for node in full_result.dag.nodes if node.operator_type == OperatorType.SELECTION][-1]
+    scoped_result = PipelineInspector\
+        .on_pipeline_from_py_file(COMPAS_PY)\
+        .add_required_inspections(inspections)\
+        .only_for(operator_types=[OperatorType.PROJECTION_MODIFY], code_references=[selection.code_reference])\
+        .execute()
+    compare(networkx.to_dict_of_dicts(scoped_result.dag), networkx.to_dict_of_dicts(full_result.dag))
+
+    expected_operator_types = {OperatorType.DATA_SOURCE, OperatorType.CONCATENATION, OperatorType.PROJECTION_MODIFY,
+                               OperatorType.SELECTION}
+    for inspection in inspections:
+        full_annotations = full_result.inspection_to_annotations[inspection]
+        scoped_annotations = scoped_result.inspection_to_annotations[inspection]
+        assert {node.operator_type for node in scoped_annotations} == expected_operator_types
+        assert [node for node in scoped_annotations if node.operator_type == OperatorType.SELECTION] == [selection]
+        for node, annotation in scoped_annotations.items():
+            assert str(annotation) == str(full_annotations[node])
+
+
+def test_inspector_only_for_operators_changing_annotations():
+    """
+    Tests whether operators outside of the operator scope still get visited if an inspection does not pass the
+    annotations through them, so the operators in the scope get correct annotations
+    """
+    test_code = cleandoc("""
+        import pandas as pd
+
+        df = pd.DataFrame({'A': ['x', 'x', 'z'], 'B': [1, 2, 3]})
+        df = df.replace('x', 'y')
+        df = df[['B']]
+        df = df[df['B'] > 1]
+        """)
+    inspection = HistogramForColumns(['A'])
+    full_result = PipelineInspector.on_pipeline_from_string(test_code).add_required_inspection(inspection).execute()
+    scoped_result = PipelineInspector\
+        .on_pipeline_from_string(test_code)\
+        .add_required_inspection(inspection)\
+        .only_for(operator_types=[OperatorType.SELECTION])\
+        .execute()
+
+    scoped_annotations = scoped_result.inspection_to_annotations[inspection]
+    assert {node.operator_type for node in scoped_annotations} == {OperatorType.DATA_SOURCE, OperatorType.SELECTION}
+    selection = [node for node in scoped_annotations if node.operator_type == OperatorType.SELECTION][0]
+    assert scoped_annotations[selection] == {'A': {'y': 1, 'z': 1}}
+    assert scoped_annotations[selection] == full_result.inspection_to_annotations[inspection][selection]
+
+
+def test_inspector_concurrent_healthcare_pipelines():
+    """
+    Tests whether multiple pipelines can be inspected concurrently with the same results as sequential runs
+    """
+    def inspect_healthcare_pipeline():
+        return PipelineInspector \
+            .on_pipeline_from_py_file(HEALTHCARE_PY) \
+            .add_required_inspection(HistogramForColumns(['age_group', 'race'])) \
+            .execute()
+
+    def get_annotations_before_train_test_split(inspector_result):
+        # train_test_split and everything after it is random
+        dag = inspector_result.dag
+        split_nodes = [node for node in dag.nodes if node.operator_type == OperatorType.TRAIN_TEST_SPLIT]
+        random_nodes = set(split_nodes).union(*(networkx.descendants(dag, node) for node in split_nodes))
+        annotations = inspector_result.inspection_to_annotations[HistogramForColumns(['age_group', 'race'])]
+        return {node: annotation for node, annotation in annotations.items() if node not in random_nodes}
+
+    inspection_count = 4
+    sequential_result = inspect_healthcare_pipeline()
+    with ThreadPoolExecutor(max_workers=inspection_count) as thread_pool:
+        concurrent_futures = [thread_pool.submit(inspect_healthcare_pipeline) for _ in range(inspection_count)]
+        concurrent_results = [future.result() for future in concurrent_futures]
+
+    for concurrent_result in concurrent_results:
+        compare(networkx.to_dict_of_dicts(concurrent_result.dag), networkx.to_dict_of_dicts(sequential_result.dag))
+        compare(get_annotations_before_train_test_split(concurrent_result),
+                get_annotations_before_train_test_split(sequential_result))
+
+
+def test_inspector_batch_pipelines():
+    """
+    Tests whether the batch version of the inspector works
+    """
+    batch_results = PipelineInspector\
+        .on_pipelines([ADULT_SIMPLE_PY, ADULT_SIMPLE_IPYNB, COMPAS_PY])\
+        .add_required_inspection(MaterializeFirstOutputRows(5))\
+        .add_check(NoBiasIntroducedFor(['race']))\
+        .with_workers(2)\
+        .execute()
+    path_to_result = {batch_result.pipeline_path: batch_result for batch_result in batch_results}
+
+    assert set(path_to_result) == {ADULT_SIMPLE_PY, ADULT_SIMPLE_IPYNB, COMPAS_PY}
+    assert all(batch_result.error is None for batch_result in path_to_result.values())
+    py_result = path_to_result[ADULT_SIMPLE_PY].inspector_result
+    compare(networkx.to_dict_of_dicts(py_result.dag), networkx.to_dict_of_dicts(get_expected_dag_adult_easy_py()))
+    ipynb_result = path_to_result[ADULT_SIMPLE_IPYNB].inspector_result
+    compare(networkx.to_dict_of_dicts(ipynb_result.dag),
+            networkx.to_dict_of_dicts(get_expected_dag_adult_easy_ipynb()))
+    assert MaterializeFirstOutputRows(5) in py_result.inspection_to_annotations
+    assert py_result.check_to_check_results[NoBiasIntroducedFor(['race'])].status == CheckStatus.SUCCESS
+
+
+def test_inspector_batch_pipelines_failures(tmp_path):
+    """
+    Tests whether failing, crashing, and hanging pipelines only affect their own results
+    """
+    pipeline_codes = {
+        "failing.py": cleandoc("""
+            import pandas as pd
+            pd.read_csv('missing.csv')
+            """),
+        "crashing.py": cleandoc("""
+            import os
+            os._exit(3)
+            """),
+        "hanging.py": cleandoc("""
+            import time
+            time.sleep(600)
+            """),
+    }
+    pipeline_paths = []
+    for file_name, pipeline_code in pipeline_codes.items():
+        pipeline_path = tmp_path / file_name
+        pipeline_path.write_text(pipeline_code)
+        pipeline_paths.append(str(pipeline_path))
+
+    batch_results = PipelineInspector\
+        .on_pipelines(pipeline_paths + [ADULT_SIMPLE_PY])\
+        .with_workers(2)\
+        .with_timeout(30)\
+        .execute()
+    file_name_to_result = {batch_result.pipeline_path.rsplit("/", 1)[-1]: batch_result
+                           for batch_result in batch_results}
+
+    assert "FileNotFoundError" in file_name_to_result["failing.py"].error
+    assert "exit code 3" in file_name_to_result["crashing.py"].error
+    assert "did not finish within 30 seconds" in file_name_to_result["hanging.py"].error
+    assert all(file_name_to_result[file_name].inspector_result is None for file_name in pipeline_codes)
+    adult_simple_result = file_name_to_result["adult_simple.py"]
+    assert adult_simple_result.error is None
+    compare(networkx.to_dict_of_dicts(adult_simple_result.inspector_result.dag),
+            networkx.to_dict_of_dicts(get_expected_dag_adult_easy_py()))
+
+
+def test_inspector_batch_pipelines_worker_pool(tmp_path):
+    """
+    Tests whether batches can share a running worker pool, and whether the workers keep the checkpoints of
+    incremental executions between batches
+    """
+    log_path = tmp_path / "log.txt"
+    pipeline_path = tmp_path / "pipeline.py"
+    pipeline_path.write_text(cleandoc("""
+        import pandas as pd
+
+        open({}, 'a').write('start ')
+        data = pd.DataFrame({{'A': [1, 2]}})
+        """.format(repr(str(log_path)))))
+    checkpoint_store = PipelineCheckpointStore()
+    with PipelineInspector.start_worker_pool(1) as worker_pool:
+        worker_pids = [worker.process.pid for worker in worker_pool.workers]
+        for _ in range(2):
+            batch_results = list(PipelineInspector
+                                 .on_pipelines([str(pipeline_path)])
+                                 .with_incremental_execution(checkpoint_store)
+                                 .with_worker_pool(worker_pool)
+                                 .execute())
+            assert batch_results[0].error is None
+        assert [worker.process.pid for worker in worker_pool.workers] == worker_pids
+
+    assert log_path.read_text() == "start "